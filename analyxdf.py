@@ -1,82 +1,56 @@
+import hashlib
+import os
 import sys
 import numpy as np
-import pyxdf
 import csv
-import neurokit2 as nk
-import matplotlib.pyplot as plt
 from PyQt5 import QtWidgets, QtCore
+from carga_diferida import ModuloDiferido, precargar_en_segundo_plano
+from instrumentacion import registro_etapas
+from precision import convertir_precision, memoria_canales
+from modelo_temporal import ModeloTemporal, buscar_indice
+from procesamiento_por_bloques import procesar_por_bloques
+import filtros
+import hrv_lote
+import promedios
+from espectrograma import Espectrograma, VENTANA_STFT, recortar_cache
+from busqueda_canales import IndiceCanales
+from sesion import guardar_sesion, cargar_sesion, RecorteDiferido, EXTENSION_SESION, MODOS_CALIDAD_RECORTE
+from espacio_trabajo import CacheStreams, StreamDiferido, CanalDiferido, prefijo_archivo
+from metadatos import MetadatosStream, metadatos_de
+import exportacion
+from calidad import evaluar_stream, describir_motivo, NOMBRES_MOTIVOS, FRACCION_MALA_MAX
+from sincronizacion import CARGA_SIN_CORREGIR, sincronizar_stream
+from vista_general import VistaGeneral
+
+# Módulos pesados: se importan en el primer uso (o en segundo plano tras mostrar la ventana)
+pyxdf = ModuloDiferido("pyxdf")
+plt = ModuloDiferido("matplotlib.pyplot")
+nk = ModuloDiferido("neurokit2")
+backend_qtagg = ModuloDiferido("matplotlib.backends.backend_qt5agg")
+mpl_figure = ModuloDiferido("matplotlib.figure")
+mpl_widgets = ModuloDiferido("matplotlib.widgets")
 
 # Variables globales
 canales_dict = {}       # Diccionario: clave = etiqueta; valor = dict con 'stream', 'time' y 'data'
 triggers = []           # Lista de tuplas: (tiempo, marker)
 recortes_guardados = {} # Diccionario para recortes guardados
-TRIGGER_TOLERANCE = 0.01
-
-def obtener_nombres_de_canales(info):
-    nombres = []
-    if info is None:
-        return nombres
-    if "desc" in info and info["desc"] and info["desc"][0] is not None:
-        desc0 = info["desc"][0]
-        if "channels" in desc0 and desc0["channels"] and desc0["channels"][0] is not None:
-            channels_container = desc0["channels"][0]
-            channels_data = channels_container.get("channel", None)
-            if channels_data:
-                if isinstance(channels_data, list):
-                    for ch in channels_data:
-                        if ch is not None and "label" in ch and ch["label"]:
-                            label = ch["label"][0] if isinstance(ch["label"], list) else ch["label"]
-                            nombres.append(label)
-                        else:
-                            nombres.append(None)
-                elif isinstance(channels_data, dict):
-                    if "label" in channels_data and channels_data["label"]:
-                        label = channels_data["label"][0] if isinstance(channels_data["label"], list) else channels_data["label"]
-                        nombres.append(label)
-                if nombres and all(n is None for n in nombres):
-                    nombres = []
-                if nombres:
-                    return nombres
-    if "name" in info and info["name"]:
-        base_name = info["name"][0] if isinstance(info["name"], list) else info["name"]
-    else:
-        base_name = None
-    try:
-        if "channel_count" in info and info["channel_count"]:
-            count = int(info["channel_count"][0])
-        else:
-            count = 1
-    except Exception:
-        count = 1
-    if base_name:
-        if count == 1:
-            nombres = [base_name]
-        else:
-            nombres = [f"{base_name} {i+1}" for i in range(count)]
-    else:
-        nombres = [f"Canal {i+1}" for i in range(count)]
-    return nombres
-
-def get_expected_sampling_rate(info):
-    tipo = info.get("type", None)
-    if tipo:
-        if isinstance(tipo, list):
-            tipo = tipo[0]
-        tipo = tipo.upper()
-        if any(x in tipo for x in ["ACC", "GYRO", "MAG"]):
-            return 25
-        elif "PPG" in tipo:
-            return 25
-        elif "TEMP" in tipo:
-            return 7
-        elif "EDA" in tipo:
-            return 15
-    return None
-
-def recortar_senal(time_stamps, data_arr, t_start, t_end):
+indice_canales = IndiceCanales()  # Índice de búsqueda de canales, se reconstruye en cada carga
+resultados_procesados = {} # Resultados de NeuroKit: llave = ítem procesado; valor = dict con 'tipo', 'signals' e 'info'
+ruta_archivo_actual = None # Archivo XDF del que provienen los canales cargados
+archivos_espacio = {}      # Espacio de trabajo: llave = prefijo del archivo; valor = ruta del XDF
+cache_streams = CacheStreams()  # Datos de los streams del espacio de trabajo (LRU con presupuesto de memoria)
+informe_sincronizacion = []     # SincronizacionStream de cada stream cargado (numéricos y de marcadores)
+vistas_generales = {}           # Vista general de cada archivo: llave = nombre o prefijo; valor = VistaGeneral
+DTYPE_DATOS = np.float64  # np.float32 reduce a la mitad la memoria; los tiempos siguen en float64
+MUESTRAS_MAX_EN_MEMORIA = 20_000_000  # Por encima, ECG/EDA se procesan siempre por bloques
+COLORES_CALIDAD = {1: "gray", 2: "orange", 4: "purple", 8: "gold"}  # Motivo -> color del sombreado
+
+def recortar_senal(time_stamps, data_arr, t_start, t_end, modelo=None):
     """
     Recorta la señal entre t_start y t_end e incluye obligatoriamente ambos marcadores.
     Si t_start o t_end no están presentes, se insertan mediante interpolación.
+    Retorna arrays de NumPy; los datos conservan su tipo (float32 o float64).
+    Si se entrega el ModeloTemporal del stream, los límites se calculan sin buscar en los tiempos.
     """
     try:
         t_start = float(t_start)
@@ -84,18 +58,25 @@ def recortar_senal(time_stamps, data_arr, t_start, t_end):
     except Exception:
         return time_stamps, data_arr
 
-    # Convertir a arrays de NumPy
-    time_arr = np.array(time_stamps)
-    data_arr = np.array(data_arr)
-    
+    with registro_etapas.etapa("recorte", detalle=f"{t_start:.3f}-{t_end:.3f} s") as registro:
+        time_recortado, data_recortado = _recortar_senal(time_stamps, data_arr, t_start, t_end, modelo)
+        registro["muestras"] = len(time_recortado)
+    return time_recortado, data_recortado
+
+def _recortar_senal(time_stamps, data_arr, t_start, t_end, modelo):
+    # Convertir a arrays de NumPy (sin copiar si ya lo son)
+    time_arr = np.asarray(time_stamps)
+    data_arr = np.asarray(data_arr)
+
     # Seleccionar muestras dentro del intervalo [t_start, t_end]
-    mask = (time_arr >= t_start) & (time_arr <= t_end)
-    time_recortado = time_arr[mask]
-    data_recortado = data_arr[mask]
+    idx_inicio = buscar_indice(time_arr, t_start, "left", modelo)
+    idx_fin = buscar_indice(time_arr, t_end, "right", modelo)
+    time_recortado = time_arr[idx_inicio:idx_fin]
+    data_recortado = data_arr[idx_inicio:idx_fin]
 
     # Incluir t_start si no está presente
     if time_recortado.size == 0 or not np.isclose(time_recortado[0], t_start):
-        idx = np.searchsorted(time_arr, t_start)
+        idx = idx_inicio
         if idx == 0:
             value_start = data_arr[0]
         elif idx == len(time_arr):
@@ -109,7 +90,7 @@ def recortar_senal(time_stamps, data_arr, t_start, t_end):
 
     # Incluir t_end si no está presente
     if not np.isclose(time_recortado[-1], t_end):
-        idx = np.searchsorted(time_arr, t_end)
+        idx = buscar_indice(time_arr, t_end, "left", modelo)
         if idx == 0:
             value_end = data_arr[0]
         elif idx == len(time_arr):
@@ -119,20 +100,547 @@ def recortar_senal(time_stamps, data_arr, t_start, t_end):
             v0, v1 = data_arr[idx-1], data_arr[idx]
             value_end = v0 + (v1 - v0) * (t_end - t0) / (t1 - t0)
         time_recortado = np.append(time_recortado, t_end)
-        data_recortado = np.append(data_recortado, value_end)
+        # np.append promueve el tipo (un valor float64 convertiría un recorte float32)
+        data_recortado = np.append(data_recortado, np.asarray(value_end, dtype=data_recortado.dtype))
     
-    return time_recortado.tolist(), data_recortado.tolist()
+    return time_recortado, data_recortado
+
+def sincronizar_marcadores(marker_streams, prefijo=""):
+    """Corrige el reloj de los streams de marcadores. Retorna sus SincronizacionStream."""
+    resultado = []
+    for k, m in enumerate(marker_streams):
+        nombre = MetadatosStream.desde_info(m.get("info", {})).nombre or f"Marcadores {k+1}"
+        with registro_etapas.etapa("sincronizacion", detalle=nombre, muestras=len(m.get("time_stamps", []))):
+            resultado.append(sincronizar_stream(m, prefijo + nombre))
+    return resultado
+
+def extraer_triggers(marker_streams, prefijo=""):
+    """Lista ordenada de (tiempo, marker) de los streams de marcadores."""
+    resultado = []
+    for m in marker_streams:
+        for t, marker in zip(m.get("time_stamps", []), m.get("time_series", [])):
+            if isinstance(marker, list) and marker:
+                resultado.append((t, prefijo + marker[0]))
+            elif isinstance(marker, str):
+                resultado.append((t, prefijo + marker))
+    resultado.sort(key=lambda x: x[0])
+    return resultado
+
+def clase_de_marcador(marker):
+    """Texto del marcador sin el prefijo "<archivo>: " que se agrega en el espacio de trabajo."""
+    for prefijo in archivos_espacio:
+        if marker.startswith(prefijo + ": "):
+            return marker[len(prefijo) + 2:]
+    return marker
+
+def triggers_de_canal(clave):
+    """Triggers del archivo al que pertenece el canal (en el espacio de trabajo, solo los de su archivo)."""
+    if " | " not in clave:
+        return triggers
+    prefijo = clave.split(" | ")[0] + ": "
+    return [(t, marker) for t, marker in triggers if marker.startswith(prefijo)]
+
+def preparar_stream_numerico(stream, s_idx, prefijo=""):
+    """
+    Prepara un stream numérico recién cargado (con CARGA_SIN_CORREGIR): convierte sus datos a
+    DTYPE_DATOS, extrae sus metadatos (stream["meta"]), corrige su reloj (stream["sincronizacion"]),
+    ajusta el modelo temporal (si la tasa nominal es regular) y calcula el índice de calidad
+    de cada canal. Retorna (channel_names, modelo, calidades).
+    """
+    y = convertir_precision(stream.get("time_series", None), DTYPE_DATOS)
+    stream["time_series"] = y  # Liberar la copia en float64 si se convirtió
+    if isinstance(y, np.ndarray):
+        stream["precision"] = y.dtype.name  # Para repetir la conversión al releer el stream (sesiones)
+    time_stamps = stream.get("time_stamps", [])
+
+    # Metadatos del header (tipo, tasas, etiquetas), extraídos una sola vez
+    with registro_etapas.etapa("metadatos", detalle=f"Stream {s_idx+1}") as registro:
+        n_canales = (1 if y.ndim == 1 else y.shape[1]) if isinstance(y, np.ndarray) else 1
+        meta = MetadatosStream.desde_info(stream.get("info", {}), n_canales, s_idx)
+        stream["meta"] = meta
+        registro["muestras"] = meta.n_canales
+
+    # Offset y deriva del reloj del emisor; en streams regulares se quita también el jitter
+    with registro_etapas.etapa("sincronizacion", detalle=f"Stream {s_idx+1}",
+                               muestras=len(stream.get("time_stamps", []))):
+        sincronizar_stream(stream, f"{prefijo}Stream {s_idx+1} ({meta.nombre})", meta.srate_nominal)
+    time_stamps = stream["time_stamps"]
+
+    # Modelo lineal de tiempos (solo streams de tasa nominal regular)
+    modelo = None
+    if meta.srate_nominal:
+        with registro_etapas.etapa("modelo_temporal", detalle=f"Stream {s_idx+1}",
+                                   muestras=len(time_stamps)):
+            modelo = ModeloTemporal.desde_marcas(time_stamps, meta.srate_nominal)
+
+    calidades = []
+    if isinstance(y, np.ndarray):
+        with registro_etapas.etapa("calidad", detalle=f"Stream {s_idx+1}", muestras=y.size):
+            calidades = evaluar_stream(y, time_stamps, modelo.srate if modelo is not None else meta.srate_nominal)
+    return meta.etiquetas, modelo, calidades
+
+def resumen_sincronizacion(informe):
+    """Línea para los avisos de carga con la corrección de relojes aplicada."""
+    corregidos = [s for s in informe if s.n_mediciones]
+    if not corregidos:
+        return "Relojes: el archivo no trae mediciones de offset (tiempos sin corregir)."
+    offset_max = max(abs(s.offset) for s in corregidos) * 1e3
+    jitter = [s.jitter_max for s in informe if s.dejitter]
+    texto = (f"Relojes sincronizados en {len(corregidos)} de {len(informe)} streams "
+             f"(offset máx. {offset_max:.2f} ms")
+    if jitter:
+        texto += f", jitter máx. quitado {max(jitter) * 1e3:.2f} ms"
+    return texto + "). Detalle en Archivo > Informe de sincronización."
+
+def sombrear_calidad(ax, calidad, t_inicio=-np.inf, t_fin=np.inf):
+    """Sombrea en el gráfico los intervalos de mala calidad del canal (un color por motivo)."""
+    if calidad is None:
+        return
+    por_motivo = {}
+    for t0, t1, motivo in calidad.intervalos(t_inicio, t_fin):
+        # Con varios motivos se usa el color del más grave (el bit más bajo)
+        bit = motivo & -motivo
+        por_motivo.setdefault(bit, []).append((t0, max(t1 - t0, 0.0)))
+    for bit, tramos in por_motivo.items():
+        ax.broken_barh(tramos, (0, 1), transform=ax.get_xaxis_transform(),
+                       color=COLORES_CALIDAD.get(bit, "gray"), alpha=0.25, label=NOMBRES_MOTIVOS.get(bit))
+
+def resumen_calidad(canales):
+    """Texto con los intervalos de mala calidad por canal, para los avisos de carga."""
+    lineas = []
+    for clave, canal_info in canales.items():
+        calidad = canal_info.get('calidad')
+        if calidad is not None and len(calidad):
+            motivos = np.bitwise_or.reduce(calidad.motivos)
+            lineas.append(f"{clave}: {len(calidad)} intervalo(s) ({describir_motivo(motivos)})")
+    return lineas
+
+def restaurar_recorte(recorte):
+    """Recalcula un recorte guardado en una sesión ({clave, t_inicio, t_fin, modo_calidad})."""
+    canal_info = canales_dict[recorte["clave"]]
+    t_recort, data_recort = recortar_senal(canal_info['time'], canal_info['data'],
+                                           recorte["t_inicio"], recorte["t_fin"], canal_info.get('modelo'))
+    calidad = canal_info.get('calidad')
+    if calidad is not None and len(t_recort) and recorte.get("modo_calidad") == "excluir":
+        buenas = calidad.mascara_buena(t_recort)
+        t_recort, data_recort = t_recort[buenas], data_recort[buenas]
+    return t_recort, data_recort
+
+def llave_espectrograma(clave, canal_info):
+    """
+    Llave de las teselas del espectrograma de un canal: identifica sus datos, así que cambia si
+    el XDF se sobrescribe (tamaño y fecha), con la sincronización de relojes o con los filtros
+    aplicados. Sin archivo de origen se usa un hash del contenido.
+    """
+    stream = canal_info['stream']
+    if isinstance(stream, StreamDiferido):
+        ruta = stream.llave[0]
+    else:
+        ruta = archivos_espacio.get(clave.split(" | ")[0], ruta_archivo_actual)
+    if ruta and os.path.exists(ruta):
+        estado = os.stat(ruta)
+        origen = f"{os.path.abspath(ruta)}|{estado.st_size}|{estado.st_mtime_ns}"
+    else:
+        origen = hashlib.sha1(np.ascontiguousarray(canal_info['data'])).hexdigest()
+    sincronizacion = stream.get("sincronizacion")
+    reloj = "" if sincronizacion is None else sincronizacion.a_dict()
+    return f"{origen}|{clave}|{reloj}|{stream.get('cadenas_filtro', [])}"
+
+def nombre_de_archivo(ruta):
+    """Nombre con el que se lista un archivo individual en la vista general."""
+    return os.path.splitext(os.path.basename(ruta))[0]
+
+def calcular_vistas_generales(canales, marcadores, nombre):
+    """
+    Vista general de cada archivo de `canales`: {nombre (o prefijo del espacio de trabajo): VistaGeneral}.
+    Los canales "<prefijo> | ..." se agrupan por archivo con sus marcadores "<prefijo>: ..."; el
+    resto pertenece a `nombre`, con todos los marcadores sin prefijo.
+    """
+    grupos = {}
+    for clave, canal_info in canales.items():
+        archivo = clave.split(" | ")[0] if " | " in clave else None
+        grupos.setdefault(archivo, {})[clave] = canal_info
+    vistas = {}
+    for archivo, canales_archivo in grupos.items():
+        if archivo is None:
+            marcas = list(marcadores)
+        else:
+            prefijo = archivo + ": "
+            marcas = [(t, marker[len(prefijo):]) for t, marker in marcadores if marker.startswith(prefijo)]
+        archivo = nombre if archivo is None else archivo
+        with registro_etapas.etapa("vista_general", detalle=archivo,
+                                   muestras=sum(len(c['time']) for c in canales_archivo.values())):
+            vista = VistaGeneral.desde_canales(canales_archivo, marcas)
+        if vista is not None:
+            vistas[archivo] = vista
+    return vistas
 
 def pupil_process(data, sampling_rate):
     processed_signal = np.array(data) * 0.95  # Ejemplo: atenuar la señal
     metrics = {"Media": np.mean(processed_signal), "Desviación": np.std(processed_signal)}
     return {"processed_signal": processed_signal, "metrics": metrics}
 
+class PanelRendimiento(QtWidgets.QDockWidget):
+    """Panel acoplable que muestra, etapa por etapa, los tiempos y la memoria registrados."""
+    COLUMNAS = ["Etapa", "Detalle", "Pared (s)", "CPU (s)", "Muestras", "Muestras/s", "Memoria pico (MB)"]
+
+    registroNuevo = QtCore.pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super(PanelRendimiento, self).__init__("Rendimiento", parent)
+        self.tabla = QtWidgets.QTableWidget(0, len(self.COLUMNAS))
+        self.tabla.setHorizontalHeaderLabels(self.COLUMNAS)
+        self.tabla.horizontalHeader().setStretchLastSection(True)
+        self.tabla.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tabla.cellDoubleClicked.connect(self.mostrar_perfil)
+        self.setWidget(self.tabla)
+        self._registros = []
+        # Las etapas pueden terminar en otros hilos: la tabla se actualiza vía señal
+        self.registroNuevo.connect(self.agregar_registro)
+        self._emitir = self.registroNuevo.emit
+        registro_etapas.al_registrar.append(self._emitir)
+
+    def desconectar(self):
+        """Deja de recibir registros (al cerrar la ventana: la señal dejará de existir)."""
+        if self._emitir in registro_etapas.al_registrar:
+            registro_etapas.al_registrar.remove(self._emitir)
+
+    def agregar_registro(self, registro):
+        fila = self.tabla.rowCount()
+        self.tabla.insertRow(fila)
+        memoria = registro.get("memoria_pico")
+        velocidad = registro.get("muestras_por_s")
+        valores = [
+            registro["etapa"],
+            str(registro.get("detalle", "")),
+            f"{registro['tiempo_pared']:.3f}",
+            f"{registro['tiempo_cpu']:.3f}",
+            str(registro.get("muestras") or 0),
+            f"{velocidad:,.0f}" if velocidad else "",
+            f"{memoria / 1e6:.1f}" if memoria is not None else "",
+        ]
+        for col, valor in enumerate(valores):
+            self.tabla.setItem(fila, col, QtWidgets.QTableWidgetItem(valor))
+        self._registros.append(registro)
+        self.tabla.scrollToBottom()
+
+    def mostrar_perfil(self, fila, _columna):
+        perfil = self._registros[fila].get("perfil")
+        if not perfil:
+            return
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle(f"Perfil cProfile - {self._registros[fila]['etapa']}")
+        dialog.resize(800, 500)
+        layout = QtWidgets.QVBoxLayout(dialog)
+        texto = QtWidgets.QPlainTextEdit(perfil)
+        texto.setReadOnly(True)
+        layout.addWidget(texto)
+        dialog.exec_()
+
+    def limpiar(self):
+        registro_etapas.limpiar()
+        self._registros = []
+        self.tabla.setRowCount(0)
+
+class PanelExportaciones(QtWidgets.QDockWidget):
+    """
+    Panel acoplable con la cola de exportaciones: una fila por archivo con su barra de
+    progreso. Los hilos de escritura solo actualizan contadores; el panel los consulta
+    periódicamente mientras quedan trabajos pendientes.
+    """
+    COLUMNAS = ["Archivo", "Filas", "Progreso", "Estado"]
+    INTERVALO_MS = 200
+
+    def __init__(self, cola, parent=None):
+        super(PanelExportaciones, self).__init__("Exportaciones", parent)
+        self.cola = cola
+        widget = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(widget)
+        self.tabla = QtWidgets.QTableWidget(0, len(self.COLUMNAS))
+        self.tabla.setHorizontalHeaderLabels(self.COLUMNAS)
+        self.tabla.horizontalHeader().setStretchLastSection(True)
+        self.tabla.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.tabla)
+        btnLimpiar = QtWidgets.QPushButton("Quitar terminados")
+        btnLimpiar.clicked.connect(self.limpiar_terminados)
+        layout.addWidget(btnLimpiar)
+        self.setWidget(widget)
+        self._filas = []  # (trabajo, barra de progreso)
+        self.temporizador = QtCore.QTimer(self)
+        self.temporizador.setInterval(self.INTERVALO_MS)
+        self.temporizador.timeout.connect(self.actualizar)
+
+    def agregar(self, trabajo):
+        fila = self.tabla.rowCount()
+        self.tabla.insertRow(fila)
+        self.tabla.setItem(fila, 0, QtWidgets.QTableWidgetItem(trabajo.ruta))
+        self.tabla.setItem(fila, 1, QtWidgets.QTableWidgetItem(str(trabajo.total)))
+        barra = QtWidgets.QProgressBar()
+        barra.setRange(0, max(trabajo.total, 1))
+        self.tabla.setCellWidget(fila, 2, barra)
+        self.tabla.setItem(fila, 3, QtWidgets.QTableWidgetItem(trabajo.estado))
+        self._filas.append((trabajo, barra))
+        self.show()
+        self.temporizador.start()
+
+    def actualizar(self):
+        for fila, (trabajo, barra) in enumerate(self._filas):
+            barra.setValue(trabajo.escritas)
+            estado = trabajo.estado
+            if estado == exportacion.TERMINADO and trabajo.duracion is not None:
+                estado = f"{estado} ({trabajo.duracion:.1f} s)"
+            elif estado == exportacion.ERROR:
+                estado = f"{estado}: {trabajo.error}"
+            self.tabla.item(fila, 3).setText(estado)
+        if not self.cola.pendientes():
+            self.temporizador.stop()
+
+    def limpiar_terminados(self):
+        self.cola.limpiar_terminados()
+        self._filas = []
+        self.tabla.setRowCount(0)
+        for trabajo in self.cola.trabajos:
+            self.agregar(trabajo)
+
+class PanelVistaGeneral(QtWidgets.QDockWidget):
+    """
+    Franja de navegación sobre la ventana: la envolvente de cada canal y la densidad de
+    marcadores por clase del archivo elegido, dibujadas desde su VistaGeneral (calculada al
+    cargar), así que nunca recorre las señales completas. Arrastrando sobre las envolventes se
+    elige un intervalo, que se puede ajustar a los marcadores más cercanos y llevar al diálogo
+    de recorte.
+    """
+    ALTO_MINIMO = 220
+
+    intervaloElegido = QtCore.pyqtSignal(float, float)
+
+    def __init__(self, parent=None):
+        super(PanelVistaGeneral, self).__init__("Vista general", parent)
+        widget = QtWidgets.QWidget()
+        self.layoutPanel = QtWidgets.QVBoxLayout(widget)
+        barra = QtWidgets.QHBoxLayout()
+        barra.addWidget(QtWidgets.QLabel("Archivo:"))
+        self.comboArchivo = QtWidgets.QComboBox()
+        self.comboArchivo.currentTextChanged.connect(self.dibujar)
+        barra.addWidget(self.comboArchivo)
+        self.checkAjustar = QtWidgets.QCheckBox("Ajustar a marcadores")
+        barra.addWidget(self.checkAjustar)
+        self.labelSeleccion = QtWidgets.QLabel("Arrastre sobre las señales para elegir un intervalo.")
+        barra.addWidget(self.labelSeleccion, 1)
+        self.btnCortar = QtWidgets.QPushButton("Cortar intervalo...")
+        self.btnCortar.setEnabled(False)
+        self.btnCortar.clicked.connect(self.cortar_seleccion)
+        barra.addWidget(self.btnCortar)
+        self.layoutPanel.addLayout(barra)
+        self.setWidget(widget)
+        self.figura = None   # Figura y lienzo se crean al primer dibujo (matplotlib es diferido)
+        self.lienzo = None
+        self.selector = None
+        self.seleccion = None
+
+    def vista_actual(self):
+        return vistas_generales.get(self.comboArchivo.currentText())
+
+    def actualizar(self):
+        """Vuelve a listar los archivos tras una carga y muestra el panel si hay alguno."""
+        actual = self.comboArchivo.currentText()
+        self.comboArchivo.blockSignals(True)
+        self.comboArchivo.clear()
+        self.comboArchivo.addItems(list(vistas_generales))
+        if actual in vistas_generales:
+            self.comboArchivo.setCurrentText(actual)
+        self.comboArchivo.blockSignals(False)
+        self.dibujar()
+        if vistas_generales:
+            self.show()
+
+    def dibujar(self, *_):
+        self.limpiar_seleccion()
+        vista = self.vista_actual()
+        if vista is None and self.figura is None:
+            return
+        if self.figura is None:
+            self.figura = mpl_figure.Figure(figsize=(10, 3))
+            self.lienzo = backend_qtagg.FigureCanvasQTAgg(self.figura)
+            self.lienzo.setMinimumHeight(self.ALTO_MINIMO)
+            self.layoutPanel.addWidget(self.lienzo)
+        self.figura.clear()
+        self.selector = None
+        if vista is None:
+            self.lienzo.draw_idle()
+            return
+        n_clases = max(len(vista.clases), 1)
+        axSenales, axMarcadores = self.figura.subplots(
+            2, 1, sharex=True, gridspec_kw={"height_ratios": [max(len(vista.envolventes), 1), n_clases]})
+        centros = 0.5 * (vista.bordes[:-1] + vista.bordes[1:])
+        filas = list(vista.envolventes.items())
+        for fila, (clave, (minimos, maximos)) in enumerate(filas):
+            if np.all(np.isnan(minimos)):
+                continue
+            # Cada canal se normaliza a su propia fila, la primera arriba
+            base = len(filas) - 1 - fila
+            bajo, alto = np.nanmin(minimos), np.nanmax(maximos)
+            escala = 0.9 / (alto - bajo) if alto > bajo else 0.0
+            axSenales.fill_between(centros, base + 0.05 + (minimos - bajo) * escala,
+                                   base + 0.05 + (maximos - bajo) * escala, step="mid", linewidth=0)
+        axSenales.set_yticks([len(filas) - 0.5 - fila for fila in range(len(filas))])
+        axSenales.set_yticklabels([clave.split(" | ")[-1] for clave, _ in filas], fontsize=7)
+        axSenales.set_ylim(0, max(len(filas), 1))
+        axSenales.set_xlim(vista.t_inicio, vista.t_fin)
+        if vista.clases:
+            axMarcadores.imshow(vista.densidad, aspect="auto", interpolation="nearest", cmap="Greys",
+                                extent=(vista.t_inicio, vista.t_fin, len(vista.clases), 0))
+            axMarcadores.set_yticks(np.arange(len(vista.clases)) + 0.5)
+            axMarcadores.set_yticklabels(vista.clases, fontsize=7)
+        else:
+            axMarcadores.set_yticks([])
+            axMarcadores.text(0.5, 0.5, "Sin marcadores", transform=axMarcadores.transAxes,
+                              ha="center", va="center", fontsize=8)
+        axMarcadores.set_xlabel("Tiempo (s)")
+        self.figura.tight_layout()
+        self.selector = mpl_widgets.SpanSelector(axSenales, self.seleccionar, "horizontal", useblit=True,
+                                                 interactive=True, props={"alpha": 0.3, "facecolor": "tab:orange"})
+        self.lienzo.draw_idle()
+
+    def seleccionar(self, t_inicio, t_fin):
+        vista = self.vista_actual()
+        if vista is None:
+            return
+        if self.checkAjustar.isChecked():
+            t_inicio, t_fin = vista.marcador_mas_cercano(t_inicio), vista.marcador_mas_cercano(t_fin)
+            if self.selector is not None and t_fin > t_inicio:
+                self.selector.extents = (t_inicio, t_fin)
+        if t_fin <= t_inicio:
+            self.limpiar_seleccion()
+            return
+        self.seleccion = (t_inicio, t_fin)
+        self.labelSeleccion.setText(f"{t_inicio:.3f} s - {t_fin:.3f} s ({t_fin - t_inicio:.1f} s, "
+                                    f"{vista.marcadores_entre(t_inicio, t_fin)} marcadores)")
+        self.btnCortar.setEnabled(True)
+
+    def limpiar_seleccion(self):
+        self.seleccion = None
+        self.labelSeleccion.setText("Arrastre sobre las señales para elegir un intervalo.")
+        self.btnCortar.setEnabled(False)
+
+    def cortar_seleccion(self):
+        if self.seleccion is not None:
+            self.intervaloElegido.emit(*self.seleccion)
+
+class ModeloCanales(QtCore.QAbstractListModel):
+    """
+    Modelo de lista sobre un IndiceCanales: la vista solo pide las filas visibles, y filtrar
+    cambia la lista de filas sin volver a crear ítems.
+    """
+
+    def __init__(self, indice, parent=None):
+        super(ModeloCanales, self).__init__(parent)
+        self.indice = indice
+        self.filas = list(range(len(indice)))
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.filas)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if index.isValid() and role == QtCore.Qt.DisplayRole:
+            return self.indice.textos[self.filas[index.row()]]
+        return None
+
+    def filtrar(self, texto, tipo=None):
+        self.beginResetModel()
+        self.filas = self.indice.filtrar(texto, tipo)
+        self.endResetModel()
+
+class SelectorCanales(QtWidgets.QWidget):
+    """
+    Lista de canales con búsqueda por texto y filtro por tipo. La selección se conserva al
+    cambiar el filtro, de modo que se pueden combinar canales de varias búsquedas.
+    """
+    TODOS_LOS_TIPOS = "Todos los tipos"
+
+    def __init__(self, indice, parent=None):
+        super(SelectorCanales, self).__init__(parent)
+        self.modelo = ModeloCanales(indice, self)
+        self.marcadas = set()
+        self._restaurando = False
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        filtroLayout = QtWidgets.QHBoxLayout()
+        self.editBuscar = QtWidgets.QLineEdit()
+        self.editBuscar.setPlaceholderText("Buscar por stream, tipo o etiqueta...")
+        self.editBuscar.setClearButtonEnabled(True)
+        self.comboTipo = QtWidgets.QComboBox()
+        self.comboTipo.addItems([self.TODOS_LOS_TIPOS] + indice.tipos_disponibles)
+        filtroLayout.addWidget(self.editBuscar)
+        filtroLayout.addWidget(self.comboTipo)
+        layout.addLayout(filtroLayout)
+
+        self.vista = QtWidgets.QListView()
+        self.vista.setUniformItemSizes(True)
+        self.vista.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
+        self.vista.setModel(self.modelo)
+        layout.addWidget(self.vista)
+
+        botonesLayout = QtWidgets.QHBoxLayout()
+        self.labelConteo = QtWidgets.QLabel()
+        btnTodos = QtWidgets.QPushButton("Seleccionar visibles")
+        btnNinguno = QtWidgets.QPushButton("Limpiar selección")
+        botonesLayout.addWidget(self.labelConteo)
+        botonesLayout.addStretch()
+        botonesLayout.addWidget(btnTodos)
+        botonesLayout.addWidget(btnNinguno)
+        layout.addLayout(botonesLayout)
+
+        self.editBuscar.textChanged.connect(self.aplicar_filtro)
+        self.comboTipo.currentIndexChanged.connect(self.aplicar_filtro)
+        self.vista.selectionModel().selectionChanged.connect(self.actualizar_marcadas)
+        btnTodos.clicked.connect(self.vista.selectAll)
+        btnNinguno.clicked.connect(self.limpiar_seleccion)
+        self.actualizar_conteo()
+
+    def aplicar_filtro(self):
+        tipo = self.comboTipo.currentText()
+        self._restaurando = True
+        self.modelo.filtrar(self.editBuscar.text(), None if tipo == self.TODOS_LOS_TIPOS else tipo)
+        # Volver a marcar las filas visibles que ya estaban seleccionadas
+        seleccion = QtCore.QItemSelection()
+        for posicion, fila in enumerate(self.modelo.filas):
+            if fila in self.marcadas:
+                indice = self.modelo.index(posicion)
+                seleccion.select(indice, indice)
+        self.vista.selectionModel().select(seleccion, QtCore.QItemSelectionModel.Select)
+        self._restaurando = False
+        self.actualizar_conteo()
+
+    def actualizar_marcadas(self, seleccionados, deseleccionados):
+        if self._restaurando:
+            return
+        for indice in seleccionados.indexes():
+            self.marcadas.add(self.modelo.filas[indice.row()])
+        for indice in deseleccionados.indexes():
+            self.marcadas.discard(self.modelo.filas[indice.row()])
+        self.actualizar_conteo()
+
+    def limpiar_seleccion(self):
+        self.vista.clearSelection()
+        self.marcadas.clear()
+        self.actualizar_conteo()
+
+    def actualizar_conteo(self):
+        self.labelConteo.setText(f"{len(self.modelo.filas)} visibles, {len(self.marcadas)} seleccionados")
+
+    def seleccionados(self):
+        """Textos de las filas seleccionadas (incluidas las ocultas por el filtro actual)."""
+        return [self.modelo.indice.textos[f] for f in sorted(self.marcadas)]
+
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
         super(MainWindow, self).__init__()
         self.setWindowTitle("Visualizador y Procesador de Señales XDF")
         self.resize(600, 400)
+        self.colaExportacion = exportacion.ColaExportacion()
+        self.plantillaExportacion = exportacion.PLANTILLA_POR_DEFECTO
         self.setupUI()
 
     def setupUI(self):
@@ -148,6 +656,26 @@ class MainWindow(QtWidgets.QMainWindow):
         cargarAction = QtWidgets.QAction("Cargar archivo XDF", self)
         cargarAction.triggered.connect(self.cargar_archivo)
         archivoMenu.addAction(cargarAction)
+        espacioAction = QtWidgets.QAction("Agregar archivos al espacio de trabajo...", self)
+        espacioAction.triggered.connect(self.agregar_archivos_espacio)
+        archivoMenu.addAction(espacioAction)
+        presupuestoAction = QtWidgets.QAction("Presupuesto de memoria del espacio de trabajo...", self)
+        presupuestoAction.triggered.connect(self.cambiar_presupuesto_memoria)
+        archivoMenu.addAction(presupuestoAction)
+        abrirSesionAction = QtWidgets.QAction("Abrir sesión...", self)
+        abrirSesionAction.triggered.connect(self.abrir_sesion)
+        archivoMenu.addAction(abrirSesionAction)
+        guardarSesionAction = QtWidgets.QAction("Guardar sesión...", self)
+        guardarSesionAction.triggered.connect(self.guardar_sesion)
+        archivoMenu.addAction(guardarSesionAction)
+        sincronizacionAction = QtWidgets.QAction("Informe de sincronización de relojes...", self)
+        sincronizacionAction.triggered.connect(self.mostrar_informe_sincronizacion)
+        archivoMenu.addAction(sincronizacionAction)
+        archivoMenu.addSeparator()
+        float32Action = QtWidgets.QAction("Almacenar señales en float32 (menos memoria)", self, checkable=True)
+        float32Action.setChecked(DTYPE_DATOS == np.float32)
+        float32Action.toggled.connect(self.cambiar_precision)
+        archivoMenu.addAction(float32Action)
         salirAction = QtWidgets.QAction("Salir", self)
         salirAction.triggered.connect(self.close)
         archivoMenu.addAction(salirAction)
@@ -156,25 +684,243 @@ class MainWindow(QtWidgets.QMainWindow):
         graficarAction = QtWidgets.QAction("Graficar canales", self)
         graficarAction.triggered.connect(self.abrir_menu_graficar)
         procesarMenu.addAction(graficarAction)
+        espectrogramaAction = QtWidgets.QAction("Espectrograma (tiempo-frecuencia)...", self)
+        espectrogramaAction.triggered.connect(self.abrir_menu_espectrograma)
+        procesarMenu.addAction(espectrogramaAction)
+        filtrarAction = QtWidgets.QAction("Filtrar streams (notch, pasabanda, tendencia)", self)
+        filtrarAction.triggered.connect(self.abrir_menu_filtrar)
+        procesarMenu.addAction(filtrarAction)
         cortarAction = QtWidgets.QAction("Cortar señal según triggers", self)
-        cortarAction.triggered.connect(self.abrir_menu_cortar_triggers)
+        cortarAction.triggered.connect(lambda: self.abrir_menu_cortar_triggers())
         procesarMenu.addAction(cortarAction)
         neurokitAction = QtWidgets.QAction("Procesar con NeuroKit", self)
         neurokitAction.triggered.connect(self.procesar_neurokit)
         procesarMenu.addAction(neurokitAction)
+        hrvAction = QtWidgets.QAction("HRV por lotes (picos R e índices)...", self)
+        hrvAction.triggered.connect(self.abrir_menu_hrv_lote)
+        procesarMenu.addAction(hrvAction)
+        promediosAction = QtWidgets.QAction("Promedios por evento (ERP)...", self)
+        promediosAction.triggered.connect(self.abrir_menu_promedios)
+        procesarMenu.addAction(promediosAction)
+
+        self.panelRendimiento = PanelRendimiento(self)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.panelRendimiento)
+        self.panelRendimiento.hide()
+        self.panelExportaciones = PanelExportaciones(self.colaExportacion, self)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.panelExportaciones)
+        self.panelExportaciones.hide()
+        self.panelVistaGeneral = PanelVistaGeneral(self)
+        self.addDockWidget(QtCore.Qt.TopDockWidgetArea, self.panelVistaGeneral)
+        self.panelVistaGeneral.hide()
+        self.panelVistaGeneral.intervaloElegido.connect(
+            lambda t_inicio, t_fin: self.abrir_menu_cortar_triggers(intervalo=(t_inicio, t_fin)))
+        procesarMenu.addSeparator()
+        vistaGeneralAction = self.panelVistaGeneral.toggleViewAction()
+        vistaGeneralAction.setText("Mostrar vista general (navegación y selección de intervalos)")
+        procesarMenu.addAction(vistaGeneralAction)
+
+        rendimientoMenu = menubar.addMenu("Rendimiento")
+        panelAction = self.panelRendimiento.toggleViewAction()
+        panelAction.setText("Mostrar panel de rendimiento")
+        rendimientoMenu.addAction(panelAction)
+        exportacionesAction = self.panelExportaciones.toggleViewAction()
+        exportacionesAction.setText("Mostrar cola de exportaciones")
+        rendimientoMenu.addAction(exportacionesAction)
+        perfilarAction = QtWidgets.QAction("Perfilar etapas con cProfile", self, checkable=True)
+        perfilarAction.toggled.connect(lambda activo: setattr(registro_etapas, "perfilar", activo))
+        rendimientoMenu.addAction(perfilarAction)
+        memoriaAction = QtWidgets.QAction("Medir memoria pico", self, checkable=True)
+        memoriaAction.setChecked(registro_etapas.medir_memoria)
+        memoriaAction.toggled.connect(lambda activo: setattr(registro_etapas, "medir_memoria", activo))
+        rendimientoMenu.addAction(memoriaAction)
+        exportarRegistroAction = QtWidgets.QAction("Exportar registro de tiempos", self)
+        exportarRegistroAction.triggered.connect(self.exportar_registro_tiempos)
+        rendimientoMenu.addAction(exportarRegistroAction)
+        limpiarRegistroAction = QtWidgets.QAction("Limpiar registro", self)
+        limpiarRegistroAction.triggered.connect(self.panelRendimiento.limpiar)
+        rendimientoMenu.addAction(limpiarRegistroAction)
+
+    def closeEvent(self, event):
+        # Las exportaciones en curso se terminan de escribir antes de salir
+        self.colaExportacion.cerrar(esperar=True)
+        self.panelRendimiento.desconectar()
+        cache_streams.limpiar()  # Borra también el directorio temporal de arrays desalojados
+        super(MainWindow, self).closeEvent(event)
+
+    def exportar_registro_tiempos(self):
+        if not registro_etapas.registros:
+            QtWidgets.QMessageBox.warning(self, "Advertencia", "Todavía no hay etapas registradas.")
+            return
+        ruta, filtro = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Exportar registro de tiempos", "", "JSON (*.json);;CSV (*.csv)")
+        if not ruta:
+            return
+        try:
+            if ruta.lower().endswith(".csv") or filtro.startswith("CSV"):
+                registro_etapas.exportar_csv(ruta)
+            else:
+                registro_etapas.exportar_json(ruta)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo exportar el registro:\n{e}")
+
+    def agregar_archivos_espacio(self):
+        """
+        Abre uno o varios archivos XDF sin descartar los ya cargados. Los canales se nombran
+        "<archivo> | Stream k - etiqueta" y los triggers "<archivo>: marker". Cada stream se
+        lee por separado (select_streams) y sus datos pasan a la caché compartida, que desaloja
+        los menos usados cuando se supera el presupuesto de memoria.
+        """
+        global canales_dict, triggers, indice_canales
+        rutas, _ = QtWidgets.QFileDialog.getOpenFileNames(self, "Agregar archivos XDF", "", "Archivos XDF (*.xdf)")
+        if not rutas:
+            return
+        errores = []
+        avisos_calidad = []
+        n_informe = len(informe_sincronizacion)
+        for ruta in rutas:
+            if ruta in archivos_espacio.values():
+                continue
+            prefijo = prefijo_archivo(ruta, archivos_espacio)
+            try:
+                with registro_etapas.etapa("carga_espacio", detalle=ruta) as registro:
+                    nuevos_canales, nuevos_triggers, registro["muestras"] = self.leer_archivo_diferido(ruta, prefijo)
+            except Exception as e:
+                errores.append(f"{os.path.basename(ruta)}: {e}")
+                continue
+            archivos_espacio[prefijo] = ruta
+            canales_dict.update(nuevos_canales)
+            # Se calcula ya, mientras los streams recién leídos siguen en la caché
+            vistas_generales.update(calcular_vistas_generales(nuevos_canales, nuevos_triggers, prefijo))
+            avisos_calidad.extend(resumen_calidad(nuevos_canales))
+            triggers = sorted(triggers + nuevos_triggers, key=lambda x: x[0])
+        indice_canales = IndiceCanales.desde_canales(canales_dict)
+        mensaje = (f"Archivos en el espacio de trabajo: {len(archivos_espacio)}\n"
+                   f"Canales: {len(canales_dict)}\n"
+                   f"Memoria en uso: {cache_streams.en_memoria / 1e6:.1f} MB de "
+                   f"{cache_streams.presupuesto / 1e6:.0f} MB")
+        if len(informe_sincronizacion) > n_informe:
+            mensaje += "\n\n" + resumen_sincronizacion(informe_sincronizacion[n_informe:])
+        if avisos_calidad:
+            mensaje += "\n\nIntervalos de mala calidad:\n" + "\n".join(avisos_calidad[:20])
+        if errores:
+            mensaje += "\n\nNo se pudieron cargar:\n" + "\n".join(errores)
+        self.panelVistaGeneral.actualizar()
+        QtWidgets.QMessageBox.information(self, "Espacio de trabajo", mensaje)
+
+    def leer_archivo_diferido(self, ruta, prefijo):
+        """
+        Retorna (canales, triggers, muestras) de un archivo, con los datos en cache_streams.
+        pyxdf recorre el archivo completo en cada load_xdf (también con select_streams), así
+        que todos sus streams se leen en una sola llamada y pasan uno a uno a la caché.
+        """
+        data, _ = pyxdf.load_xdf(ruta, **CARGA_SIN_CORREGIR)
+        marker_streams = [s for s in data if isinstance(s.get("time_series"), list)]
+        numeric_streams = [s for s in data if isinstance(s.get("time_series"), np.ndarray)]
+        del data
+
+        informe_sincronizacion.extend(sincronizar_marcadores(marker_streams, prefijo=f"{prefijo} | "))
+        nuevos_triggers = extraer_triggers(marker_streams, prefijo=f"{prefijo}: ")
+
+        canales = {}
+        muestras = 0
+        for s_idx in range(len(numeric_streams)):
+            # Se suelta la referencia de la lista: la caché decide qué arrays quedan en memoria
+            crudo, numeric_streams[s_idx] = numeric_streams[s_idx], None
+            channel_names, modelo, calidades = preparar_stream_numerico(crudo, s_idx, prefijo=f"{prefijo} | ")
+            informe_sincronizacion.append(crudo["sincronizacion"])
+            muestras += len(crudo.get("time_stamps", []))
+            stream = StreamDiferido(crudo, cache_streams, (ruta, crudo["meta"].stream_id))
+            for i, nombre in enumerate(channel_names):
+                canales[f"{prefijo} | Stream {s_idx+1} - {nombre}"] = CanalDiferido(stream, i, modelo, calidades[i])
+        return canales, nuevos_triggers, muestras
+
+    def cambiar_presupuesto_memoria(self):
+        actual = int(cache_streams.presupuesto / 1024 ** 2)
+        valor, ok = QtWidgets.QInputDialog.getInt(
+            self, "Presupuesto de memoria", "Memoria máxima para los datos de los streams (MB):",
+            actual, 64, 1024 * 1024)
+        if ok:
+            cache_streams.cambiar_presupuesto(valor * 1024 ** 2)
+
+    def guardar_sesion(self):
+        """
+        Guarda canales, triggers, recortes (como intervalos) y resultados de NeuroKit. Las señales
+        no se copian: la sesión se refiere a los XDF de origen y los vuelve a leer al usarlas.
+        """
+        if not canales_dict:
+            QtWidgets.QMessageBox.warning(self, "Advertencia", "Primero debes cargar un archivo XDF.")
+            return
+        ruta, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Guardar sesión", "", f"Sesión XDF (*{EXTENSION_SESION})")
+        if not ruta:
+            return
+        try:
+            with registro_etapas.etapa("guardar_sesion", detalle=ruta):
+                guardar_sesion(ruta, ruta_archivo_actual, canales_dict, triggers, recortes_guardados,
+                               resultados_procesados, informe_sincronizacion, archivos_espacio, vistas_generales)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo guardar la sesión:\n{e}")
+
+    def abrir_sesion(self):
+        global canales_dict, triggers, recortes_guardados, indice_canales, resultados_procesados, ruta_archivo_actual
+        global informe_sincronizacion
+        ruta, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Abrir sesión", "", f"Sesión XDF (*{EXTENSION_SESION})")
+        if not ruta:
+            return
+        try:
+            with registro_etapas.etapa("abrir_sesion", detalle=ruta):
+                archivos_espacio.clear()
+                cache_streams.limpiar()
+                sesion = cargar_sesion(ruta, cache_streams)
+                archivos_espacio.update(sesion["espacio"])
+                canales_dict = sesion["canales_dict"]
+                triggers = sesion["triggers"]
+                resultados_procesados = sesion["resultados"]
+                informe_sincronizacion = sesion["sincronizacion"]
+                # Los recortes se recalculan (leyendo su XDF) la primera vez que se usan
+                recortes_guardados = {recorte["clave"]: RecorteDiferido(recorte, restaurar_recorte)
+                                      for recorte in sesion["recortes"]}
+                indice_canales = IndiceCanales.desde_canales(canales_dict)
+                ruta_archivo_actual = sesion["xdf"]
+                vistas_generales.clear()
+                vistas_generales.update(sesion["vistas"])
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo abrir la sesión:\n{e}")
+            return
+        self.panelVistaGeneral.actualizar()
+        QtWidgets.QMessageBox.information(self, "Sesión cargada",
+            f"{len(canales_dict)} canales, {len(recortes_guardados)} recortes y "
+            f"{len(resultados_procesados)} resultados restaurados.")
+
+    def cambiar_precision(self, activo):
+        """Se aplica en la próxima carga de archivo."""
+        global DTYPE_DATOS
+        DTYPE_DATOS = np.float32 if activo else np.float64
 
     def cargar_archivo(self):
-        global canales_dict, triggers, recortes_guardados
+        global canales_dict, triggers, recortes_guardados, indice_canales, resultados_procesados, ruta_archivo_actual
+        global informe_sincronizacion
         canales_dict = {}
         triggers = []
         recortes_guardados = {}
+        indice_canales = IndiceCanales()
+        resultados_procesados = {}
+        informe_sincronizacion = []
+        archivos_espacio.clear()
+        cache_streams.limpiar()
+        vistas_generales.clear()
 
         ruta_archivo, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Seleccionar archivo XDF", "", "Archivos XDF (*.xdf)")
         if not ruta_archivo:
             return
+        ruta_archivo_actual = ruta_archivo
 
         try:
-            data, header = pyxdf.load_xdf(ruta_archivo)
+            with registro_etapas.etapa("carga", detalle=ruta_archivo) as registro:
+                # Tiempos tal como se grabaron: la sincronización de relojes se hace después
+                data, header = pyxdf.load_xdf(ruta_archivo, **CARGA_SIN_CORREGIR)
+                registro["muestras"] = sum(len(s.get("time_stamps", [])) for s in data)
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo cargar el archivo:\n{e}")
             return
@@ -193,45 +939,70 @@ class MainWindow(QtWidgets.QMainWindow):
                 QtWidgets.QMessageBox.critical(self, "Error", "Formato de stream desconocido")
                 return
 
-        for m in marker_streams:
-            for t, marker in zip(m.get("time_stamps", []), m.get("time_series", [])):
-                if isinstance(marker, list) and marker:
-                    triggers.append((t, marker[0]))
-                elif isinstance(marker, str):
-                    triggers.append((t, marker))
-        triggers.sort(key=lambda x: x[0])
+        informe_sincronizacion = sincronizar_marcadores(marker_streams)
+        triggers = extraer_triggers(marker_streams)
 
+        avisos_cortes = []
         for s_idx, stream in enumerate(numeric_streams):
-            y = stream.get("time_series", None)
-            time_stamps = stream.get("time_stamps", [])
-            info = stream.get("info", {})
-
-            channel_names = obtener_nombres_de_canales(info)
-            if isinstance(y, np.ndarray):
-                n_canales = 1 if y.ndim == 1 else y.shape[1]
-            else:
-                n_canales = 1
-
-            if not channel_names or len(channel_names) < n_canales:
-                if "name" in info and info["name"]:
-                    base_name = info["name"][0] if isinstance(info["name"], list) else info["name"]
-                else:
-                    base_name = f"Stream {s_idx+1}"
-                if n_canales == 1:
-                    channel_names = [base_name]
-                else:
-                    channel_names = [f"{base_name} {i+1}" for i in range(n_canales)]
-
-            for i in range(n_canales):
-                etiqueta = f"Stream {s_idx+1} - {channel_names[i]}"
+            channel_names, modelo, calidades = preparar_stream_numerico(stream, s_idx)
+            informe_sincronizacion.append(stream["sincronizacion"])
+            if modelo is not None and modelo.cortes:
+                avisos_cortes.append(f"Stream {s_idx+1}: {len(modelo.cortes)} corte(s) en los datos")
+            y = stream["time_series"]
+            for i, nombre in enumerate(channel_names):
+                etiqueta = f"Stream {s_idx+1} - {nombre}"
                 canal_data = y if y.ndim == 1 else y[:, i]
                 canales_dict[etiqueta] = {
                     'stream': stream,
                     'canal_idx': i,
-                    'time': time_stamps,
-                    'data': canal_data
+                    'time': stream.get("time_stamps", []),
+                    'data': canal_data,
+                    'modelo': modelo,
+                    'calidad': calidades[i]
                 }
-        QtWidgets.QMessageBox.information(self, "Carga completada", "Archivo cargado y canales extraídos correctamente.")
+        indice_canales = IndiceCanales.desde_canales(canales_dict)
+        vistas_generales.update(calcular_vistas_generales(canales_dict, triggers, nombre_de_archivo(ruta_archivo)))
+        self.panelVistaGeneral.actualizar()
+        memoria_mb = memoria_canales(canales_dict) / 1e6
+        mensaje = (f"Archivo cargado y canales extraídos correctamente.\n"
+                   f"Memoria de señales: {memoria_mb:.1f} MB ({np.dtype(DTYPE_DATOS).name})\n\n"
+                   f"{resumen_sincronizacion(informe_sincronizacion)}")
+        if avisos_cortes:
+            mensaje += "\n\nSe detectaron cortes:\n" + "\n".join(avisos_cortes)
+        avisos_calidad = resumen_calidad(canales_dict)
+        if avisos_calidad:
+            mensaje += "\n\nIntervalos de mala calidad:\n" + "\n".join(avisos_calidad[:20])
+        QtWidgets.QMessageBox.information(self, "Carga completada", mensaje)
+
+    def mostrar_informe_sincronizacion(self):
+        """Tabla con el offset, la deriva y el jitter residual de cada stream cargado."""
+        if not informe_sincronizacion:
+            QtWidgets.QMessageBox.warning(self, "Advertencia", "Primero debes cargar un archivo XDF.")
+            return
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Informe de sincronización de relojes")
+        dialog.resize(900, 300)
+        layout = QtWidgets.QVBoxLayout(dialog)
+        columnas = ["Stream", "Mediciones (usadas)", "Offset (ms)", "Deriva (ppm)",
+                    "Residuo del ajuste (ms)", "Jitter std (ms)", "Jitter máx. (ms)"]
+        tabla = QtWidgets.QTableWidget(len(informe_sincronizacion), len(columnas))
+        tabla.setHorizontalHeaderLabels(columnas)
+        tabla.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        for fila, s in enumerate(informe_sincronizacion):
+            jitter = (f"{s.jitter_std * 1e3:.3f}", f"{s.jitter_max * 1e3:.3f}") if s.dejitter else ("-", "-")
+            valores = [s.nombre, f"{s.n_mediciones} ({s.n_usadas})", f"{s.offset * 1e3:.3f}",
+                       f"{s.deriva * 1e6:.2f}", f"{s.residuo_reloj * 1e3:.3f}", *jitter]
+            for col, valor in enumerate(valores):
+                tabla.setItem(fila, col, QtWidgets.QTableWidgetItem(valor))
+        tabla.resizeColumnsToContents()
+        layout.addWidget(tabla)
+        nota = QtWidgets.QLabel(
+            "Los tiempos de muestras y marcadores ya están corregidos con offset + deriva. El jitter es "
+            "la diferencia entre las marcas originales y el modelo lineal que las reemplazó "
+            "(solo streams de tasa regular).")
+        nota.setWordWrap(True)
+        layout.addWidget(nota)
+        dialog.exec_()
 
     def abrir_menu_graficar(self):
         if not canales_dict:
@@ -246,35 +1017,52 @@ class MainWindow(QtWidgets.QMainWindow):
         label = QtWidgets.QLabel("Seleccione uno o varios canales para graficar:")
         layout.addWidget(label)
 
-        listWidget = QtWidgets.QListWidget()
-        listWidget.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        for clave in sorted(canales_dict.keys()):
-            item = QtWidgets.QListWidgetItem(clave)
-            listWidget.addItem(item)
-        layout.addWidget(listWidget)
+        selector = SelectorCanales(indice_canales)
+        layout.addWidget(selector)
+
+        checkSuperponer = QtWidgets.QCheckBox("Superponer en una figura (tiempo relativo al inicio de cada canal)")
+        layout.addWidget(checkSuperponer)
 
         btnGraficar = QtWidgets.QPushButton("Graficar")
         layout.addWidget(btnGraficar)
 
         def graficar():
-            selectedItems = listWidget.selectedItems()
-            if not selectedItems:
+            seleccionados = selector.seleccionados()
+            if not seleccionados:
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un canal.")
                 return
-            for item in selectedItems:
-                clave = item.text()
+            if checkSuperponer.isChecked():
+                # Comparación entre canales (p. ej. de distintos archivos del espacio de trabajo)
+                fig, ax = plt.subplots(figsize=(10, 4))
+                for clave in seleccionados:
+                    canal_info = canales_dict[clave]
+                    time_stamps = np.asarray(canal_info['time'])
+                    if time_stamps.size == 0:
+                        continue
+                    ax.plot(time_stamps - time_stamps[0], canal_info['data'], label=clave, lw=0.8)
+                ax.set_title("Comparación de canales")
+                ax.set_xlabel("Tiempo desde el inicio (s)")
+                ax.set_ylabel("Valor")
+                ax.grid(True)
+                ax.legend()
+                plt.tight_layout()
+                plt.show()
+                dialog.accept()
+                return
+            for clave in seleccionados:
                 canal_info = canales_dict[clave]
                 time_stamps = canal_info['time']
                 data_arr = canal_info['data']
                 fig, ax = plt.subplots(figsize=(10, 4))
                 ax.plot(time_stamps, data_arr, label=clave)
+                sombrear_calidad(ax, canal_info.get('calidad'))
                 ax.set_title(f"Señal - {clave}")
                 ax.set_xlabel("Tiempo (s)")
-                ax.set_ylabel("Valor")
+                ax.set_ylabel(metadatos_de(canal_info['stream']).unidades[canal_info['canal_idx']] or "Valor")
                 ax.grid(True)
                 if np.size(time_stamps) > 0:
-                    tmin, tmax = min(time_stamps), max(time_stamps)
-                    for t, marker in triggers:
+                    tmin, tmax = np.min(time_stamps), np.max(time_stamps)
+                    for t, marker in triggers_de_canal(clave):
                         if tmin <= t <= tmax:
                             ax.axvline(x=t, linestyle='--', color='red', lw=0.5, alpha=0.7)
                             ylim = ax.get_ylim()
@@ -288,8 +1076,219 @@ class MainWindow(QtWidgets.QMainWindow):
         btnGraficar.clicked.connect(graficar)
         dialog.exec_()
 
-    def abrir_menu_cortar_triggers(self):
-        if not canales_dict or not triggers:
+    def abrir_menu_espectrograma(self):
+        """
+        Muestra el espectrograma de los canales seleccionados. Se calcula por teselas que quedan
+        en caché en disco: al hacer zoom o desplazar la vista solo se calculan las teselas nuevas
+        y la imagen se rehace con la resolución de la vista actual.
+        """
+        if not canales_dict:
+            QtWidgets.QMessageBox.warning(self, "Advertencia", "Primero debes cargar un archivo XDF.")
+            return
+
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Espectrograma")
+        dialog.resize(500, 400)
+        layout = QtWidgets.QVBoxLayout(dialog)
+
+        layout.addWidget(QtWidgets.QLabel("Seleccione uno o varios canales:"))
+        selector = SelectorCanales(indice_canales)
+        layout.addWidget(selector)
+
+        form = QtWidgets.QFormLayout()
+        spinVentana = QtWidgets.QDoubleSpinBox()
+        spinVentana.setRange(0.05, 60.0)
+        spinVentana.setValue(VENTANA_STFT)
+        form.addRow("Ventana de la STFT (s):", spinVentana)
+        spinFmax = QtWidgets.QDoubleSpinBox()
+        spinFmax.setRange(0.0, 10000.0)
+        spinFmax.setSpecialValueText("Nyquist")
+        form.addRow("Frecuencia máxima (Hz):", spinFmax)
+        layout.addLayout(form)
+
+        btnMostrar = QtWidgets.QPushButton("Mostrar espectrograma")
+        layout.addWidget(btnMostrar)
+
+        def mostrar():
+            seleccionados = selector.seleccionados()
+            if not seleccionados:
+                QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un canal.")
+                return
+            for clave in seleccionados:
+                canal_info = canales_dict[clave]
+                stream = canal_info['stream']
+                modelo = canal_info.get('modelo')
+                srate = modelo.srate if modelo is not None else metadatos_de(stream).srate_efectivo
+                if not srate:
+                    QtWidgets.QMessageBox.warning(dialog, "Advertencia", f"No se encontró una tasa de muestreo válida para {clave}.")
+                    continue
+                espectro = Espectrograma(canal_info['time'], canal_info['data'], srate,
+                                         llave_espectrograma(clave, canal_info),
+                                         ventana=spinVentana.value())
+                if not espectro.n_teselas:
+                    QtWidgets.QMessageBox.warning(dialog, "Advertencia", f"{clave} es más corto que la ventana de la STFT.")
+                    continue
+                self.graficar_espectrograma(clave, espectro, spinFmax.value() or srate / 2.0)
+            recortar_cache()
+            dialog.accept()
+
+        btnMostrar.clicked.connect(mostrar)
+        dialog.exec_()
+
+    def graficar_espectrograma(self, clave, espectro, fmax):
+        tiempos = espectro.time_stamps
+        fig, ax = plt.subplots(figsize=(10, 4))
+        filas = espectro.frecuencias <= fmax
+        with registro_etapas.etapa("espectrograma", detalle=clave, muestras=espectro.n) as registro:
+            resultado = espectro.ventana(tiempos[0], tiempos[-1], ax.bbox.width)
+            registro["detalle"] = f"{clave} ({espectro.calculadas} teselas calculadas, {espectro.leidas} leídas)"
+        t, f, matriz = resultado
+        imagen = ax.imshow(matriz[filas], aspect="auto", origin="lower", cmap="viridis",
+                           extent=(t[0], t[-1], f[0], f[filas][-1]))
+        fig.colorbar(imagen, ax=ax, label="Potencia (dB)")
+        ax.set_title(f"Espectrograma - {clave}")
+        ax.set_xlabel("Tiempo (s)")
+        ax.set_ylabel("Frecuencia (Hz)")
+        ax.set_xlim(tiempos[0], tiempos[-1])
+
+        def al_cambiar_vista(ax):
+            # Solo se recalcula la imagen del rango visible, con una columna por píxel
+            t_inicio, t_fin = ax.get_xlim()
+            resultado = espectro.ventana(t_inicio, t_fin, ax.bbox.width)
+            if resultado is None:
+                return
+            t, f, matriz = resultado
+            imagen.set_data(matriz[filas])
+            imagen.set_extent((t[0], t[-1] if t[-1] > t[0] else t[0] + 1e-9, f[0], f[filas][-1]))
+            ax.figure.canvas.draw_idle()
+
+        ax.callbacks.connect("xlim_changed", al_cambiar_vista)
+        plt.tight_layout()
+        plt.show()
+
+    def abrir_menu_filtrar(self):
+        """
+        Filtra todos los canales de los streams seleccionados. Los filtros se diseñan una vez
+        por (tasa, especificación) y se aplican a cada stream completo con un solo sosfiltfilt.
+        Los datos filtrados reemplazan a los originales hasta que se vuelva a cargar el archivo.
+        """
+        if not canales_dict:
+            QtWidgets.QMessageBox.warning(self, "Advertencia", "Primero debes cargar un archivo XDF.")
+            return
+
+        # Agrupar los canales por stream
+        streams = {}
+        for clave in sorted(canales_dict.keys()):
+            canal_info = canales_dict[clave]
+            entrada = streams.setdefault(id(canal_info['stream']), {
+                'stream': canal_info['stream'], 'modelo': canal_info.get('modelo'), 'claves': []})
+            entrada['claves'].append(clave)
+
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Filtrar streams")
+        dialog.resize(500, 450)
+        layout = QtWidgets.QVBoxLayout(dialog)
+
+        layout.addWidget(QtWidgets.QLabel("Seleccione los streams a filtrar:"))
+        listWidget = QtWidgets.QListWidget()
+        listWidget.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
+        for entrada in streams.values():
+            tipo = metadatos_de(entrada['stream']).tipo
+            prefijo = entrada['claves'][0].split(" - ")[0]
+            item = QtWidgets.QListWidgetItem(f"{prefijo} ({tipo}, {len(entrada['claves'])} canales)")
+            item.setData(QtCore.Qt.UserRole, id(entrada['stream']))
+            listWidget.addItem(item)
+        layout.addWidget(listWidget)
+
+        form = QtWidgets.QFormLayout()
+        checkNotch = QtWidgets.QCheckBox("Notch de línea")
+        comboNotch = QtWidgets.QComboBox()
+        comboNotch.addItems(["50", "60"])
+        form.addRow(checkNotch, comboNotch)
+        checkBanda = QtWidgets.QCheckBox("Pasabanda (Hz)")
+        bandaLayout = QtWidgets.QHBoxLayout()
+        spinBaja = QtWidgets.QDoubleSpinBox()
+        spinBaja.setRange(0.01, 1000.0)
+        spinBaja.setValue(1.0)
+        spinAlta = QtWidgets.QDoubleSpinBox()
+        spinAlta.setRange(0.1, 5000.0)
+        spinAlta.setValue(40.0)
+        bandaLayout.addWidget(spinBaja)
+        bandaLayout.addWidget(spinAlta)
+        form.addRow(checkBanda, bandaLayout)
+        checkTendencia = QtWidgets.QCheckBox("Quitar tendencia lineal")
+        form.addRow(checkTendencia)
+        layout.addLayout(form)
+
+        btnFiltrar = QtWidgets.QPushButton("Aplicar filtros")
+        layout.addWidget(btnFiltrar)
+
+        def aplicar():
+            especificaciones = []
+            if checkTendencia.isChecked():
+                especificaciones.append(("tendencia",))
+            if checkNotch.isChecked():
+                especificaciones.append(("notch", float(comboNotch.currentText()), filtros.Q_NOTCH))
+            if checkBanda.isChecked():
+                if spinAlta.value() <= spinBaja.value():
+                    QtWidgets.QMessageBox.warning(dialog, "Advertencia", "La frecuencia alta debe ser mayor que la baja.")
+                    return
+                especificaciones.append(("pasabanda", spinBaja.value(), spinAlta.value(), filtros.ORDEN_POR_DEFECTO))
+            if not especificaciones:
+                QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes elegir al menos un filtro.")
+                return
+            selectedItems = listWidget.selectedItems()
+            if not selectedItems:
+                QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un stream.")
+                return
+
+            for item in selectedItems:
+                entrada = streams[item.data(QtCore.Qt.UserRole)]
+                stream = entrada['stream']
+                y = stream["time_series"]
+                modelo = entrada['modelo']
+                srate = modelo.srate if modelo is not None else metadatos_de(stream).srate_nominal
+                if not srate:
+                    QtWidgets.QMessageBox.warning(dialog, "Advertencia", f"{item.text()} no tiene una tasa de muestreo regular.")
+                    continue
+                try:
+                    with registro_etapas.etapa("filtrado", detalle=filtros.describir(especificaciones),
+                                               muestras=y.size):
+                        if isinstance(y, np.memmap):
+                            # Stream desalojado a disco: se filtra por bloques hacia un memmap de la caché
+                            salida = stream.cache.crear_memmap(stream.llave, y.dtype, y.shape)
+                            y_filtrado = filtros.filtrar_por_bloques(y, salida, srate, especificaciones)
+                        else:
+                            y_filtrado = filtros.filtrar_stream(y, srate, especificaciones)
+                except Exception as e:
+                    QtWidgets.QMessageBox.critical(dialog, "Error", f"No se pudo filtrar {item.text()}:\n{e}")
+                    continue
+                stream["time_series"] = y_filtrado
+                stream.setdefault("filtros", []).extend(especificaciones)
+                stream.setdefault("cadenas_filtro", []).append(list(especificaciones))  # Orden de aplicación
+                # El filtro cambia líneas planas, saturación y ruido: el índice de calidad se recalcula
+                with registro_etapas.etapa("calidad", detalle=item.text(), muestras=y_filtrado.size):
+                    calidades = evaluar_stream(y_filtrado, stream["time_stamps"], srate)
+                for clave in entrada['claves']:
+                    i = canales_dict[clave]['canal_idx']
+                    canales_dict[clave]['data'] = y_filtrado if y_filtrado.ndim == 1 else y_filtrado[:, i]
+                    canales_dict[clave]['calidad'] = calidades[i]
+                    # Los resultados de NeuroKit de estos canales ya no corresponden a los datos
+                    for llave in [l for l in resultados_procesados if l.split(" [")[0].endswith(": " + clave)]:
+                        del resultados_procesados[llave]
+            QtWidgets.QMessageBox.information(dialog, "Filtrado",
+                f"Filtros aplicados: {filtros.describir(especificaciones)}")
+            dialog.accept()
+
+        btnFiltrar.clicked.connect(aplicar)
+        dialog.exec_()
+
+    def abrir_menu_cortar_triggers(self, intervalo=None):
+        """
+        Diálogo de recorte entre dos marcadores. Con `intervalo` (t_inicio, t_fin), elegido en la
+        vista general, sus extremos se agregan al principio de ambas listas y quedan seleccionados.
+        """
+        if not canales_dict or (not triggers and intervalo is None):
             QtWidgets.QMessageBox.warning(self, "Advertencia", "Asegúrate de haber cargado el archivo y que existan triggers.")
             return
 
@@ -310,15 +1309,23 @@ class MainWindow(QtWidgets.QMainWindow):
         comboFin = QtWidgets.QComboBox()
         comboFin.addItems(lista_triggers)
         layout.addWidget(comboFin)
+        if intervalo is not None:
+            comboInicio.insertItem(0, f"{intervalo[0]:.3f} s - (selección de la vista general)")
+            comboFin.insertItem(0, f"{intervalo[1]:.3f} s - (selección de la vista general)")
+            comboInicio.setCurrentIndex(0)
+            comboFin.setCurrentIndex(0)
 
         labelCanales = QtWidgets.QLabel("Seleccione uno o varios canales a recortar:")
         layout.addWidget(labelCanales)
-        listWidget = QtWidgets.QListWidget()
-        listWidget.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        for clave in sorted(canales_dict.keys()):
-            item = QtWidgets.QListWidgetItem(clave)
-            listWidget.addItem(item)
-        layout.addWidget(listWidget)
+        selector = SelectorCanales(indice_canales)
+        layout.addWidget(selector)
+
+        calidadLayout = QtWidgets.QHBoxLayout()
+        calidadLayout.addWidget(QtWidgets.QLabel("Intervalos de mala calidad:"))
+        comboCalidad = QtWidgets.QComboBox()
+        comboCalidad.addItems(["Marcar (sombrear y avisar)", "Excluir sus muestras del recorte", "Ignorar"])
+        calidadLayout.addWidget(comboCalidad)
+        layout.addLayout(calidadLayout)
 
         btnCortar = QtWidgets.QPushButton("Cortar y mostrar señal")
         btnGuardarArchivo = QtWidgets.QPushButton("Guardar recorte en archivo")
@@ -329,6 +1336,29 @@ class MainWindow(QtWidgets.QMainWindow):
         btnLayout.addWidget(btnGuardarApp)
         layout.addLayout(btnLayout)
 
+        def aplicar_calidad(clave, t_recort, data_recort, avisos):
+            """Marca o excluye las muestras del recorte que caen en intervalos de mala calidad."""
+            calidad = canales_dict[clave].get('calidad')
+            if calidad is None or comboCalidad.currentIndex() == 2 or len(t_recort) == 0:
+                return t_recort, data_recort
+            intervalos = calidad.intervalos(t_recort[0], t_recort[-1])
+            if not intervalos:
+                return t_recort, data_recort
+            if comboCalidad.currentIndex() == 1:
+                buenas = calidad.mascara_buena(t_recort)
+                avisos.append(f"{clave}: se excluyeron {np.count_nonzero(~buenas)} muestras "
+                              f"de {len(intervalos)} intervalo(s)")
+                return t_recort[buenas], data_recort[buenas]
+            motivos = describir_motivo(np.bitwise_or.reduce([motivo for _, _, motivo in intervalos]))
+            avisos.append(f"{clave}: {len(intervalos)} intervalo(s), "
+                          f"{calidad.duracion_mala(t_recort[0], t_recort[-1]):.1f} s ({motivos})")
+            return t_recort, data_recort
+
+        def mostrar_avisos(avisos):
+            if avisos:
+                QtWidgets.QMessageBox.information(dialog, "Calidad de la señal",
+                    "Intervalos de mala calidad en el recorte:\n" + "\n".join(avisos[:20]))
+
         def cortar_y_mostrar():
             inicio_sel = comboInicio.currentText()
             fin_sel = comboFin.currentText()
@@ -345,19 +1375,23 @@ class MainWindow(QtWidgets.QMainWindow):
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "El marcador de fin debe ser mayor que el de inicio.")
                 return
 
-            selectedItems = listWidget.selectedItems()
-            if not selectedItems:
+            seleccionados = selector.seleccionados()
+            if not seleccionados:
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un canal.")
                 return
 
-            for item in selectedItems:
-                clave = item.text()
+            avisos = []
+            for clave in seleccionados:
                 canal_info = canales_dict[clave]
                 time_stamps = canal_info['time']
                 data_arr = canal_info['data']
-                t_recort, data_recort = recortar_senal(time_stamps, data_arr, t_start, t_end)
+                t_recort, data_recort = recortar_senal(time_stamps, data_arr, t_start, t_end,
+                                                       canal_info.get('modelo'))
+                t_recort, data_recort = aplicar_calidad(clave, t_recort, data_recort, avisos)
                 fig, ax = plt.subplots(figsize=(10, 4))
                 ax.plot(t_recort, data_recort, label=f"{clave} (recortada)")
+                if comboCalidad.currentIndex() == 0:
+                    sombrear_calidad(ax, canal_info.get('calidad'), t_start, t_end)
                 ax.set_title(f"Señal recortada - {clave}")
                 ax.set_xlabel("Tiempo (s)")
                 ax.set_ylabel("Valor")
@@ -365,6 +1399,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 ax.legend()
                 plt.tight_layout()
                 plt.show()
+            mostrar_avisos(avisos)
             dialog.accept()
 
         # Función para guardar la señal recortada completa, incluyendo t_start y t_end,
@@ -385,44 +1420,51 @@ class MainWindow(QtWidgets.QMainWindow):
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "El marcador de fin debe ser mayor que el de inicio.")
                 return
 
-            # Obtener todos los triggers que caen en el intervalo
-            markers_in_range = [(tt, marker) for (tt, marker) in triggers if t_start <= tt <= t_end]
-
-            selectedItems = listWidget.selectedItems()
-            if not selectedItems:
+            seleccionados = selector.seleccionados()
+            if not seleccionados:
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un canal para exportar.")
                 return
 
-            for item in selectedItems:
-                clave = item.text()
+            # Un solo directorio y una plantilla de nombres para todos los canales
+            directorio = QtWidgets.QFileDialog.getExistingDirectory(dialog, "Carpeta de exportación")
+            if not directorio:
+                return
+            plantilla, ok = QtWidgets.QInputDialog.getText(
+                dialog, "Nombres de archivo",
+                "Plantilla ({canal}, {archivo}, {inicio}, {fin}, {n}):",
+                QtWidgets.QLineEdit.Normal, self.plantillaExportacion)
+            if not ok or not plantilla:
+                return
+            try:
+                nombres = [exportacion.nombre_archivo(plantilla, n, clave.split(" | ")[-1], t_start, t_end,
+                                                      clave.split(" | ")[0] if " | " in clave else
+                                                      os.path.splitext(os.path.basename(ruta_archivo_actual or ""))[0])
+                           for n, clave in enumerate(seleccionados, 1)]
+            except (KeyError, ValueError, IndexError) as e:
+                QtWidgets.QMessageBox.critical(dialog, "Error", f"Plantilla no válida:\n{e}")
+                return
+            self.plantillaExportacion = plantilla
+            rutas = exportacion.rutas_unicas(directorio, nombres)
+            existentes = [ruta for ruta in rutas if os.path.exists(ruta)]
+            if existentes and QtWidgets.QMessageBox.question(
+                    dialog, "Exportación", f"{len(existentes)} archivo(s) ya existen y se reemplazarán. ¿Continuar?",
+                    QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No) != QtWidgets.QMessageBox.Yes:
+                return
+
+            avisos = []
+            for clave, ruta in zip(seleccionados, rutas):
                 canal_info = canales_dict[clave]
                 time_stamps = canal_info['time']
                 data_arr = canal_info['data']
-                t_recort, data_recort = recortar_senal(time_stamps, data_arr, t_start, t_end)
-
-                # Construir filas para toda la señal recortada
-                filas = [(t, val, "") for t, val in zip(t_recort, data_recort)]
-                # Asignar TODOS los marcadores a la muestra más cercana (concatenando si ya existe)
-                for tt, marker in markers_in_range:
-                    diffs = np.abs(np.array(t_recort) - tt)
-                    idx = int(np.argmin(diffs))
-                    if filas[idx][2] != "":
-                        filas[idx] = (filas[idx][0], filas[idx][1], f"{filas[idx][2]}; {marker}")
-                    else:
-                        filas[idx] = (filas[idx][0], filas[idx][1], marker)
-                filas.sort(key=lambda x: x[0])
-
-                archivo_export, _ = QtWidgets.QFileDialog.getSaveFileName(dialog, f"Exportar {clave} a CSV", "", "CSV (*.csv)")
-                if archivo_export:
-                    try:
-                        with open(archivo_export, 'w', newline='') as csvfile:
-                            writer = csv.writer(csvfile)
-                            writer.writerow(["Tiempo (s)", "Valor", "Trigger"])
-                            for row in filas:
-                                writer.writerow(row)
-                        QtWidgets.QMessageBox.information(dialog, "Exportación", f"Se exportó {clave} exitosamente.")
-                    except Exception as e:
-                        QtWidgets.QMessageBox.critical(dialog, "Error", f"No se pudo exportar {clave}:\n{e}")
+                t_recort, data_recort = recortar_senal(time_stamps, data_arr, t_start, t_end,
+                                                       canal_info.get('modelo'))
+                t_recort, data_recort = aplicar_calidad(clave, t_recort, data_recort, avisos)
+                # Todos los marcadores del intervalo (del archivo del canal); la alineación con
+                # las muestras y el formateo del CSV ocurren en el hilo de escritura
+                marcadores = [(tt, marker) for (tt, marker) in triggers_de_canal(clave) if t_start <= tt <= t_end]
+                trabajo = self.colaExportacion.agregar(clave, ruta, t_recort, data_recort, marcadores)
+                self.panelExportaciones.agregar(trabajo)
+            mostrar_avisos(avisos)
             dialog.accept()
 
         def guardar_en_aplicacion():
@@ -441,19 +1483,24 @@ class MainWindow(QtWidgets.QMainWindow):
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "El marcador de fin debe ser mayor que el de inicio.")
                 return
 
-            selectedItems = listWidget.selectedItems()
-            if not selectedItems:
+            seleccionados = selector.seleccionados()
+            if not seleccionados:
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un canal para guardar.")
                 return
 
-            for item in selectedItems:
-                clave = item.text()
+            avisos = []
+            for clave in seleccionados:
                 canal_info = canales_dict[clave]
                 time_stamps = canal_info['time']
                 data_arr = canal_info['data']
-                t_recort, data_recort = recortar_senal(time_stamps, data_arr, t_start, t_end)
-                recortes_guardados[clave] = (t_recort, data_recort)
+                t_recort, data_recort = recortar_senal(time_stamps, data_arr, t_start, t_end,
+                                                       canal_info.get('modelo'))
+                intervalo = {"clave": clave, "t_inicio": t_start, "t_fin": t_end,
+                             "modo_calidad": MODOS_CALIDAD_RECORTE[comboCalidad.currentIndex()]}
+                recortes_guardados[clave] = RecorteDiferido(intervalo, restaurar_recorte,
+                                                            aplicar_calidad(clave, t_recort, data_recort, avisos))
             QtWidgets.QMessageBox.information(dialog, "Guardado", "Señal recortada guardada en la aplicación para procesamiento futuro.")
+            mostrar_avisos(avisos)
             dialog.accept()
 
         btnCortar.clicked.connect(cortar_y_mostrar)
@@ -483,74 +1530,107 @@ class MainWindow(QtWidgets.QMainWindow):
         label = QtWidgets.QLabel("Seleccione uno o varios canales para procesar:")
         layout.addWidget(label)
 
-        listWidget = QtWidgets.QListWidget()
-        listWidget.setSelectionMode(QtWidgets.QAbstractItemView.MultiSelection)
-        # Agregar canales originales
-        for clave in sorted(canales_dict.keys()):
-            item = QtWidgets.QListWidgetItem("Original: " + clave)
-            listWidget.addItem(item)
-        # Agregar recortes guardados, si existen
+        # Canales originales (del índice ya construido) y recortes guardados, si existen
+        indice = indice_canales.con_prefijo("Original: ")
         if recortes_guardados:
-            for clave in sorted(recortes_guardados.keys()):
-                item = QtWidgets.QListWidgetItem("Recorte: " + clave)
-                listWidget.addItem(item)
-        layout.addWidget(listWidget)
+            indice = indice.combinar(IndiceCanales.desde_canales(
+                canales_dict, prefijo="Recorte: ", claves=recortes_guardados.keys()))
+        selector = SelectorCanales(indice)
+        layout.addWidget(selector)
+
+        checkBloques = QtWidgets.QCheckBox("Procesar ECG/EDA por bloques y guardar en disco (grabaciones largas)")
+        layout.addWidget(checkBloques)
+
+        checkCalidad = QtWidgets.QCheckBox(
+            f"Omitir ítems con más del {FRACCION_MALA_MAX:.0%} de la señal en intervalos de mala calidad")
+        checkCalidad.setChecked(True)
+        layout.addWidget(checkCalidad)
 
         btnProcesar = QtWidgets.QPushButton("Procesar canales seleccionados")
         layout.addWidget(btnProcesar)
 
         def procesar_seleccion():
-            selectedItems = listWidget.selectedItems()
-            if not selectedItems:
+            seleccionados = selector.seleccionados()
+            if not seleccionados:
                 QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un canal para procesar.")
                 return
-            for item in selectedItems:
-                label_text = item.text()
+            avisos_calidad = []
+            for label_text in seleccionados:
                 if label_text.startswith("Recorte: "):
                     clave = label_text.replace("Recorte: ", "")
                     # Usar el recorte guardado
                     time_stamps, data_arr = recortes_guardados[clave]
+                    llave = f"{label_text} [{time_stamps[0]:.3f}-{time_stamps[-1]:.3f} s]"
                     # Se obtiene la información original para el canal
-                    info = canales_dict[clave]["stream"].get("info", {})
+                    meta = metadatos_de(canales_dict[clave]["stream"])
+                    modelo = canales_dict[clave].get("modelo")
                 else:
                     clave = label_text.replace("Original: ", "")
+                    llave = label_text
                     canal_info = canales_dict[clave]
                     time_stamps = canal_info["time"]
                     data_arr = canal_info["data"]
-                    info = canal_info["stream"].get("info", {})
+                    meta = metadatos_de(canal_info["stream"])
+                    modelo = canal_info.get("modelo")
 
-                effective_srate = info.get("effective_srate", None)
-                try:
-                    sampling_rate = float(effective_srate) if effective_srate is not None else None
-                except Exception:
-                    sampling_rate = None
-                expected_sr = get_expected_sampling_rate(info)
-                if expected_sr is not None and sampling_rate is not None and sampling_rate != expected_sr:
+                # Calidad del intervalo a procesar, consultada en el índice calculado al cargar
+                calidad = canales_dict[clave].get("calidad")
+                if calidad is not None and len(time_stamps) > 1 and time_stamps[-1] > time_stamps[0]:
+                    fraccion = calidad.duracion_mala(time_stamps[0], time_stamps[-1]) / (time_stamps[-1] - time_stamps[0])
+                    if fraccion > 0:
+                        omitir = checkCalidad.isChecked() and fraccion > FRACCION_MALA_MAX
+                        avisos_calidad.append(f"{label_text}: {fraccion:.0%} en intervalos de mala calidad"
+                                              + (" (omitido)" if omitir else ""))
+                        if omitir:
+                            continue
+
+                # La tasa medida por el modelo temporal tiene prioridad sobre la del header
+                sampling_rate = modelo.srate if modelo is not None else meta.srate_efectivo
+                expected_sr = meta.srate_esperada
+                if expected_sr is not None and sampling_rate and abs(sampling_rate - expected_sr) > 0.1 * expected_sr:
                     QtWidgets.QMessageBox.information(dialog, "Información",
-                        f"Para {clave} se encontró una tasa de muestreo {sampling_rate} Hz, pero se espera {expected_sr} Hz.\nSe usará {expected_sr} Hz para el procesamiento.")
-                    sampling_rate = expected_sr
+                        f"Para {clave} se midió una tasa de muestreo de {sampling_rate:.3f} Hz, pero para este tipo se esperaba {expected_sr} Hz.\nSe usará la tasa medida.")
                 if sampling_rate is None or sampling_rate == 0:
                     QtWidgets.QMessageBox.warning(dialog, "Advertencia", f"No se encontró una tasa de muestreo válida para {clave}.")
                     continue
 
-                tipo = info.get("type", None)
-                if tipo and isinstance(tipo, list):
-                    tipo = tipo[0]
-                tipo = tipo.upper() if tipo else ""
-                if "EDA" in tipo:
+                tipo = meta.tipo
+                if ("EDA" in tipo or "ECG" in tipo) and (checkBloques.isChecked() or len(data_arr) > MUESTRAS_MAX_EN_MEMORIA):
+                    directorio = QtWidgets.QFileDialog.getExistingDirectory(
+                        dialog, f"Carpeta de resultados para {clave}")
+                    if directorio:
+                        info_processed = self.procesar_canal_por_bloques(dialog, clave, data_arr, sampling_rate, tipo, directorio)
+                        if info_processed is not None:
+                            resultados_procesados[llave] = {"tipo": tipo, "signals": None, "info": info_processed,
+                                                            "directorio": directorio}
+                elif "EDA" in tipo:
                     try:
-                        eda_signal = np.array(data_arr).flatten()
-                        eda_cleaned = nk.eda_clean(eda_signal, sampling_rate=sampling_rate)
-                        signals, info_processed = nk.eda_process(eda_cleaned, sampling_rate=sampling_rate)
+                        # Un resultado por bloques no guarda las señales (signals = None): se recalcula
+                        previo = resultados_procesados.get(llave)
+                        if previo is not None and previo["signals"] is not None:
+                            signals = previo["signals"]
+                        else:
+                            with registro_etapas.etapa("neurokit", detalle=f"EDA {clave}", muestras=len(data_arr)):
+                                eda_signal = np.array(data_arr).flatten()
+                                eda_cleaned = nk.eda_clean(eda_signal, sampling_rate=sampling_rate)
+                                signals, info_processed = nk.eda_process(eda_cleaned, sampling_rate=sampling_rate)
+                            resultados_procesados[llave] = {"tipo": "EDA", "signals": signals, "info": info_processed}
                         nk.eda_plot(signals)
                         plt.show()
                     except Exception as e:
                         QtWidgets.QMessageBox.critical(dialog, "Error", f"Error al procesar EDA en {clave}:\n{e}")
                 elif "ECG" in tipo:
-                    signals, info_processed = nk.ecg_process(data_arr, sampling_rate=sampling_rate)
+                    previo = resultados_procesados.get(llave)
+                    if previo is not None and previo["signals"] is not None:
+                        signals = previo["signals"]
+                    else:
+                        with registro_etapas.etapa("neurokit", detalle=f"ECG {clave}", muestras=len(data_arr)):
+                            signals, info_processed = nk.ecg_process(data_arr, sampling_rate=sampling_rate)
+                        resultados_procesados[llave] = {"tipo": "ECG", "signals": signals, "info": info_processed}
                     nk.ecg_plot(signals, sampling_rate=sampling_rate, show=True)
                 elif "PUPIL" in tipo:
-                    processed = pupil_process(data_arr, sampling_rate=sampling_rate)
+                    with registro_etapas.etapa("neurokit", detalle=f"PUPIL {clave}", muestras=len(data_arr)):
+                        processed = pupil_process(data_arr, sampling_rate=sampling_rate)
                     processed_signal = processed["processed_signal"]
                     metrics = processed["metrics"]
                     fig, ax = plt.subplots(figsize=(10, 4))
@@ -567,13 +1647,276 @@ class MainWindow(QtWidgets.QMainWindow):
                         print(f"{key}: {value}")
                 else:
                     QtWidgets.QMessageBox.information(dialog, "Información", f"No hay procesamiento NeuroKit implementado para el tipo '{tipo}' en el canal {clave}.")
+            if avisos_calidad:
+                QtWidgets.QMessageBox.information(dialog, "Calidad de la señal", "\n".join(avisos_calidad[:20]))
             dialog.accept()
 
         btnProcesar.clicked.connect(procesar_seleccion)
         dialog.exec_()
 
+    def abrir_menu_hrv_lote(self):
+        """
+        Calcula picos R e índices de HRV sin graficar, en un pool de procesos, para archivos XDF
+        elegidos del disco o para los canales ECG ya cargados, y escribe una sola tabla CSV.
+        """
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("HRV por lotes")
+        dialog.resize(450, 300)
+        layout = QtWidgets.QVBoxLayout(dialog)
+
+        radioArchivos = QtWidgets.QRadioButton("Archivos XDF (todos sus canales ECG)")
+        radioCargados = QtWidgets.QRadioButton("Canales ECG cargados en la aplicación")
+        radioArchivos.setChecked(True)
+        radioCargados.setEnabled(bool(canales_dict))
+        layout.addWidget(radioArchivos)
+        layout.addWidget(radioCargados)
+
+        layout.addWidget(QtWidgets.QLabel("Índices de HRV:"))
+        checksIndices = {}
+        for indice in hrv_lote.INDICES_HRV:
+            check = QtWidgets.QCheckBox(indice)
+            check.setChecked(indice in hrv_lote.INDICES_POR_DEFECTO)
+            layout.addWidget(check)
+            checksIndices[indice] = check
+
+        form = QtWidgets.QFormLayout()
+        spinProcesos = QtWidgets.QSpinBox()
+        spinProcesos.setRange(1, max(1, os.cpu_count() or 1))
+        spinProcesos.setValue(max(1, os.cpu_count() or 1))
+        form.addRow("Procesos:", spinProcesos)
+        layout.addLayout(form)
+
+        btnEjecutar = QtWidgets.QPushButton("Ejecutar")
+        layout.addWidget(btnEjecutar)
+
+        def ejecutar():
+            indices = tuple(i for i, check in checksIndices.items() if check.isChecked())
+            if not indices:
+                QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes elegir al menos un grupo de índices.")
+                return
+            if radioArchivos.isChecked():
+                rutas, _ = QtWidgets.QFileDialog.getOpenFileNames(dialog, "Archivos XDF", "", "Archivos XDF (*.xdf)")
+                tareas = [(hrv_lote.procesar_archivo, (ruta, indices)) for ruta in rutas]
+            else:
+                tareas = []
+                for clave in sorted(canales_dict.keys()):
+                    canal_info = canales_dict[clave]
+                    meta = metadatos_de(canal_info['stream'])
+                    if "ECG" not in meta.tipo:
+                        continue
+                    modelo = canal_info.get('modelo')
+                    sampling_rate = modelo.srate if modelo is not None else meta.srate_efectivo
+                    if sampling_rate:
+                        archivo = clave.split(" | ")[0] if " | " in clave else os.path.basename(ruta_archivo_actual or "")
+                        tareas.append((hrv_lote.procesar_senal,
+                                       (archivo, clave, np.asarray(canal_info['data']), sampling_rate, indices)))
+            if not tareas:
+                QtWidgets.QMessageBox.warning(dialog, "Advertencia", "No hay canales ECG para procesar.")
+                return
+            ruta_csv, _ = QtWidgets.QFileDialog.getSaveFileName(dialog, "Guardar resultados de HRV", "", "CSV (*.csv)")
+            if not ruta_csv:
+                return
+
+            progreso = QtWidgets.QProgressDialog("Calculando HRV...", None, 0, len(tareas), dialog)
+            progreso.setWindowModality(QtCore.Qt.WindowModal)
+            progreso.setMinimumDuration(0)
+
+            def al_avanzar(hechas, total):
+                progreso.setValue(hechas)
+                QtWidgets.QApplication.processEvents()
+
+            try:
+                with registro_etapas.etapa("hrv_lote", detalle=ruta_csv, muestras=len(tareas)):
+                    filas = hrv_lote.ejecutar_lote(tareas, spinProcesos.value(), al_avanzar)
+                    hrv_lote.escribir_tabla(filas, ruta_csv)
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(dialog, "Error", f"Error en el procesamiento por lotes:\n{e}")
+                return
+            finally:
+                progreso.close()
+            errores = [f"{fila['archivo']} {fila['canal']}: {fila['error']}" for fila in filas if fila.get("error")]
+            mensaje = f"{len(filas)} canales procesados. Resultados en:\n{ruta_csv}"
+            if errores:
+                mensaje += f"\n\n{len(errores)} con error:\n" + "\n".join(errores[:10])
+            QtWidgets.QMessageBox.information(dialog, "HRV por lotes", mensaje)
+            dialog.accept()
+
+        btnEjecutar.clicked.connect(ejecutar)
+        dialog.exec_()
+
+    def abrir_menu_promedios(self):
+        """
+        Promedia las épocas de los canales seleccionados alrededor de los marcadores de una
+        clase (media ± SEM por canal). Con varios archivos en el espacio de trabajo se puede
+        calcular el gran promedio: primero la media de cada archivo y luego la media entre
+        archivos, sin guardar las épocas en memoria.
+        """
+        if not canales_dict or not triggers:
+            QtWidgets.QMessageBox.warning(self, "Advertencia", "Asegúrate de haber cargado el archivo y que existan triggers.")
+            return
+
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle("Promedios por evento")
+        dialog.resize(500, 500)
+        layout = QtWidgets.QVBoxLayout(dialog)
+
+        # Clases de marcadores (sin el prefijo del archivo en el espacio de trabajo)
+        clases = sorted({clase_de_marcador(marker) for _, marker in triggers})
+        form = QtWidgets.QFormLayout()
+        comboClase = QtWidgets.QComboBox()
+        comboClase.addItems(clases)
+        form.addRow("Marcador:", comboClase)
+        spinAntes = QtWidgets.QDoubleSpinBox()
+        spinAntes.setRange(0.0, 60.0)
+        spinAntes.setDecimals(3)
+        spinAntes.setValue(0.2)
+        form.addRow("Segundos antes del evento:", spinAntes)
+        spinDespues = QtWidgets.QDoubleSpinBox()
+        spinDespues.setRange(0.001, 600.0)
+        spinDespues.setDecimals(3)
+        spinDespues.setValue(1.0)
+        form.addRow("Segundos después del evento:", spinDespues)
+        layout.addLayout(form)
+
+        layout.addWidget(QtWidgets.QLabel("Seleccione uno o varios canales:"))
+        selector = SelectorCanales(indice_canales)
+        layout.addWidget(selector)
+
+        checkLineaBase = QtWidgets.QCheckBox("Corregir línea base (media previa al evento)")
+        checkLineaBase.setChecked(True)
+        layout.addWidget(checkLineaBase)
+        checkGran = QtWidgets.QCheckBox("Gran promedio entre archivos (canales con el mismo nombre)")
+        checkGran.setEnabled(len(archivos_espacio) > 1)
+        layout.addWidget(checkGran)
+        checkCsv = QtWidgets.QCheckBox("Guardar también los promedios en CSV")
+        layout.addWidget(checkCsv)
+
+        btnPromediar = QtWidgets.QPushButton("Promediar")
+        layout.addWidget(btnPromediar)
+
+        def promediar():
+            seleccionados = selector.seleccionados()
+            if not seleccionados:
+                QtWidgets.QMessageBox.warning(dialog, "Advertencia", "Debes seleccionar al menos un canal.")
+                return
+            clase = comboClase.currentText()
+            antes, despues = spinAntes.value(), spinDespues.value()
+
+            # (nombre de la curva, tiempos relativos, acumulador) por canal
+            curvas = []
+            avisos = []
+            for clave in seleccionados:
+                canal_info = canales_dict[clave]
+                modelo = canal_info.get('modelo')
+                srate = modelo.srate if modelo is not None else metadatos_de(canal_info['stream']).srate_efectivo
+                if not srate:
+                    avisos.append(f"{clave}: sin tasa de muestreo válida")
+                    continue
+                eventos = [t for t, marker in triggers_de_canal(clave) if clase_de_marcador(marker) == clase]
+                with registro_etapas.etapa("promedio_eventos", detalle=f"{clase} {clave}", muestras=len(eventos)):
+                    acumulador, tiempos_relativos, descartadas = promedios.promediar_eventos(
+                        canal_info['time'], canal_info['data'], eventos, srate, antes, despues,
+                        linea_base=checkLineaBase.isChecked(), calidad=canal_info.get('calidad'))
+                if descartadas:
+                    avisos.append(f"{clave}: {descartadas} de {len(eventos)} épocas descartadas")
+                if acumulador.n:
+                    curvas.append((clave, tiempos_relativos, acumulador))
+            if not curvas:
+                QtWidgets.QMessageBox.warning(dialog, "Advertencia", "No hubo épocas válidas para promediar.\n" + "\n".join(avisos))
+                return
+
+            if checkGran.isChecked():
+                grupos = {}
+                for clave, tiempos_relativos, acumulador in curvas:
+                    grupos.setdefault(clave.split(" | ")[-1], []).append((tiempos_relativos, acumulador.media))
+                curvas = []
+                for nombre, medias in grupos.items():
+                    tiempos_relativos = medias[0][0]
+                    curvas.append((f"Gran promedio - {nombre} ({len(medias)} archivos)", tiempos_relativos,
+                                   promedios.gran_promedio(medias, tiempos_relativos)))
+
+            for nombre, tiempos_relativos, acumulador in curvas:
+                media, sem = acumulador.media, acumulador.sem
+                fig, ax = plt.subplots(figsize=(10, 4))
+                ax.plot(tiempos_relativos, media, label=f"{nombre} (n={acumulador.n})")
+                if acumulador.n > 1:
+                    ax.fill_between(tiempos_relativos, media - sem, media + sem, alpha=0.3, label="± SEM")
+                ax.axvline(x=0, linestyle='--', color='red', lw=0.8)
+                ax.set_title(f"Promedio por evento '{clase}' - {nombre}")
+                ax.set_xlabel("Tiempo relativo al evento (s)")
+                ax.set_ylabel("Valor")
+                ax.grid(True)
+                ax.legend()
+                plt.tight_layout()
+                plt.show()
+
+            if checkCsv.isChecked():
+                ruta, _ = QtWidgets.QFileDialog.getSaveFileName(dialog, "Guardar promedios", "", "CSV (*.csv)")
+                if ruta:
+                    try:
+                        with open(ruta, 'w', newline='') as csvfile:
+                            writer = csv.writer(csvfile)
+                            for nombre, tiempos_relativos, acumulador in curvas:
+                                writer.writerow([nombre, f"n={acumulador.n}"])
+                                writer.writerow(["Tiempo relativo (s)", "Media", "SEM"])
+                                writer.writerows(zip(tiempos_relativos.tolist(), acumulador.media.tolist(),
+                                                     acumulador.sem.tolist()))
+                                writer.writerow([])
+                    except Exception as e:
+                        QtWidgets.QMessageBox.critical(dialog, "Error", f"No se pudieron guardar los promedios:\n{e}")
+            if avisos:
+                QtWidgets.QMessageBox.information(dialog, "Promedios", "\n".join(avisos[:20]))
+            dialog.accept()
+
+        btnPromediar.clicked.connect(promediar)
+        dialog.exec_()
+
+    def procesar_canal_por_bloques(self, parent, clave, data_arr, sampling_rate, tipo, directorio):
+        """
+        Procesa un canal ECG/EDA en bloques solapados, escribiendo los resultados en `directorio`.
+        Retorna el `info` unido de NeuroKit, o None si hubo un error.
+        En lugar de nk.ecg_plot/nk.eda_plot (que necesitan todo el DataFrame en memoria) se
+        grafica la frecuencia cardiaca o el componente fásico diezmado.
+        """
+        progreso = QtWidgets.QProgressDialog(f"Procesando {clave} por bloques...", None, 0, 100, parent)
+        progreso.setWindowModality(QtCore.Qt.WindowModal)
+        progreso.setMinimumDuration(0)
+
+        def al_avanzar(hecho, total):
+            progreso.setValue(int(100 * hecho / total))
+            QtWidgets.QApplication.processEvents()
+
+        try:
+            with registro_etapas.etapa("neurokit_bloques", detalle=f"{tipo} {clave}", muestras=len(data_arr)):
+                signals, info_processed = procesar_por_bloques(data_arr, sampling_rate, tipo, directorio,
+                                                               al_avanzar=al_avanzar)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(parent, "Error", f"Error al procesar {clave} por bloques:\n{e}")
+            return None
+        finally:
+            progreso.close()
+
+        columna = "ECG_Rate" if "ECG" in tipo else "EDA_Phasic"
+        eventos = "ECG_R_Peaks" if "ECG" in tipo else "SCR_Peaks"
+        serie = signals[columna]
+        paso = max(1, len(serie) // 100_000)
+        fig, ax = plt.subplots(figsize=(10, 4))
+        ax.plot(np.arange(0, len(serie), paso) / sampling_rate, serie[::paso], label=columna)
+        ax.set_title(f"{columna} - {clave} ({len(info_processed.get(eventos, []))} eventos)")
+        ax.set_xlabel("Tiempo (s)")
+        ax.set_ylabel("Valor")
+        ax.grid(True)
+        ax.legend()
+        plt.tight_layout()
+        plt.show()
+        QtWidgets.QMessageBox.information(parent, "Procesamiento por bloques",
+            f"Resultados de {clave} guardados en:\n{directorio}")
+        return info_processed
+
 if __name__ == '__main__':
     app = QtWidgets.QApplication(sys.argv)
     mainWin = MainWindow()
     mainWin.show()
+    # Una vez visible la ventana, se calientan los módulos pesados sin bloquear la interfaz
+    QtCore.QTimer.singleShot(0, lambda: precargar_en_segundo_plano([pyxdf, plt, nk]))
     sys.exit(app.exec_())
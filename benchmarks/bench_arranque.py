@@ -0,0 +1,73 @@
+"""
+Mide el tiempo de arranque de la aplicación PyQt (analyxdf.py): desde que arranca el
+intérprete hasta que la ventana principal está visible. Se ejecuta en un subproceso limpio
+(sin módulos en caché) y con la plataforma Qt "offscreen" para poder correr sin pantalla.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones N] [--presupuesto SEGUNDOS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Presupuesto de arranque (segundos). Antes de diferir las importaciones pesadas, cargar
+# neurokit2 + matplotlib + pyxdf tomaba varios segundos.
+PRESUPUESTO_ARRANQUE = 1.0
+
+SCRIPT_MEDICION = r"""
+import time
+t0 = time.perf_counter()
+import sys
+from PyQt5 import QtWidgets
+app = QtWidgets.QApplication(sys.argv)
+import analyxdf
+ventana = analyxdf.MainWindow()
+ventana.show()
+app.processEvents()
+t1 = time.perf_counter()
+pesados = [m for m in ("neurokit2", "matplotlib.pyplot", "pyxdf") if m in sys.modules]
+print(f"{t1 - t0:.6f}", ",".join(pesados))
+"""
+
+
+def medir_arranque():
+    entorno = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    salida = subprocess.run(
+        [sys.executable, "-c", SCRIPT_MEDICION],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    partes = salida.split(" ", 1)
+    pesados = partes[1].split(",") if len(partes) > 1 and partes[1] else []
+    return float(partes[0]), pesados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_ARRANQUE)
+    args = parser.parse_args()
+
+    tiempos = []
+    for _ in range(args.repeticiones):
+        t, pesados = medir_arranque()
+        if pesados:
+            print(f"ADVERTENCIA: módulos pesados importados al arrancar: {', '.join(pesados)}")
+        tiempos.append(t)
+
+    mediana = statistics.median(tiempos)
+    print(f"Arranque (mediana de {len(tiempos)}): {mediana * 1000:.1f} ms "
+          f"[min {min(tiempos) * 1000:.1f} ms, max {max(tiempos) * 1000:.1f} ms]")
+    print(f"Presupuesto: {args.presupuesto * 1000:.0f} ms")
+    if mediana > args.presupuesto:
+        print("FALLO: el arranque supera el presupuesto.")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
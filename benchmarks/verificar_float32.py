@@ -0,0 +1,71 @@
+"""
+Verifica que el modo float32 no cambia los resultados de NeuroKit más allá de la tolerancia
+(precision.TOLERANCIA_FLOAT32) y muestra el ahorro de memoria. Usa señales simuladas de ECG
+y EDA; con --xdf se comparan además los canales ECG/EDA de un archivo real.
+
+Uso:
+    python benchmarks/verificar_float32.py [--xdf archivo.xdf] [--duracion SEGUNDOS]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from precision import comparar_resultados_neurokit, nk, TOLERANCIA_FLOAT32  # noqa: E402
+
+
+def senales_simuladas(duracion):
+    yield "ECG simulado", "ECG", 250, nk.ecg_simulate(duration=duracion, sampling_rate=250, random_state=42)
+    yield "EDA simulado", "EDA", 25, nk.eda_simulate(duration=duracion, sampling_rate=25,
+                                                      scr_number=max(1, duracion // 20), random_state=42)
+
+
+def senales_xdf(ruta):
+    import pyxdf
+    data, _ = pyxdf.load_xdf(ruta)
+    for s_idx, stream in enumerate(data):
+        y = stream.get("time_series")
+        if not isinstance(y, np.ndarray):
+            continue
+        info = stream.get("info", {})
+        tipo = info.get("type", [""])
+        tipo = (tipo[0] if isinstance(tipo, list) else tipo or "").upper()
+        if "ECG" not in tipo and "EDA" not in tipo:
+            continue
+        sampling_rate = float(info.get("effective_srate") or 0)
+        if sampling_rate <= 0:
+            continue
+        for i in range(1 if y.ndim == 1 else y.shape[1]):
+            yield f"Stream {s_idx+1} canal {i+1}", tipo, sampling_rate, y if y.ndim == 1 else y[:, i]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--xdf", help="Archivo XDF con canales ECG/EDA a comparar")
+    parser.add_argument("--duracion", type=int, default=120, help="Duración de las señales simuladas (s)")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_FLOAT32)
+    args = parser.parse_args()
+
+    fuentes = list(senales_simuladas(args.duracion))
+    if args.xdf:
+        fuentes += list(senales_xdf(args.xdf))
+
+    fallos = 0
+    for nombre, tipo, sampling_rate, senal in fuentes:
+        senal = np.asarray(senal, dtype=np.float64)
+        resultado = comparar_resultados_neurokit(senal, sampling_rate, tipo, args.tolerancia)
+        estado = "OK" if resultado["ok"] else "FALLO"
+        print(f"[{estado}] {nombre} ({tipo}, {sampling_rate} Hz): "
+              f"{senal.nbytes / 1e6:.2f} MB -> {senal.astype(np.float32).nbytes / 1e6:.2f} MB")
+        for clave, valor in resultado["metricas"].items():
+            print(f"    {clave}: {valor}")
+        fallos += not resultado["ok"]
+
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+from metadatos import metadatos_de
+
+
+class IndiceCanales:
+    """
+    Índice de búsqueda sobre la lista de canales, construido una sola vez por carga.
+    Cada entrada guarda el texto que se muestra, la clave del canal en canales_dict y un
+    texto en minúsculas con stream, nombre del stream, tipo y etiqueta, de modo que filtrar
+    por texto o por tipo no vuelve a recorrer los headers de los streams.
+    """
+
+    def __init__(self):
+        self.textos = []      # Texto mostrado en la lista (fila -> texto)
+        self.claves = []      # Clave del canal asociado (fila -> clave en canales_dict)
+        self.tipos = []       # Tipo del stream en mayúsculas (fila -> tipo)
+        self._busqueda = []   # Texto de búsqueda en minúsculas (fila -> texto)
+        self.filas_por_tipo = {}
+
+    @classmethod
+    def desde_canales(cls, canales_dict, prefijo="", claves=None):
+        indice = cls()
+        indice.agregar_canales(canales_dict, prefijo, claves)
+        return indice
+
+    def agregar(self, texto, clave, tipo="", extra=""):
+        fila = len(self.textos)
+        tipo = (tipo or "").upper()
+        self.textos.append(texto)
+        self.claves.append(clave)
+        self.tipos.append(tipo)
+        self._busqueda.append(f"{texto} {tipo} {extra}".lower())
+        self.filas_por_tipo.setdefault(tipo, []).append(fila)
+
+    def agregar_canales(self, canales_dict, prefijo="", claves=None):
+        """Agrega los canales (todos, o solo `claves`) en orden alfabético, con un prefijo opcional."""
+        for clave in sorted(canales_dict.keys() if claves is None else claves):
+            meta = metadatos_de(canales_dict[clave]['stream'])
+            self.agregar(prefijo + clave, clave, meta.tipo, meta.nombre)
+
+    def combinar(self, otro):
+        """Retorna un índice nuevo con las entradas de ambos (sin recalcular los textos de búsqueda)."""
+        nuevo = IndiceCanales()
+        for indice in (self, otro):
+            desplazamiento = len(nuevo.textos)
+            nuevo.textos.extend(indice.textos)
+            nuevo.claves.extend(indice.claves)
+            nuevo.tipos.extend(indice.tipos)
+            nuevo._busqueda.extend(indice._busqueda)
+            for tipo, filas in indice.filas_por_tipo.items():
+                nuevo.filas_por_tipo.setdefault(tipo, []).extend(f + desplazamiento for f in filas)
+        return nuevo
+
+    def con_prefijo(self, prefijo):
+        """Copia del índice con `prefijo` delante de cada texto mostrado."""
+        nuevo = self.combinar(IndiceCanales())
+        nuevo.textos = [prefijo + texto for texto in self.textos]
+        return nuevo
+
+    @property
+    def tipos_disponibles(self):
+        return sorted(t for t in self.filas_por_tipo if t)
+
+    def filtrar(self, texto="", tipo=None):
+        """
+        Filas que contienen todas las palabras de `texto` (sin distinguir mayúsculas) y, si se
+        indica, que pertenecen al tipo `tipo`.
+        """
+        filas = self.filas_por_tipo.get(tipo.upper(), []) if tipo else range(len(self.textos))
+        palabras = texto.lower().split()
+        if not palabras:
+            return list(filas)
+        busqueda = self._busqueda
+        return [f for f in filas if all(p in busqueda[f] for p in palabras)]
+
+    def __len__(self):
+        return len(self.textos)
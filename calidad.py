@@ -0,0 +1,203 @@
+import numpy as np
+
+# Motivos (bits combinables) por los que un intervalo se considera de mala calidad
+MOTIVO_NAN = 1
+MOTIVO_PLANO = 2
+MOTIVO_SATURACION = 4
+MOTIVO_ATIPICO = 8
+NOMBRES_MOTIVOS = {MOTIVO_NAN: "sin datos (NaN)", MOTIVO_PLANO: "línea plana",
+                   MOTIVO_SATURACION: "saturación", MOTIVO_ATIPICO: "amplitud atípica"}
+
+DURACION_PLANA_MIN = 1.0       # Segundos con el mismo valor para considerar la señal plana
+DURACION_SATURACION_MIN = 0.05 # Segundos pegados al máximo/mínimo del canal (al menos 3 muestras)
+VENTANA_ATIPICOS = 1.0         # Ventana (s) sobre la que se mide la amplitud pico a pico
+UMBRAL_ATIPICOS = 8.0          # Desviaciones (MAD escalada) sobre la mediana para marcar una ventana
+FRACCION_MALA_MAX = 0.2        # Fracción de un intervalo en mala calidad por encima de la cual se omite
+
+
+def _rachas(mascara, longitud_min=1):
+    """(inicios, fines) de las rachas de True con al menos longitud_min elementos (fin exclusivo)."""
+    bordes = np.diff(np.concatenate(([0], mascara.view(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    fines = np.flatnonzero(bordes == -1)
+    largas = (fines - inicios) >= longitud_min
+    return inicios[largas], fines[largas]
+
+
+def _unir(inicios, fines, motivos):
+    """Une los intervalos que se solapan o se tocan, combinando sus motivos."""
+    if inicios.size == 0:
+        return inicios, fines, motivos
+    orden = np.argsort(inicios, kind="stable")
+    inicios, fines, motivos = inicios[orden], fines[orden], motivos[orden]
+    fin_acumulado = np.maximum.accumulate(fines)
+    nuevo = np.ones(inicios.size, dtype=bool)
+    nuevo[1:] = inicios[1:] > fin_acumulado[:-1]
+    grupos = np.flatnonzero(nuevo)
+    return inicios[grupos], np.maximum.reduceat(fines, grupos), np.bitwise_or.reduceat(motivos, grupos)
+
+
+class IndiceCalidad:
+    """
+    Intervalos de mala calidad de un canal, ordenados y sin solapes, calculados una vez al
+    cargar. Guarda índices de muestra (fin exclusivo), tiempos y motivos, de modo que los
+    gráficos, los recortes y el procesamiento consultan los intervalos con búsquedas binarias
+    sobre unos pocos valores en lugar de volver a recorrer la señal.
+
+    Los tiempos también son semiabiertos, [inicios_t, fines_t): cada muestra mala cubre un
+    periodo, así que una sola muestra mala es un intervalo de duración 1/srate y no de
+    duración cero. Las consultas por muestra no usan fines_t: toca_muestras compara índices
+    y mascara_buena el tiempo de la última muestra mala.
+    """
+
+    def __init__(self, inicios_idx, fines_idx, motivos, time_stamps=None, periodo=None,
+                 inicios_t=None, fines_t=None, ultimas_t=None):
+        self.inicios_idx = np.asarray(inicios_idx, dtype=np.int64)
+        self.fines_idx = np.asarray(fines_idx, dtype=np.int64)
+        self.motivos = np.asarray(motivos, dtype=np.uint8)
+        if inicios_t is not None:
+            self.inicios_t = np.asarray(inicios_t, dtype=np.float64)
+            self.fines_t = np.asarray(fines_t, dtype=np.float64)
+            self.ultimas_t = np.asarray(ultimas_t, dtype=np.float64)
+            return
+        time_stamps = np.asarray(time_stamps)
+        self.inicios_t = time_stamps[self.inicios_idx].astype(np.float64)
+        # Tiempo de la última muestra mala de cada intervalo: las máscaras por muestra lo usan
+        # para no depender del redondeo de fines_t
+        self.ultimas_t = time_stamps[self.fines_idx - 1].astype(np.float64)
+        self.fines_t = self.ultimas_t.copy()
+        if self.fines_t.size:
+            # Fin = tiempo de la última muestra mala + un periodo; sin tasa conocida, la
+            # muestra siguiente (o el último intervalo entre muestras, al final del array)
+            if periodo:
+                self.fines_t += periodo
+            elif time_stamps.size > 1:
+                siguiente = np.minimum(self.fines_idx, time_stamps.size - 1)
+                paso = time_stamps[siguiente] - time_stamps[siguiente - 1]
+                self.fines_t += np.where(self.fines_idx < time_stamps.size,
+                                         time_stamps[siguiente] - self.fines_t, paso)
+
+    def __len__(self):
+        return int(self.inicios_idx.size)
+
+    def _rango(self, t_inicio, t_fin):
+        a = int(np.searchsorted(self.fines_t, t_inicio, side="right"))
+        b = int(np.searchsorted(self.inicios_t, t_fin, side="right"))
+        return a, max(a, b)
+
+    def intervalos(self, t_inicio=-np.inf, t_fin=np.inf):
+        """Lista de (t_inicio, t_fin, motivo) de los intervalos que tocan [t_inicio, t_fin]."""
+        a, b = self._rango(t_inicio, t_fin)
+        return list(zip(self.inicios_t[a:b].tolist(), self.fines_t[a:b].tolist(), self.motivos[a:b].tolist()))
+
+    def duracion_mala(self, t_inicio, t_fin):
+        """Segundos de [t_inicio, t_fin] cubiertos por intervalos de mala calidad."""
+        a, b = self._rango(t_inicio, t_fin)
+        solape = np.minimum(self.fines_t[a:b], t_fin) - np.maximum(self.inicios_t[a:b], t_inicio)
+        return float(np.sum(np.clip(solape, 0.0, None)))
+
+    def mascara_buena(self, tiempos):
+        """Máscara booleana: True para los tiempos que no caen en un intervalo de mala calidad."""
+        tiempos = np.asarray(tiempos, dtype=np.float64)
+        if not len(self):
+            return np.ones(tiempos.shape, dtype=bool)
+        k = np.searchsorted(self.inicios_t, tiempos, side="right") - 1
+        mala = (k >= 0) & (tiempos <= self.ultimas_t[np.maximum(k, 0)])
+        return ~mala
+
+    def toca_muestras(self, inicios, fines):
+        """
+        Para cada tramo de muestras [inicios[j], fines[j]] (índices, fin inclusivo), True si
+        contiene al menos una muestra de un intervalo de mala calidad.
+        """
+        inicios = np.asarray(inicios, dtype=np.int64)
+        fines = np.asarray(fines, dtype=np.int64)
+        # Primer intervalo que termina después del inicio del tramo: lo toca si empieza antes de su fin
+        k = np.searchsorted(self.fines_idx, inicios, side="right")
+        dentro = k < len(self)
+        toca = np.zeros(inicios.shape, dtype=bool)
+        toca[dentro] = self.inicios_idx[k[dentro]] <= fines[dentro]
+        return toca
+
+    def a_dict(self):
+        return {"inicios_idx": self.inicios_idx.tolist(), "fines_idx": self.fines_idx.tolist(),
+                "motivos": self.motivos.tolist(), "inicios_t": self.inicios_t.tolist(),
+                "fines_t": self.fines_t.tolist(), "ultimas_t": self.ultimas_t.tolist()}
+
+    @classmethod
+    def desde_dict(cls, datos, time_stamps=None):
+        if "fines_t" in datos:
+            return cls(datos["inicios_idx"], datos["fines_idx"], datos["motivos"],
+                       inicios_t=datos["inicios_t"], fines_t=datos["fines_t"], ultimas_t=datos["ultimas_t"])
+        return cls(datos["inicios_idx"], datos["fines_idx"], datos["motivos"], time_stamps)
+
+
+def describir_motivo(motivo):
+    return ", ".join(nombre for bit, nombre in NOMBRES_MOTIVOS.items() if motivo & bit)
+
+
+def evaluar_canal(y, time_stamps, srate):
+    """
+    Busca en un canal, con operaciones vectorizadas sobre todo el array:
+      - muestras NaN,
+      - líneas planas (el mismo valor durante al menos DURACION_PLANA_MIN s),
+      - saturación (rachas pegadas al máximo o mínimo del canal),
+      - ventanas de VENTANA_ATIPICOS s con amplitud pico a pico atípica respecto a la mediana
+        de todas las ventanas (la ventana final incompleta no se evalúa).
+    Retorna un IndiceCalidad con los intervalos unidos.
+    """
+    y = np.asarray(y)
+    n = y.shape[0]
+    partes = []
+
+    def agregar(inicios, fines, motivo):
+        if inicios.size:
+            partes.append((inicios, fines, np.full(inicios.size, motivo, dtype=np.uint8)))
+
+    es_flotante = np.issubdtype(y.dtype, np.floating)
+    if es_flotante:
+        agregar(*_rachas(np.isnan(y)), MOTIVO_NAN)
+
+    if n > 1 and srate:
+        # Una racha de k diferencias nulas desde i cubre las muestras i..i+k
+        inicios, fines = _rachas(y[1:] == y[:-1], max(1, int(round(DURACION_PLANA_MIN * srate)) - 1))
+        agregar(inicios, fines + 1, MOTIVO_PLANO)
+
+        maximo = np.nanmax(y) if es_flotante else y.max()
+        minimo = np.nanmin(y) if es_flotante else y.min()
+        if maximo > minimo:
+            agregar(*_rachas((y >= maximo) | (y <= minimo), max(3, int(round(DURACION_SATURACION_MIN * srate)))),
+                    MOTIVO_SATURACION)
+
+        largo = max(1, int(round(VENTANA_ATIPICOS * srate)))
+        n_ventanas = n // largo
+        if n_ventanas >= 3:
+            ventanas = y[:n_ventanas * largo].reshape(n_ventanas, largo)
+            amplitud = (np.fmax.reduce(ventanas, axis=1) - np.fmin.reduce(ventanas, axis=1)).astype(np.float64)
+            validas = amplitud[~np.isnan(amplitud)]
+            if validas.size:
+                mediana = np.median(validas)
+                mad = 1.4826 * np.median(np.abs(validas - mediana))
+                if mad > 0:
+                    inicios, fines = _rachas(amplitud > mediana + UMBRAL_ATIPICOS * mad)
+                    agregar(inicios * largo, fines * largo, MOTIVO_ATIPICO)
+
+    if partes:
+        inicios, fines, motivos = _unir(*(np.concatenate(columna) for columna in zip(*partes)))
+    else:
+        inicios = fines = np.empty(0, dtype=np.int64)
+        motivos = np.empty(0, dtype=np.uint8)
+    return IndiceCalidad(inicios, fines, motivos, time_stamps, periodo=1.0 / srate if srate else None)
+
+
+def evaluar_stream(y, time_stamps, srate=None):
+    """
+    Evalúa cada canal de un stream numérico. Si no se conoce la tasa de muestreo (stream
+    irregular) se estima a partir de las marcas de tiempo. Retorna una lista de IndiceCalidad.
+    """
+    time_stamps = np.asarray(time_stamps)
+    if not srate and time_stamps.size > 1 and time_stamps[-1] > time_stamps[0]:
+        srate = (time_stamps.size - 1) / float(time_stamps[-1] - time_stamps[0])
+    if y.ndim == 1:
+        return [evaluar_canal(y, time_stamps, srate)]
+    return [evaluar_canal(y[:, i], time_stamps, srate) for i in range(y.shape[1])]
@@ -0,0 +1,57 @@
+import importlib
+import threading
+
+_lock = threading.RLock()
+
+
+class ModuloDiferido:
+    """
+    Representa un módulo que se importa la primera vez que se accede a uno de sus atributos.
+    Permite escribir `nk.ecg_process(...)` o `plt.subplots(...)` sin pagar el costo de la
+    importación al arrancar la aplicación.
+    """
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def cargar(self):
+        """Importa el módulo (una sola vez, incluso si varios hilos lo piden a la vez)."""
+        if self._modulo is None:
+            with _lock:
+                if self._modulo is None:
+                    self._modulo = importlib.import_module(self._nombre)
+        return self._modulo
+
+    @property
+    def cargado(self):
+        return self._modulo is not None
+
+    def __getattr__(self, atributo):
+        return getattr(self.cargar(), atributo)
+
+    def __repr__(self):
+        estado = "cargado" if self.cargado else "pendiente"
+        return f"<ModuloDiferido {self._nombre} ({estado})>"
+
+
+def precargar_en_segundo_plano(modulos, al_terminar=None):
+    """
+    Importa los módulos diferidos en un hilo daemon para que estén listos cuando el usuario
+    los necesite. Si se indica `al_terminar`, se llama al final con la lista de errores
+    (tuplas (nombre, excepción)); los errores no se propagan porque el primer uso real
+    volverá a intentar la importación y mostrará el error en ese momento.
+    """
+    def tarea():
+        errores = []
+        for modulo in modulos:
+            try:
+                modulo.cargar()
+            except Exception as e:
+                errores.append((modulo._nombre, e))
+        if al_terminar is not None:
+            al_terminar(errores)
+
+    hilo = threading.Thread(target=tarea, name="precarga-modulos", daemon=True)
+    hilo.start()
+    return hilo
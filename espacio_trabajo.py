@@ -0,0 +1,210 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+# Memoria máxima (bytes) que pueden ocupar los datos de los streams del espacio de trabajo
+PRESUPUESTO_MEMORIA = 2 * 1024 ** 3
+
+
+class CacheStreams:
+    """
+    Caché LRU de los arrays de datos de los streams, acotada por un presupuesto de bytes y
+    compartida por todos los archivos abiertos. Al superar el presupuesto se desalojan los
+    arrays usados hace más tiempo: se escriben una vez a un .npy temporal y la próxima vez que
+    se pidan se abren como memmap de solo lectura (sin volver a parsear el XDF ni traer el
+    array entero a memoria). Los memmap no cuentan para el presupuesto.
+    """
+
+    def __init__(self, presupuesto=PRESUPUESTO_MEMORIA, directorio=None):
+        self.presupuesto = presupuesto
+        self.directorio = directorio
+        self._borrar_directorio = None  # Borra el directorio temporal propio (en limpiar o al salir)
+        self._arrays = OrderedDict()  # llave -> array en memoria (el último es el más reciente)
+        self._en_disco = {}           # llave -> ruta del .npy con la copia desalojada vigente
+        self._lock = threading.RLock()
+        self.en_memoria = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def _ruta(self, llave):
+        if self.directorio is None:
+            self.directorio = tempfile.mkdtemp(prefix="xdf_cache_")
+            self._borrar_directorio = weakref.finalize(self, shutil.rmtree, self.directorio, ignore_errors=True)
+        return os.path.join(self.directorio, f"{abs(hash(llave)):x}.npy")
+
+    def crear_memmap(self, llave, dtype, shape):
+        """
+        Memmap .npy nuevo en el directorio de la caché para escribir los datos que reemplazarán
+        a los de `llave` (p. ej. al filtrar por bloques). Al pasarlo a agregar() queda como la
+        copia en disco del stream, y se borra con la caché.
+        """
+        with self._lock:
+            fd, ruta = tempfile.mkstemp(suffix=".npy", dir=os.path.dirname(self._ruta(llave)))
+            os.close(fd)
+        return np.lib.format.open_memmap(ruta, mode="w+", dtype=dtype, shape=shape)
+
+    def agregar(self, llave, array):
+        """Agrega (o reemplaza, p. ej. tras filtrar) el array de un stream."""
+        with self._lock:
+            self._quitar_de_memoria(llave)
+            ruta = self._en_disco.pop(llave, None)
+            if ruta is not None and os.path.exists(ruta):
+                os.remove(ruta)  # La copia en disco ya no corresponde a los datos
+            if isinstance(array, np.memmap) and self.directorio is not None \
+                    and os.path.dirname(os.path.abspath(array.filename)) == os.path.abspath(self.directorio):
+                self._en_disco[llave] = array.filename  # Creado con crear_memmap: ya está en disco
+            self._arrays[llave] = array
+            self.en_memoria += _bytes_en_memoria(array)
+            self._desalojar(conservar=llave)
+
+    def obtener(self, llave):
+        with self._lock:
+            if llave in self._arrays:
+                self._arrays.move_to_end(llave)
+                self.aciertos += 1
+                return self._arrays[llave]
+            if llave not in self._en_disco:
+                raise KeyError(llave)
+            self.fallos += 1
+            array = np.load(self._en_disco[llave], mmap_mode="r")
+            self._arrays[llave] = array
+            self._desalojar(conservar=llave)
+            return array
+
+    def _quitar_de_memoria(self, llave):
+        array = self._arrays.pop(llave, None)
+        if array is not None:
+            self.en_memoria -= _bytes_en_memoria(array)
+
+    def _desalojar(self, conservar):
+        while self.en_memoria > self.presupuesto and len(self._arrays) > 1:
+            llave, array = next(iter(self._arrays.items()))
+            if llave == conservar:
+                self._arrays.move_to_end(llave)
+                continue
+            if llave not in self._en_disco:
+                ruta = self._ruta(llave)
+                np.save(ruta, array)
+                self._en_disco[llave] = ruta
+            self._quitar_de_memoria(llave)
+            self.desalojos += 1
+
+    def cambiar_presupuesto(self, presupuesto):
+        with self._lock:
+            self.presupuesto = presupuesto
+            if self._arrays:
+                self._desalojar(conservar=next(reversed(self._arrays)))
+
+    def limpiar(self):
+        with self._lock:
+            for ruta in self._en_disco.values():
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            self._arrays.clear()
+            self._en_disco.clear()
+            self.en_memoria = 0
+            if self._borrar_directorio is not None:
+                self._borrar_directorio()
+                self._borrar_directorio = None
+                self.directorio = None
+
+    def __contains__(self, llave):
+        return llave in self._arrays or llave in self._en_disco
+
+
+def _bytes_en_memoria(array):
+    """Bytes que el array ocupa en memoria: los de un memmap los respalda su archivo."""
+    return 0 if isinstance(array, np.memmap) else array.nbytes
+
+
+class StreamDiferido(dict):
+    """
+    Stream (mismo formato que los de pyxdf) cuyo "time_series" vive en la CacheStreams.
+    Leer stream["time_series"] lo trae de la caché; asignarlo (p. ej. al filtrar) lo reemplaza.
+    Los tiempos y el header permanecen en memoria.
+    Con `lector` (streams restaurados de una sesión) el stream se crea sin tiempos ni datos:
+    el primer acceso a cualquiera de los dos llama a lector(stream), que debe entregarlos con
+    completar().
+    """
+
+    def __init__(self, stream, cache, llave, lector=None):
+        super(StreamDiferido, self).__init__(stream)
+        self.cache = cache
+        self.llave = llave
+        self.lector = lector
+        if lector is None:
+            cache.agregar(llave, dict.pop(self, "time_series"))
+        else:
+            dict.__setitem__(self, "time_stamps", None)
+        dict.__setitem__(self, "time_series", None)
+
+    @property
+    def pendiente(self):
+        """True mientras los tiempos y datos no se han leído."""
+        return self.lector is not None
+
+    def completar(self, time_stamps, time_series):
+        self.lector = None
+        dict.__setitem__(self, "time_stamps", time_stamps)
+        self.cache.agregar(self.llave, time_series)
+
+    def __getitem__(self, clave):
+        if self.lector is not None and clave in ("time_series", "time_stamps"):
+            self.lector(self)
+        if clave == "time_series":
+            return self.cache.obtener(self.llave)
+        return dict.__getitem__(self, clave)
+
+    def get(self, clave, por_defecto=None):
+        return self[clave] if clave in self else por_defecto
+
+    def __setitem__(self, clave, valor):
+        if clave == "time_series":
+            self.cache.agregar(self.llave, valor)
+        else:
+            dict.__setitem__(self, clave, valor)
+
+
+class CanalDiferido(dict):
+    """
+    Entrada de canales_dict para un canal de un StreamDiferido: canal['data'] y canal['time']
+    se obtienen del stream en cada acceso, así que no retiene el array cuando la caché lo
+    desaloja (ni obliga a leer un stream pendiente). Asignar 'data' no tiene efecto: los datos
+    se cambian a través del stream.
+    """
+
+    def __init__(self, stream, canal_idx, modelo, calidad=None):
+        super(CanalDiferido, self).__init__(stream=stream, canal_idx=canal_idx, time=None,
+                                            modelo=modelo, calidad=calidad, data=None)
+
+    def __getitem__(self, clave):
+        if clave == "data":
+            y = dict.__getitem__(self, "stream")["time_series"]
+            return y if y.ndim == 1 else y[:, dict.__getitem__(self, "canal_idx")]
+        if clave == "time":
+            return dict.__getitem__(self, "stream")["time_stamps"]
+        return dict.__getitem__(self, clave)
+
+    def get(self, clave, por_defecto=None):
+        return self[clave] if clave in self else por_defecto
+
+    def __setitem__(self, clave, valor):
+        if clave not in ("data", "time"):
+            dict.__setitem__(self, clave, valor)
+
+
+def prefijo_archivo(ruta, usados):
+    """Nombre corto y único del archivo, usado para separar los canales de cada archivo."""
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    prefijo = base
+    n = 2
+    while prefijo in usados:
+        prefijo = f"{base} ({n})"
+        n += 1
+    return prefijo
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+from carga_diferida import ModuloDiferido
+
+signal = ModuloDiferido("scipy.signal")
+
+DURACION_TESELA = 60.0   # Segundos de señal por tesela
+VENTANA_STFT = 2.0       # Segundos de cada ventana de la STFT (la mitad se solapa)
+TESELAS_EN_MEMORIA = 64  # Teselas recientes que se mantienen en memoria además del disco
+DIRECTORIO_CACHE = os.path.join(tempfile.gettempdir(), "xdf_espectrogramas")
+PRESUPUESTO_CACHE = 1024 ** 3  # Bytes de teselas en disco; se borran los canales usados hace más tiempo
+
+
+class Espectrograma:
+    """
+    Espectrograma (STFT en dB) de un canal calculado por teselas de DURACION_TESELA s. Cada
+    tesela cubre un rango fijo de muestras y usa exactamente las mismas ventanas que una STFT
+    de la señal completa, así que unirlas no deja costuras. Las teselas se guardan como .npy
+    en una carpeta propia del canal (según su llave, parámetros y tipo de datos): al acercar o
+    desplazar la vista solo se calculan las que aún no existen, también entre sesiones. La
+    llave debe cambiar cuando cambian los datos (archivo, sincronización, filtros).
+    """
+
+    def __init__(self, time_stamps, y, srate, llave, ventana=VENTANA_STFT,
+                 duracion_tesela=DURACION_TESELA, directorio=DIRECTORIO_CACHE):
+        self.time_stamps = np.asarray(time_stamps, dtype=np.float64)
+        self.y = y
+        self.srate = float(srate)
+        self.nperseg = max(8, int(round(ventana * self.srate)))
+        self.paso = max(1, self.nperseg // 2)
+        # Largo de tesela en muestras, múltiplo del paso para que las ventanas queden alineadas
+        self.largo_tesela = max(1, int(round(duracion_tesela * self.srate / self.paso))) * self.paso
+        self.n = len(self.time_stamps)
+        if self.n >= self.nperseg:
+            ultima_ventana = (self.n - self.nperseg) // self.paso * self.paso
+            self.n_teselas = ultima_ventana // self.largo_tesela + 1
+        else:
+            self.n_teselas = 0
+        self.frecuencias = np.fft.rfftfreq(self.nperseg, 1.0 / self.srate)
+        dtype = np.dtype(getattr(y, "dtype", np.float64)).name
+        parametros = f"{llave}|{dtype}|{self.n}|{self.srate:.6f}|{self.nperseg}|{self.largo_tesela}"
+        self.directorio = os.path.join(directorio, hashlib.sha1(parametros.encode("utf-8")).hexdigest()[:16])
+        if os.path.isdir(self.directorio):
+            os.utime(self.directorio)  # Uso reciente: recortar_cache lo borra al final
+        self._memoria = OrderedDict()
+        self.calculadas = 0
+        self.leidas = 0
+
+    def _ruta(self, k):
+        return os.path.join(self.directorio, f"tesela_{k:06d}.npy")
+
+    def _calcular(self, k):
+        inicio = k * self.largo_tesela
+        # Se agregan nperseg - paso muestras para completar la última ventana de la tesela
+        fin = min(inicio + self.largo_tesela + self.nperseg - self.paso, self.n)
+        segmento = np.asarray(self.y[inicio:fin], dtype=np.float64)
+        validos = ~np.isnan(segmento)
+        if not validos.all():
+            segmento = np.where(validos, segmento, segmento[validos].mean() if validos.any() else 0.0)
+        _, _, potencia = signal.spectrogram(segmento, fs=self.srate, nperseg=self.nperseg,
+                                            noverlap=self.nperseg - self.paso, detrend="constant",
+                                            scaling="density", mode="psd")
+        return (10.0 * np.log10(potencia + 1e-20)).astype(np.float32)
+
+    def tesela(self, k):
+        """Potencia (dB, frecuencias x ventanas) de la tesela k, desde memoria, disco o calculada."""
+        if k in self._memoria:
+            self._memoria.move_to_end(k)
+            return self._memoria[k]
+        ruta = self._ruta(k)
+        if os.path.exists(ruta):
+            matriz = np.load(ruta)
+            self.leidas += 1
+        else:
+            matriz = self._calcular(k)
+            os.makedirs(self.directorio, exist_ok=True)
+            # Escritura atómica: otra vista del mismo canal nunca lee una tesela a medias
+            temporal = ruta + ".tmp.npy"
+            np.save(temporal, matriz)
+            os.replace(temporal, ruta)
+            self.calculadas += 1
+        self._memoria[k] = matriz
+        while len(self._memoria) > TESELAS_EN_MEMORIA:
+            self._memoria.popitem(last=False)
+        return matriz
+
+    def _tiempos_tesela(self, k, n_ventanas):
+        centros = k * self.largo_tesela + np.arange(n_ventanas) * self.paso + self.nperseg // 2
+        return self.time_stamps[np.minimum(centros, self.n - 1)]
+
+    def ventana(self, t_inicio, t_fin, columnas=1000):
+        """
+        Espectrograma entre t_inicio y t_fin con a lo sumo `columnas` columnas (p. ej. el ancho
+        en píxeles de la vista): si hay más ventanas STFT que columnas, se promedian en grupos.
+        Retorna (tiempos, frecuencias, matriz en dB) o None si no hay datos en el rango.
+        """
+        if not self.n_teselas:
+            return None
+        a = int(np.searchsorted(self.time_stamps, t_inicio, side="left"))
+        b = int(np.searchsorted(self.time_stamps, t_fin, side="right"))
+        # Una ventana se ubica en su centro, que está nperseg/2 muestras después de su inicio
+        medio = self.nperseg // 2
+        k_inicio = min(max(a - medio, 0) // self.largo_tesela, self.n_teselas - 1)
+        k_fin = min(max(b - 1 - medio, 0) // self.largo_tesela, self.n_teselas - 1)
+        matrices = []
+        tiempos = []
+        for k in range(k_inicio, k_fin + 1):
+            matriz = self.tesela(k)
+            matrices.append(matriz)
+            tiempos.append(self._tiempos_tesela(k, matriz.shape[1]))
+        matriz = np.concatenate(matrices, axis=1)
+        tiempos = np.concatenate(tiempos)
+        dentro = (tiempos >= t_inicio) & (tiempos <= t_fin)
+        if not np.any(dentro):
+            return None
+        matriz, tiempos = matriz[:, dentro], tiempos[dentro]
+
+        grupo = -(-tiempos.size // max(1, int(columnas)))
+        if grupo > 1:
+            completos = (tiempos.size // grupo) * grupo
+            matriz = matriz[:, :completos].reshape(matriz.shape[0], -1, grupo).mean(axis=2)
+            tiempos = tiempos[:completos].reshape(-1, grupo).mean(axis=1)
+        return tiempos, self.frecuencias, matriz
+
+
+def recortar_cache(directorio=DIRECTORIO_CACHE, presupuesto=PRESUPUESTO_CACHE):
+    """
+    Borra las carpetas de teselas usadas hace más tiempo hasta que el total en disco quede
+    dentro del presupuesto. Retorna los bytes liberados.
+    """
+    if not os.path.isdir(directorio):
+        return 0
+    carpetas = []
+    for entrada in os.scandir(directorio):
+        if entrada.is_dir():
+            tamano = sum(f.stat().st_size for f in os.scandir(entrada.path) if f.is_file())
+            carpetas.append((entrada.stat().st_mtime, tamano, entrada.path))
+    total = sum(tamano for _, tamano, _ in carpetas)
+    liberados = 0
+    for _, tamano, ruta in sorted(carpetas):
+        if total - liberados <= presupuesto:
+            break
+        shutil.rmtree(ruta, ignore_errors=True)
+        liberados += tamano
+    return liberados
@@ -0,0 +1,153 @@
+import csv
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from instrumentacion import registro_etapas
+from modelo_temporal import indices_mas_cercanos
+
+HILOS_EXPORTACION = 4
+FILAS_POR_BLOQUE = 50_000
+PLANTILLA_POR_DEFECTO = "{canal}_{inicio:.3f}-{fin:.3f}s.csv"
+ENCABEZADO_CSV = ["Tiempo (s)", "Valor", "Trigger"]
+
+_CARACTERES_INVALIDOS = re.compile(r'[\\/:*?"<>|]+')
+
+EN_COLA = "en cola"
+ESCRIBIENDO = "escribiendo"
+TERMINADO = "terminado"
+ERROR = "error"
+
+
+def limpiar_nombre(texto):
+    """Reemplaza los caracteres que no se permiten en nombres de archivo."""
+    return _CARACTERES_INVALIDOS.sub("_", str(texto)).strip()
+
+
+def nombre_archivo(plantilla, numero, canal, inicio, fin, archivo=""):
+    """
+    Aplica la plantilla de nombres. Campos disponibles: {canal}, {archivo}, {inicio}, {fin}
+    (segundos, admiten formato como {inicio:.3f}) y {n} (número del trabajo, desde 1).
+    """
+    nombre = plantilla.format(canal=limpiar_nombre(canal), archivo=limpiar_nombre(archivo),
+                              inicio=inicio, fin=fin, n=numero)
+    return nombre if nombre.lower().endswith(".csv") else nombre + ".csv"
+
+
+def columna_triggers(t_recort, marcadores):
+    """
+    Asigna cada marcador (tiempo, texto) a la muestra más cercana del recorte, concatenando
+    con "; " los que caen en la misma muestra. Retorna {índice: texto}.
+    """
+    columna = {}
+    if len(t_recort) == 0:
+        return columna
+    cercanos = indices_mas_cercanos(t_recort, [t for t, _ in marcadores])
+    for (_, marker), idx in zip(marcadores, cercanos.tolist()):
+        columna[idx] = f"{columna[idx]}; {marker}" if idx in columna else marker
+    return columna
+
+
+class TrabajoExportacion:
+    """Un recorte a escribir en CSV. El progreso (filas escritas) se lee desde la interfaz."""
+
+    def __init__(self, nombre, ruta, t_recort, data_recort, marcadores):
+        self.nombre = nombre
+        self.ruta = ruta
+        self.t_recort = t_recort
+        self.data_recort = data_recort
+        self.marcadores = marcadores
+        self.total = len(t_recort)
+        self.escritas = 0
+        self.estado = EN_COLA
+        self.error = None
+        self.duracion = None
+
+    def ejecutar(self):
+        inicio = time.perf_counter()
+        self.estado = ESCRIBIENDO
+        try:
+            with registro_etapas.etapa("exportacion", detalle=self.ruta, muestras=self.total,
+                                       perfilar=False, medir_memoria=False):
+                self._escribir()
+            estado = TERMINADO
+        except Exception as e:
+            self.error = str(e)
+            estado = ERROR
+        # La duración se asigna antes que el estado: la interfaz la muestra en cuanto lee TERMINADO
+        self.duracion = time.perf_counter() - inicio
+        # Los datos ya no se necesitan: liberarlos aunque el trabajo siga en la lista
+        self.t_recort = self.data_recort = None
+        self.estado = estado
+
+    def _escribir(self):
+        triggers = columna_triggers(self.t_recort, self.marcadores)
+        with open(self.ruta, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(ENCABEZADO_CSV)
+            for a in range(0, self.total, FILAS_POR_BLOQUE):
+                b = min(a + FILAS_POR_BLOQUE, self.total)
+                texto = [triggers.get(i, "") for i in range(a, b)]
+                # Los float64 se escriben igual como float de Python, que se convierte más rápido a
+                # texto; los float32 se dejan como escalares de NumPy para conservar su formato corto
+                valores = self.data_recort[a:b]
+                if valores.dtype == np.float64:
+                    valores = valores.tolist()
+                writer.writerows(zip(self.t_recort[a:b].tolist(), valores, texto))
+                self.escritas = b
+
+
+class ColaExportacion:
+    """
+    Cola de exportaciones a CSV escritas por hilos en segundo plano: agregar un trabajo
+    retorna de inmediato y la interfaz consulta el estado de cada uno. El formateo del texto
+    también ocurre en los hilos, no en el de la interfaz.
+    """
+
+    def __init__(self, hilos=HILOS_EXPORTACION):
+        self.hilos = hilos
+        self.trabajos = []
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def agregar(self, nombre, ruta, t_recort, data_recort, marcadores):
+        trabajo = TrabajoExportacion(nombre, ruta, np.asarray(t_recort), np.asarray(data_recort), list(marcadores))
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix="exportacion")
+            self.trabajos.append(trabajo)
+            self._pool.submit(trabajo.ejecutar)
+        return trabajo
+
+    def pendientes(self):
+        with self._lock:
+            return sum(1 for trabajo in self.trabajos if trabajo.estado in (EN_COLA, ESCRIBIENDO))
+
+    def limpiar_terminados(self):
+        with self._lock:
+            self.trabajos = [t for t in self.trabajos if t.estado in (EN_COLA, ESCRIBIENDO)]
+
+    def cerrar(self, esperar=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=esperar)
+
+
+def rutas_unicas(directorio, nombres):
+    """Rutas en `directorio` para cada nombre, agregando " (k)" a los repetidos dentro del lote."""
+    usados = set()
+    rutas = []
+    for nombre in nombres:
+        base, extension = os.path.splitext(nombre)
+        candidato = nombre
+        k = 2
+        while candidato.lower() in usados:
+            candidato = f"{base} ({k}){extension}"
+            k += 1
+        usados.add(candidato.lower())
+        rutas.append(os.path.join(directorio, candidato))
+    return rutas
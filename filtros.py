@@ -0,0 +1,162 @@
+import functools
+
+import numpy as np
+from carga_diferida import ModuloDiferido
+
+signal = ModuloDiferido("scipy.signal")
+
+# Especificaciones de filtro (tuplas, para poder usarlas como llave de caché):
+#   ("notch", frecuencia, Q)
+#   ("pasabanda", f_baja, f_alta, orden)
+#   ("pasaaltos", f_corte, orden)
+#   ("pasabajos", f_corte, orden)
+#   ("tendencia",)          -> elimina la tendencia lineal de cada canal
+ORDEN_POR_DEFECTO = 4
+Q_NOTCH = 30.0
+# Margen de cada bloque en múltiplos de orden / f_corte: con 3 la diferencia con el filtrado en
+# una sola pasada queda por debajo de 1e-8 veces la amplitud de la señal
+FACTOR_MARGEN = 3.0
+
+
+@functools.lru_cache(maxsize=64)
+def disenar_sos(srate, especificacion):
+    """
+    Diseña (una sola vez por combinación de tasa y especificación) las secciones de segundo
+    orden del filtro. Retorna None para las etapas que no son filtros IIR (tendencia).
+    """
+    nyquist = srate / 2.0
+    tipo = especificacion[0]
+    if tipo == "tendencia":
+        return None
+    if tipo == "notch":
+        frecuencia, q = especificacion[1], especificacion[2]
+        if frecuencia >= nyquist:
+            raise ValueError(f"La frecuencia del notch ({frecuencia} Hz) supera Nyquist ({nyquist} Hz)")
+        b, a = signal.iirnotch(frecuencia, q, fs=srate)
+        return signal.tf2sos(b, a)
+    if tipo == "pasabanda":
+        f_baja, f_alta, orden = especificacion[1:]
+        f_alta = min(f_alta, 0.99 * nyquist)
+        return signal.butter(orden, [f_baja, f_alta], btype="bandpass", fs=srate, output="sos")
+    if tipo == "pasaaltos":
+        return signal.butter(especificacion[2], especificacion[1], btype="highpass", fs=srate, output="sos")
+    if tipo == "pasabajos":
+        f_corte = min(especificacion[1], 0.99 * nyquist)
+        return signal.butter(especificacion[2], f_corte, btype="lowpass", fs=srate, output="sos")
+    raise ValueError(f"Tipo de filtro desconocido: {tipo}")
+
+
+def disenar_cadena(srate, especificaciones):
+    """
+    Retorna (quitar_tendencia, sos) con todas las etapas IIR concatenadas en una sola matriz
+    SOS, para aplicar toda la cadena en un único sosfiltfilt.
+    """
+    srate = round(float(srate), 6)
+    quitar_tendencia = False
+    secciones = []
+    for especificacion in especificaciones:
+        sos = disenar_sos(srate, tuple(especificacion))
+        if sos is None:
+            quitar_tendencia = True
+        else:
+            secciones.append(sos)
+    return quitar_tendencia, (np.vstack(secciones) if secciones else None)
+
+
+def filtrar_stream(y, srate, especificaciones):
+    """
+    Aplica la cadena de filtros a todos los canales de un stream a la vez (y de forma
+    (muestras,) o (muestras, canales)), con un único sosfiltfilt 2-D de fase cero.
+    El resultado conserva el tipo de dato de la entrada (float32 o float64).
+    """
+    quitar_tendencia, sos = disenar_cadena(srate, especificaciones)
+    resultado = np.asarray(y)
+    if quitar_tendencia:
+        resultado = signal.detrend(resultado, axis=0, type="linear")
+    if sos is not None:
+        resultado = signal.sosfiltfilt(sos, resultado, axis=0)
+    return resultado.astype(np.asarray(y).dtype, copy=False)
+
+
+def _tendencia_lineal(entrada, tam_bloque):
+    """Pendiente y ordenada de la recta de mínimos cuadrados por canal, en una pasada por bloques."""
+    n = entrada.shape[0]
+    suma_x = n * (n - 1) / 2.0
+    suma_xx = (n - 1) * n * (2 * n - 1) / 6.0
+    suma_y = 0.0
+    suma_xy = 0.0
+    for inicio in range(0, n, tam_bloque):
+        bloque = np.asarray(entrada[inicio:inicio + tam_bloque], dtype=np.float64)
+        x = np.arange(inicio, inicio + bloque.shape[0], dtype=np.float64)
+        suma_y = suma_y + bloque.sum(axis=0)
+        suma_xy = suma_xy + x @ bloque
+    pendiente = (n * suma_xy - suma_x * suma_y) / (n * suma_xx - suma_x ** 2)
+    ordenada = (suma_y - pendiente * suma_x) / n
+    return pendiente, ordenada
+
+
+def margen_transitorio(especificaciones):
+    """
+    Segundos que tarda en extinguirse el transitorio de la cadena: FACTOR_MARGEN veces
+    orden / f para la etapa más lenta (la frecuencia de corte más baja, o el ancho de banda
+    f / Q del notch, que es un filtro de orden 2).
+    """
+    margen = 0.0
+    for e in especificaciones:
+        if e[0] == "notch":
+            margen = max(margen, FACTOR_MARGEN * 2 * e[2] / e[1])
+        elif e[0] == "pasabanda":
+            margen = max(margen, FACTOR_MARGEN * e[3] / e[1])
+        elif e[0] in ("pasaaltos", "pasabajos"):
+            margen = max(margen, FACTOR_MARGEN * e[2] / e[1])
+    return margen
+
+
+def filtrar_por_bloques(entrada, salida, srate, especificaciones, duracion_bloque=60.0, margen=None):
+    """
+    Versión por bloques de filtrar_stream para datos que no caben en memoria (p. ej. arrays
+    memmap): procesa ventanas con márgenes a ambos lados y escribe solo la parte central en
+    `salida` (array o memmap de la misma forma). El margen por defecto cubre el transitorio
+    del filtro (margen_transitorio) y los bloques nunca son más cortos que el margen, para no
+    leer varias veces más datos de los que se escriben. La tendencia lineal se estima antes
+    sobre la señal completa, así que el resultado coincide con el filtrado en una sola pasada
+    salvo por diferencias despreciables en los bordes de los bloques.
+    """
+    quitar_tendencia, sos = disenar_cadena(srate, especificaciones)
+    if margen is None:
+        margen = margen_transitorio(especificaciones)
+    n = entrada.shape[0]
+    paso = max(int(max(duracion_bloque, margen) * srate), 1)
+    extra = int(margen * srate)
+    if quitar_tendencia:
+        pendiente, ordenada = _tendencia_lineal(entrada, paso)
+
+    for inicio in range(0, n, paso):
+        fin = min(inicio + paso, n)
+        a = max(inicio - extra, 0)
+        b = min(fin + extra, n)
+        bloque = np.asarray(entrada[a:b], dtype=np.float64)
+        if quitar_tendencia:
+            x = np.arange(a, b, dtype=np.float64)
+            bloque = bloque - (np.multiply.outer(x, pendiente) if bloque.ndim > 1 else x * pendiente) - ordenada
+        if sos is not None:
+            bloque = signal.sosfiltfilt(sos, bloque, axis=0)
+        salida[inicio:fin] = bloque[inicio - a:fin - a]
+    if isinstance(salida, np.memmap):
+        salida.flush()
+    return salida
+
+
+def describir(especificaciones):
+    """Texto corto para mostrar la cadena de filtros al usuario."""
+    partes = []
+    for e in especificaciones:
+        if e[0] == "notch":
+            partes.append(f"notch {e[1]:g} Hz")
+        elif e[0] == "pasabanda":
+            partes.append(f"pasabanda {e[1]:g}-{e[2]:g} Hz")
+        elif e[0] in ("pasaaltos", "pasabajos"):
+            partes.append(f"{e[0]} {e[1]:g} Hz")
+        elif e[0] == "tendencia":
+            partes.append("sin tendencia")
+    return ", ".join(partes)
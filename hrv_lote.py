@@ -0,0 +1,179 @@
+"""
+Cálculo por lotes de picos R e índices de HRV para muchos canales ECG y archivos XDF.
+Cada archivo se procesa en un proceso del pool (se lee una sola vez, sin graficar) y los
+resultados se escriben en una única tabla CSV con los tiempos de cada etapa por archivo.
+
+Uso sin interfaz:
+    python hrv_lote.py sujeto01.xdf sujeto02.xdf ... -o hrv.csv [--procesos N] [--indices time frequency]
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from carga_diferida import ModuloDiferido
+from modelo_temporal import ModeloTemporal
+from metadatos import MetadatosStream
+
+nk = ModuloDiferido("neurokit2")
+pyxdf = ModuloDiferido("pyxdf")
+
+INDICES_HRV = ("time", "frequency", "nonlinear")
+INDICES_POR_DEFECTO = ("time", "frequency")
+PICOS_MINIMOS = 10
+
+# Columnas fijas al inicio de la tabla (luego van los índices de HRV en orden de aparición)
+COLUMNAS_BASE = ["archivo", "canal", "sampling_rate", "duracion_s", "n_picos", "error",
+                 "tiempo_carga_s", "tiempo_picos_s", "tiempo_hrv_s", "tiempo_total_archivo_s"]
+
+
+def hrv_de_senal(senal, sampling_rate, indices=INDICES_POR_DEFECTO):
+    """
+    Detecta los picos R (limpieza + detección + corrección de artefactos) y calcula los
+    índices de HRV pedidos. Retorna un diccionario con n_picos, tiempos y los índices.
+    """
+    fila = {}
+    t0 = time.perf_counter()
+    limpia = nk.ecg_clean(np.asarray(senal, dtype=np.float64), sampling_rate=sampling_rate)
+    _, info = nk.ecg_peaks(limpia, sampling_rate=sampling_rate, correct_artifacts=True)
+    picos = np.asarray(info["ECG_R_Peaks"])
+    fila["n_picos"] = len(picos)
+    fila["tiempo_picos_s"] = time.perf_counter() - t0
+    if len(picos) < PICOS_MINIMOS:
+        raise ValueError(f"Solo se detectaron {len(picos)} picos R")
+
+    t0 = time.perf_counter()
+    funciones = {"time": nk.hrv_time, "frequency": nk.hrv_frequency, "nonlinear": nk.hrv_nonlinear}
+    for indice in indices:
+        tabla = funciones[indice](picos, sampling_rate=sampling_rate, show=False)
+        for columna in tabla.columns:
+            valor = tabla[columna].iloc[0]
+            fila[columna] = float(valor) if np.isscalar(valor) and valor is not None else valor
+    fila["tiempo_hrv_s"] = time.perf_counter() - t0
+    return fila
+
+
+def procesar_archivo(ruta, indices=INDICES_POR_DEFECTO):
+    """
+    Procesa todos los canales ECG de un archivo XDF. Se ejecuta en un proceso del pool, así
+    que solo recibe y retorna datos simples (ruta, lista de filas).
+    """
+    inicio_archivo = time.perf_counter()
+    archivo = os.path.basename(ruta)
+    try:
+        t0 = time.perf_counter()
+        streams_info = pyxdf.resolve_streams(ruta)
+        ids_numericos = [s["stream_id"] for s in streams_info if s.get("channel_format") != "string"]
+        ids_ecg = [s["stream_id"] for s in streams_info
+                   if s.get("channel_format") != "string" and "ECG" in str(s.get("type", "")).upper()]
+        data, _ = pyxdf.load_xdf(ruta, select_streams=ids_ecg) if ids_ecg else ([], None)
+        tiempo_carga = time.perf_counter() - t0
+    except Exception as e:
+        return [{"archivo": archivo, "canal": "", "error": f"No se pudo cargar: {e}",
+                 "tiempo_total_archivo_s": time.perf_counter() - inicio_archivo}]
+
+    filas = []
+    for stream in data:
+        y = stream.get("time_series")
+        if not isinstance(y, np.ndarray):
+            continue
+        # Misma numeración de streams y mismas etiquetas que la aplicación
+        stream_id = int(stream.get("info", {}).get("stream_id", 0) or 0)
+        s_idx = ids_numericos.index(stream_id) if stream_id in ids_numericos else len(filas)
+        meta = MetadatosStream.desde_info(stream.get("info", {}), 1 if y.ndim == 1 else y.shape[1], s_idx)
+        if "ECG" not in meta.tipo:
+            continue
+        modelo = ModeloTemporal.desde_marcas(stream.get("time_stamps", []), meta.srate_nominal)
+        sampling_rate = modelo.srate if modelo is not None else meta.srate_efectivo
+        for i, etiqueta in enumerate(meta.etiquetas):
+            fila = {"archivo": archivo, "canal": f"Stream {s_idx+1} - {etiqueta}",
+                    "sampling_rate": sampling_rate, "duracion_s": y.shape[0] / sampling_rate if sampling_rate else None,
+                    "tiempo_carga_s": tiempo_carga, "error": ""}
+            try:
+                if not sampling_rate:
+                    raise ValueError("Tasa de muestreo no válida")
+                fila.update(hrv_de_senal(y if y.ndim == 1 else y[:, i], sampling_rate, indices))
+            except Exception as e:
+                fila["error"] = str(e)
+            filas.append(fila)
+    if not filas:
+        filas.append({"archivo": archivo, "canal": "", "error": "No hay streams ECG", "tiempo_carga_s": tiempo_carga})
+    total = time.perf_counter() - inicio_archivo
+    for fila in filas:
+        fila["tiempo_total_archivo_s"] = total
+    return filas
+
+
+def procesar_senal(archivo, canal, senal, sampling_rate, indices=INDICES_POR_DEFECTO):
+    """Igual que procesar_archivo, pero para un canal ya cargado en la aplicación."""
+    inicio = time.perf_counter()
+    fila = {"archivo": archivo, "canal": canal, "sampling_rate": sampling_rate,
+            "duracion_s": len(senal) / sampling_rate, "error": "", "tiempo_carga_s": 0.0}
+    try:
+        fila.update(hrv_de_senal(senal, sampling_rate, indices))
+    except Exception as e:
+        fila["error"] = str(e)
+    fila["tiempo_total_archivo_s"] = time.perf_counter() - inicio
+    return [fila]
+
+
+def escribir_tabla(filas, ruta_csv):
+    """Escribe las filas en un CSV con las columnas base primero y luego todos los índices."""
+    columnas = list(COLUMNAS_BASE)
+    for fila in filas:
+        for columna in fila:
+            if columna not in columnas:
+                columnas.append(columna)
+    with open(ruta_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columnas)
+        writer.writeheader()
+        for fila in filas:
+            writer.writerow(fila)
+
+
+def _iniciar_proceso():
+    """Importa NeuroKit al arrancar cada proceso para que no cuente en el tiempo del primer canal."""
+    nk.cargar()
+    pyxdf.cargar()
+
+
+def ejecutar_lote(tareas, procesos=None, al_avanzar=None):
+    """
+    Ejecuta las tareas en un pool de procesos. Cada tarea es (funcion, args) con una de las
+    funciones de nivel superior de este módulo (procesar_archivo o procesar_senal).
+    `al_avanzar(hechas, total)` se llama en el proceso principal al terminar cada tarea.
+    Retorna todas las filas, en el orden de las tareas.
+    """
+    resultados = [None] * len(tareas)
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso) as pool:
+        futuros = {pool.submit(funcion, *args): i for i, (funcion, args) in enumerate(tareas)}
+        for hechas, futuro in enumerate(as_completed(futuros), 1):
+            resultados[futuros[futuro]] = futuro.result()
+            if al_avanzar is not None:
+                al_avanzar(hechas, len(tareas))
+    return [fila for filas in resultados for fila in filas]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Picos R e índices de HRV por lotes para archivos XDF.")
+    parser.add_argument("archivos", nargs="+", help="Archivos XDF a procesar")
+    parser.add_argument("-o", "--salida", default="hrv_lote.csv", help="CSV de resultados")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--indices", nargs="+", choices=INDICES_HRV, default=list(INDICES_POR_DEFECTO))
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tareas = [(procesar_archivo, (ruta, tuple(args.indices))) for ruta in args.archivos]
+    filas = ejecutar_lote(tareas, args.procesos,
+                          al_avanzar=lambda hechas, total: print(f"{hechas}/{total} archivos procesados"))
+    escribir_tabla(filas, args.salida)
+    errores = sum(1 for fila in filas if fila.get("error"))
+    print(f"{len(filas)} canales ({errores} con error) en {time.perf_counter() - inicio:.1f} s -> {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import cProfile
+import csv
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# cProfile admite un solo perfil activo por proceso (desde Python 3.12 enable() falla si ya
+# hay otro): una etapa anidada, o de otro hilo, queda incluida en el perfil que ya corre
+_perfil_en_curso = threading.Lock()
+
+# Columnas exportadas en el registro CSV (y orden de las claves en el JSON)
+CAMPOS_REGISTRO = ["etapa", "detalle", "inicio", "tiempo_pared", "tiempo_cpu",
+                   "muestras", "muestras_por_s", "memoria_pico", "perfil"]
+
+
+class RegistroEtapas:
+    """
+    Registra el tiempo de pared, el tiempo de CPU, las muestras procesadas y la memoria pico
+    de cada etapa del flujo (carga, nombres de canales, recorte, alineación, exportación,
+    NeuroKit...). Opcionalmente ejecuta la etapa bajo cProfile y guarda las funciones más
+    costosas. La memoria pico se mide solo si se pide: tracemalloc registra cada asignación y
+    hace ~15 veces más lenta la lectura de pyxdf, que crea un objeto por muestra.
+
+    Uso:
+        with registro.etapa("recorte", detalle=clave) as r:
+            ...
+            r["muestras"] = len(datos)
+    """
+
+    def __init__(self, medir_memoria=False, perfilar=False, lineas_perfil=25):
+        self.medir_memoria = medir_memoria
+        self.perfilar = perfilar
+        self.lineas_perfil = lineas_perfil
+        self.registros = []
+        self.al_registrar = []  # Funciones llamadas con cada registro nuevo
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _pila(self):
+        if not hasattr(self._local, "pila"):
+            self._local.pila = []
+        return self._local.pila
+
+    @contextmanager
+    def etapa(self, nombre, detalle="", muestras=0, perfilar=None, medir_memoria=None):
+        """
+        Mide el bloque `with`. El diccionario entregado puede actualizarse dentro del bloque.
+        Las etapas que corren en paralelo en otros hilos deben pasar medir_memoria=False: el
+        pico de tracemalloc es global y mezclaría la memoria de todos los hilos.
+        """
+        registro = {"etapa": nombre, "detalle": detalle, "inicio": time.time(),
+                    "muestras": muestras, "perfil": None}
+        pila = self._pila()
+        perfilar = self.perfilar if perfilar is None else perfilar
+        medir_memoria = self.medir_memoria if medir_memoria is None else medir_memoria
+
+        # Memoria: tracemalloc tiene un único pico global, así que al anidar etapas se guarda
+        # el pico acumulado del padre antes de reiniciarlo.
+        iniciado_aqui = False
+        marco = {"mem_inicio": 0, "pico_hijos": 0}
+        if medir_memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                iniciado_aqui = True
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1]["pico_hijos"] = max(pila[-1]["pico_hijos"], pico)
+            if hasattr(tracemalloc, "reset_peak"):  # Python >= 3.9
+                tracemalloc.reset_peak()
+            marco["mem_inicio"] = actual
+        pila.append(marco)
+
+        perfil = cProfile.Profile() if perfilar and _perfil_en_curso.acquire(blocking=False) else None
+        t_pared = time.perf_counter()
+        t_cpu = time.process_time()
+        if perfil is not None:
+            try:
+                perfil.enable()
+            except ValueError:  # Otro perfilador ajeno (p. ej. un depurador) ya está activo
+                _perfil_en_curso.release()
+                perfil = None
+        try:
+            yield registro
+        finally:
+            if perfil is not None:
+                perfil.disable()
+                _perfil_en_curso.release()
+            registro["tiempo_pared"] = time.perf_counter() - t_pared
+            registro["tiempo_cpu"] = time.process_time() - t_cpu
+            pila.pop()
+
+            registro["memoria_pico"] = None
+            if medir_memoria and tracemalloc.is_tracing():
+                _, pico = tracemalloc.get_traced_memory()
+                pico = max(pico, marco["pico_hijos"])
+                registro["memoria_pico"] = max(0, pico - marco["mem_inicio"])
+                if pila:
+                    pila[-1]["pico_hijos"] = max(pila[-1]["pico_hijos"], pico)
+                if iniciado_aqui:
+                    tracemalloc.stop()
+
+            muestras = registro.get("muestras") or 0
+            registro["muestras_por_s"] = (muestras / registro["tiempo_pared"]
+                                          if registro["tiempo_pared"] > 0 else None)
+            if perfil is not None:
+                salida = io.StringIO()
+                pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(self.lineas_perfil)
+                registro["perfil"] = salida.getvalue()
+
+            with self._lock:
+                self.registros.append(registro)
+            for funcion in list(self.al_registrar):
+                funcion(registro)
+
+    def limpiar(self):
+        with self._lock:
+            self.registros = []
+
+    def resumen(self):
+        """Totales por etapa: {etapa: {'veces', 'tiempo_pared', 'tiempo_cpu', 'muestras', 'memoria_pico'}}."""
+        totales = {}
+        with self._lock:
+            registros = list(self.registros)
+        for r in registros:
+            t = totales.setdefault(r["etapa"], {"veces": 0, "tiempo_pared": 0.0, "tiempo_cpu": 0.0,
+                                                "muestras": 0, "memoria_pico": 0})
+            t["veces"] += 1
+            t["tiempo_pared"] += r["tiempo_pared"]
+            t["tiempo_cpu"] += r["tiempo_cpu"]
+            t["muestras"] += r.get("muestras") or 0
+            t["memoria_pico"] = max(t["memoria_pico"], r.get("memoria_pico") or 0)
+        return totales
+
+    def exportar_json(self, ruta):
+        with self._lock:
+            registros = [{campo: r.get(campo) for campo in CAMPOS_REGISTRO} for r in self.registros]
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump({"registros": registros, "resumen": self.resumen()}, f, indent=2, ensure_ascii=False)
+
+    def exportar_csv(self, ruta):
+        with self._lock:
+            registros = list(self.registros)
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CAMPOS_REGISTRO, extrasaction="ignore")
+            writer.writeheader()
+            for r in registros:
+                writer.writerow(r)
+
+
+# Registro compartido por toda la aplicación (la memoria pico se activa desde el menú Rendimiento)
+registro_etapas = RegistroEtapas()
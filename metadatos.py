@@ -0,0 +1,120 @@
+import numpy as np
+
+# Tasa de muestreo esperada (Hz) según el tipo del stream, para avisar si la medida difiere
+TASAS_ESPERADAS = (("ACC", 25), ("GYRO", 25), ("MAG", 25), ("PPG", 25), ("TEMP", 7), ("EDA", 15))
+
+
+def _valor(campo):
+    """Primer valor de un campo del header de pyxdf (que guarda todo como listas de textos)."""
+    while isinstance(campo, list):
+        campo = campo[0] if campo else None
+    return campo if campo is not None else ""
+
+
+def _numero(campo):
+    try:
+        return float(_valor(campo) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _canales_desc(info):
+    """Lista de diccionarios <channel> de desc/channels, o [] si el header no los trae."""
+    try:
+        canales = info["desc"][0]["channels"][0]["channel"]
+    except (KeyError, IndexError, TypeError):
+        return []
+    if isinstance(canales, dict):
+        return [canales]
+    return canales if isinstance(canales, list) else []
+
+
+def tasa_esperada(tipo):
+    tipo = (tipo or "").upper()
+    for clave, tasa in TASAS_ESPERADAS:
+        if clave in tipo:
+            return tasa
+    return None
+
+
+class MetadatosStream:
+    """
+    Metadatos de un stream en campos planos (textos, números y listas por canal), extraídos del
+    header anidado de pyxdf una sola vez al cargar. Los diálogos y el procesamiento leen de aquí
+    el tipo, la tasa y las etiquetas en lugar de volver a recorrer info["desc"].
+    """
+
+    __slots__ = ("stream_id", "nombre", "tipo", "formato", "srate_nominal", "srate_efectivo",
+                 "etiquetas", "unidades", "tipos_canal")
+
+    def __init__(self, stream_id, nombre, tipo, formato, srate_nominal, srate_efectivo,
+                 etiquetas, unidades, tipos_canal):
+        self.stream_id = stream_id
+        self.nombre = nombre
+        self.tipo = tipo                      # En mayúsculas
+        self.formato = formato
+        self.srate_nominal = srate_nominal    # 0.0 si el stream es irregular
+        self.srate_efectivo = srate_efectivo  # Calculada por pyxdf al cargar (0.0 si no existe)
+        self.etiquetas = etiquetas            # Una por canal, sin huecos
+        self.unidades = unidades
+        self.tipos_canal = tipos_canal
+
+    @classmethod
+    def desde_info(cls, info, n_canales=None, s_idx=0):
+        """
+        Extrae los metadatos del header de un stream. `n_canales` es el número real de columnas
+        de los datos (si se omite, se usa channel_count). Las etiquetas que falten en desc se
+        completan con "<nombre> i", "Canal i" o "Stream k i", como al nombrar los canales.
+        """
+        info = info or {}
+        canales = _canales_desc(info)
+        campos = [(_valor(c.get("label")), _valor(c.get("unit")), _valor(c.get("type")))
+                  if isinstance(c, dict) else ("", "", "") for c in canales]
+        etiquetas, unidades, tipos_canal = (list(columna) for columna in zip(*campos)) if campos else ([], [], [])
+
+        nombre = str(_valor(info.get("name")))
+        conteo = int(_numero(info.get("channel_count"))) or 1
+        n = n_canales if n_canales is not None else conteo
+        if nombre:
+            respaldo = [nombre] if n == 1 else [f"{nombre} {i+1}" for i in range(n)]
+        elif conteo >= n:
+            respaldo = [f"Canal {i+1}" for i in range(n)]
+        else:
+            base = f"Stream {s_idx+1}"
+            respaldo = [base] if n == 1 else [f"{base} {i+1}" for i in range(n)]
+        if len(etiquetas) < n or not any(etiquetas):
+            etiquetas = respaldo
+        else:
+            etiquetas = [str(e) if e else r for e, r in zip(etiquetas, respaldo)]
+        unidades = [str(u) for u in unidades[:n]] + [""] * (n - min(len(unidades), n))
+        tipos_canal = [str(t) for t in tipos_canal[:n]] + [""] * (n - min(len(tipos_canal), n))
+
+        return cls(int(_numero(info.get("stream_id"))), nombre, str(_valor(info.get("type"))).upper(),
+                   str(_valor(info.get("channel_format"))), _numero(info.get("nominal_srate")),
+                   _numero(info.get("effective_srate")), etiquetas, unidades, tipos_canal)
+
+    @property
+    def n_canales(self):
+        return len(self.etiquetas)
+
+    @property
+    def srate_esperada(self):
+        return tasa_esperada(self.tipo)
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(**{campo: datos[campo] for campo in cls.__slots__})
+
+
+def metadatos_de(stream):
+    """Metadatos de un stream; se extraen del header la primera vez y quedan en stream["meta"]."""
+    meta = stream.get("meta")
+    if meta is None:
+        y = stream.get("time_series")
+        n_canales = (1 if y.ndim == 1 else y.shape[1]) if isinstance(y, np.ndarray) else None
+        meta = MetadatosStream.desde_info(stream.get("info", {}), n_canales)
+        stream["meta"] = meta
+    return meta
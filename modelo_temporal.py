@@ -0,0 +1,276 @@
+import bisect
+
+import numpy as np
+
+# Un salto entre muestras mayor que FACTOR_GAP veces el periodo esperado se considera un corte
+FACTOR_GAP = 1.5
+# Si el residuo del modelo lineal supera esta fracción del periodo, el stream no se trata como regular
+RESIDUO_MAX_PERIODOS = 0.5
+# Con tolerancia al jitter, como en pyxdf, un salto entre marcas solo separa tramos si supera
+# CORTE_JITTER_S segundos y CORTE_JITTER_MUESTRAS periodos; las pérdidas menores se buscan como escalones
+CORTE_JITTER_S = 1.0
+CORTE_JITTER_MUESTRAS = 500
+BLOQUE_JITTER = 64          # Muestras de cada bloque en que se mide el jitter local de los residuos
+VENTANA_MAX_ESCALON = 4096  # Ventana máxima (muestras) a cada lado para detectar un escalón
+RONDAS_ESCALONES = 4        # Búsquedas de escalones (cada una tras reajustar con los ya encontrados)
+# Una tasa efectiva más lejos que esto de la nominal indica pérdidas que no se pudieron ubicar
+TOLERANCIA_TASA_JITTER = 0.01
+
+
+class ModeloTemporal:
+    """
+    Modelo lineal por tramos de las marcas de tiempo de un stream de tasa nominal regular:
+    dentro del tramo k, la muestra i tiene tiempo t_k + (i - i_k) / srate.
+    Los tramos se separan en los cortes (gaps) detectados al cargar, de modo que convertir
+    un tiempo a índice es aritmética O(1) (más una búsqueda entre los pocos tramos) en lugar
+    de una búsqueda sobre todo el array de tiempos.
+    """
+
+    def __init__(self, time_stamps, srate, inicios_idx, inicios_t, residuo_max, n=None):
+        self._time_stamps = time_stamps  # Array, o función que lo entrega (stream aún no leído)
+        self.srate = srate
+        self.inicios_idx = inicios_idx  # Índice de la primera muestra de cada tramo
+        self.inicios_t = inicios_t      # Tiempo (según el modelo) de la primera muestra de cada tramo
+        self.residuo_max = residuo_max
+        self.n = len(time_stamps) if n is None else n
+
+    @property
+    def time_stamps(self):
+        """Marcas reales. Si el modelo se restauró de una sesión, se piden en el primer uso."""
+        if callable(self._time_stamps):
+            self._time_stamps = self._time_stamps()
+        return self._time_stamps
+
+    @classmethod
+    def desde_marcas(cls, time_stamps, nominal_srate=None, tolerar_jitter=False):
+        """
+        Ajusta el modelo a partir de las marcas de tiempo. Retorna None si el stream es
+        irregular (tasa nominal 0), tiene menos de dos muestras o no se ajusta a una recta.
+        Con tolerar_jitter=True (para quitar el jitter de marcas sin corregir) se usa
+        _desde_marcas_con_jitter en lugar de exigir un residuo máximo.
+        """
+        t = np.asarray(time_stamps, dtype=np.float64)
+        if t.size < 2:
+            return None
+        dt = np.diff(t)
+        if nominal_srate:
+            periodo = 1.0 / float(nominal_srate)
+        else:
+            periodo = float(np.median(dt))
+        if periodo <= 0:
+            return None
+        if tolerar_jitter:
+            return cls._desde_marcas_con_jitter(t, dt, periodo)
+
+        cortes = np.flatnonzero(dt > FACTOR_GAP * periodo) + 1
+        inicios_idx = np.concatenate(([0], cortes))
+        finales_idx = np.concatenate((cortes, [t.size])) - 1
+
+        # Tasa efectiva usando solo el interior de los tramos (los cortes no cuentan)
+        intervalos = int(np.sum(finales_idx - inicios_idx))
+        duracion = float(np.sum(t[finales_idx] - t[inicios_idx]))
+        if intervalos == 0 or duracion <= 0:
+            return None
+        srate = intervalos / duracion
+
+        # Origen de cada tramo por mínimos cuadrados (media del desfase), en una sola pasada
+        tramo = np.repeat(np.arange(inicios_idx.size), finales_idx - inicios_idx + 1)
+        desfase = t - (np.arange(t.size) - inicios_idx[tramo]) / srate
+        inicios_t = np.bincount(tramo, weights=desfase) / np.bincount(tramo)
+        residuo_max = float(np.max(np.abs(desfase - inicios_t[tramo])))
+        if residuo_max > RESIDUO_MAX_PERIODOS / srate:
+            return None
+        return cls(t, srate, inicios_idx, inicios_t, residuo_max)
+
+    @classmethod
+    def _desde_marcas_con_jitter(cls, t, dt, periodo):
+        """
+        Modelo de marcas con jitter de llegada (incluidas las que llegan agrupadas, con la misma
+        marca para todo un bloque de muestras). Como en pyxdf, los tramos se separan solo en los
+        saltos grandes y cada uno se ajusta por mínimos cuadrados, con la tasa efectiva (una
+        pendiente común) y no la nominal. Las pérdidas de pocas muestras dentro de un tramo se
+        ubican como escalones del residuo (ver _escalones) y se confirman con el salto ajustado,
+        que debe ser de al menos medio periodo. Retorna None (las marcas no se deben reemplazar)
+        si quedan escalones sin ubicar o la tasa efectiva se aleja de la nominal.
+        """
+        grandes = np.flatnonzero(dt > max(CORTE_JITTER_S, CORTE_JITTER_MUESTRAS * periodo)) + 1
+
+        def ajustar(escalones):
+            inicios_idx = np.union1d(np.concatenate(([0], grandes)), escalones).astype(np.int64)
+            return (inicios_idx,) + (_ajustar_tramos(t, inicios_idx) or (None, None, None))
+
+        escalones = np.empty(0, dtype=np.int64)
+        for _ in range(RONDAS_ESCALONES):
+            _, pendiente, _, residuos = ajustar(escalones)
+            if pendiente is None:
+                return None
+            nuevos = _escalones(residuos, periodo, np.union1d(grandes, escalones))
+            if nuevos.size == 0:
+                break
+            escalones = np.union1d(escalones, nuevos)
+
+        inicios_idx, pendiente, inicios_t, residuos = ajustar(escalones)
+        if pendiente is None:
+            return None
+        if escalones.size:
+            # Un escalón de ruido no tiene detrás un salto de al menos medio periodo: se descarta
+            k = np.searchsorted(inicios_idx, escalones)
+            salto = inicios_t[k] - inicios_t[k - 1] - pendiente * (inicios_idx[k] - inicios_idx[k - 1])
+            if np.any(salto < periodo / 2.0):
+                inicios_idx, pendiente, inicios_t, residuos = ajustar(escalones[salto >= periodo / 2.0])
+                if pendiente is None:
+                    return None
+
+        if abs(pendiente / periodo - 1.0) > TOLERANCIA_TASA_JITTER:
+            return None
+        ventana, umbral = _ventana_escalon(residuos, periodo)
+        if t.size >= 2 * ventana + 1:
+            diferencia = _estadistico_escalon(residuos, ventana)
+            if max(diferencia.max(), -diferencia.min()) > umbral:
+                return None
+        return cls(t, 1.0 / pendiente, inicios_idx, inicios_t, float(np.max(np.abs(residuos))))
+
+    @property
+    def cortes(self):
+        """Lista de (tiempo_fin_tramo, tiempo_inicio_siguiente) para cada gap detectado."""
+        return [(float(self.time_stamps[i - 1]), float(self.time_stamps[i])) for i in self.inicios_idx[1:]]
+
+    def tiempos_modelo(self):
+        """Tiempos de todas las muestras según el modelo (las marcas sin el jitter de llegada)."""
+        largos = np.diff(np.concatenate((self.inicios_idx, [self.n])))
+        tramo = np.repeat(np.arange(self.inicios_idx.size), largos)
+        return self.inicios_t[tramo] + (np.arange(self.n) - self.inicios_idx[tramo]) / self.srate
+
+    def _estimar(self, t):
+        k = max(int(np.searchsorted(self.inicios_t, t, side="right")) - 1, 0)
+        fin = self.inicios_idx[k + 1] if k + 1 < self.inicios_idx.size else self.n
+        idx = self.inicios_idx[k] + int(np.floor((t - self.inicios_t[k]) * self.srate))
+        return min(max(idx, self.inicios_idx[k]), fin)
+
+    def indice(self, t, side="left"):
+        """
+        Equivalente a np.searchsorted(time_stamps, t, side): índice de la primera muestra con
+        tiempo >= t ('left') o > t ('right'). El modelo da la posición aproximada y el jitter
+        residual se corrige comparando con las marcas reales vecinas.
+        """
+        ts = self.time_stamps
+        idx = self._estimar(t)
+        if side == "left":
+            while idx > 0 and ts[idx - 1] >= t:
+                idx -= 1
+            while idx < self.n and ts[idx] < t:
+                idx += 1
+        else:
+            while idx > 0 and ts[idx - 1] > t:
+                idx -= 1
+            while idx < self.n and ts[idx] <= t:
+                idx += 1
+        return idx
+
+
+def _ajustar_tramos(t, inicios_idx):
+    """
+    Mínimos cuadrados de t_i = inicio_k + (i - i_k) * pendiente, con un origen por tramo y una
+    pendiente (periodo efectivo) común. Retorna (pendiente, inicios_t, residuos) o None si
+    ningún tramo tiene dos muestras. Las sumas por tramo se hacen con reduceat y en el lugar,
+    para no tener más de tres arrays del largo de t a la vez.
+    """
+    largos = np.diff(np.concatenate((inicios_idx, [t.size]))).astype(np.float64)
+    # Suma de (x - x_medio)^2 con x = 0..L-1 en cada tramo
+    varianza = float(np.sum(largos * (largos ** 2 - 1.0) / 12.0))
+    if varianza <= 0:
+        return None
+    repetir = largos.astype(np.int64)
+    t_centrado = np.repeat(np.add.reduceat(t, inicios_idx) / largos, repetir)
+    np.subtract(t, t_centrado, out=t_centrado)
+    x = np.arange(t.size, dtype=np.float64)  # Posición dentro del tramo
+    x_medio = (largos - 1.0) / 2.0
+    x -= np.repeat(inicios_idx + x_medio, repetir)  # Centrada en cada tramo
+    pendiente = float(np.dot(x, t_centrado)) / varianza
+    del t_centrado
+    x += np.repeat(x_medio, repetir)
+    # Origen de cada tramo como media del desfase (más exacto que t_medio - pendiente * x_medio)
+    x *= -pendiente
+    x += t
+    inicios_t = np.add.reduceat(x, inicios_idx) / largos
+    x -= np.repeat(inicios_t, repetir)
+    return pendiente, inicios_t, x
+
+
+def _ventana_escalon(residuos, periodo):
+    """
+    Ventana (muestras a cada lado) y umbral con que se buscan escalones en los residuos. El
+    jitter se mide en bloques cortos (mediana de sus desviaciones), para que los escalones que
+    se buscan no lo inflen. El umbral es medio periodo; la ventana se elige para que el ruido
+    de la diferencia de medias quede por debajo del umbral en sqrt(2 ln n) + 1 desviaciones
+    (el máximo esperado del ruido en n posiciones, con margen).
+    """
+    bloques = residuos.size // BLOQUE_JITTER
+    if bloques:
+        jitter = float(np.median(np.std(residuos[:bloques * BLOQUE_JITTER].reshape(bloques, BLOQUE_JITTER), axis=1)))
+    else:
+        jitter = float(np.std(residuos))
+    desviaciones = np.sqrt(2.0 * np.log(residuos.size)) + 1.0
+    ventana = int(np.clip(np.ceil(8.0 * (desviaciones * jitter / periodo) ** 2), 8, VENTANA_MAX_ESCALON))
+    return ventana, max(periodo / 2.0, desviaciones * jitter * np.sqrt(2.0 / ventana))
+
+
+def _estadistico_escalon(residuos, ventana):
+    """
+    Para cada índice i desde `ventana`, media de los residuos en [i, i + ventana) menos la
+    media en [i - ventana, i). El elemento j del resultado corresponde a i = ventana + j.
+    """
+    acumulado = np.concatenate(([0.0], np.cumsum(residuos)))
+    fin = residuos.size - ventana + 1
+    diferencia = acumulado[2 * ventana:] - acumulado[ventana:fin]
+    diferencia -= acumulado[ventana:fin]
+    diferencia += acumulado[:fin - ventana]
+    diferencia /= ventana
+    return diferencia
+
+
+def _escalones(residuos, periodo, existentes):
+    """
+    Índices donde empieza un tramo tras perder muestras, aunque el salto entre marcas no
+    destaque sobre el jitter: cada muestra perdida sube un periodo el nivel de los residuos.
+    En cada zona en que la diferencia de medias supera el umbral, el escalón va donde es
+    máxima; de dos escalones a menos de una ventana (o junto a un corte ya existente) queda
+    el mayor, el resto se busca en la ronda siguiente.
+    """
+    ventana, umbral = _ventana_escalon(residuos, periodo)
+    if residuos.size < 2 * ventana + 1:
+        return np.empty(0, dtype=np.int64)
+    diferencia = _estadistico_escalon(residuos, ventana)
+    candidatos = np.flatnonzero(diferencia > umbral)
+    if candidatos.size == 0:
+        return np.empty(0, dtype=np.int64)
+    zonas = np.split(candidatos, np.flatnonzero(np.diff(candidatos) > 1) + 1)
+    picos = sorted(((diferencia[z].max(), ventana + int(z[np.argmax(diferencia[z])])) for z in zonas), reverse=True)
+    ocupados = sorted(int(otro) for otro in existentes)
+    nuevos = []
+    for _, idx in picos:
+        k = bisect.bisect_left(ocupados, idx)
+        if (k < len(ocupados) and ocupados[k] - idx < ventana) or (k > 0 and idx - ocupados[k - 1] < ventana):
+            continue
+        ocupados.insert(k, idx)
+        nuevos.append(idx)
+    return np.array(sorted(nuevos), dtype=np.int64)
+
+
+def buscar_indice(time_stamps, t, side="left", modelo=None):
+    """Índice de inserción de t en time_stamps, usando el modelo temporal si existe."""
+    if modelo is not None:
+        return modelo.indice(t, side)
+    return int(np.searchsorted(time_stamps, t, side=side))
+
+
+def indices_mas_cercanos(time_stamps, tiempos):
+    """Para cada tiempo de `tiempos`, índice de la muestra más cercana en time_stamps (ordenado)."""
+    time_stamps = np.asarray(time_stamps)
+    tiempos = np.asarray(tiempos, dtype=np.float64)
+    idx = np.clip(np.searchsorted(time_stamps, tiempos), 1, max(len(time_stamps) - 1, 1))
+    anterior = time_stamps[idx - 1]
+    siguiente = time_stamps[np.minimum(idx, len(time_stamps) - 1)]
+    idx = idx - ((tiempos - anterior) <= (siguiente - tiempos))
+    return np.clip(idx, 0, len(time_stamps) - 1)
+
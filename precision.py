@@ -0,0 +1,93 @@
+import numpy as np
+from carga_diferida import ModuloDiferido
+
+nk = ModuloDiferido("neurokit2")
+
+# Tolerancia relativa aceptada entre los resultados de NeuroKit con float64 y float32
+TOLERANCIA_FLOAT32 = 1e-3
+
+
+def convertir_precision(y, dtype):
+    """
+    Reduce los datos de un stream al tipo indicado (p. ej. np.float32) solo si son de punto
+    flotante y de mayor precisión; nunca se aumenta la precisión (un stream float32 sigue en
+    float32 aunque se pida float64), y los enteros (contadores, canales digitales) se dejan tal
+    cual para no perder exactitud. Las marcas de tiempo nunca pasan por aquí: se mantienen en float64.
+    """
+    if (isinstance(y, np.ndarray) and np.issubdtype(y.dtype, np.floating)
+            and y.dtype.itemsize > np.dtype(dtype).itemsize):
+        return y.astype(dtype)
+    return y
+
+
+def memoria_canales(canales_dict):
+    """Bytes ocupados por los arrays de datos de los canales (cada stream se cuenta una vez)."""
+    vistos = set()
+    total = 0
+    for canal in canales_dict.values():
+        for arr in (canal["data"], canal["time"]):
+            if not isinstance(arr, np.ndarray):
+                continue
+            base = arr.base if arr.base is not None else arr
+            if id(base) not in vistos:
+                vistos.add(id(base))
+                total += base.nbytes
+    return total
+
+
+def _diferencia_relativa(a, b, escala):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    validos = ~(np.isnan(a) | np.isnan(b))
+    if not np.any(validos) or escala == 0:
+        return 0.0
+    return float(np.max(np.abs(a[validos] - b[validos])) / escala)
+
+
+def comparar_resultados_neurokit(senal, sampling_rate, tipo, tolerancia=TOLERANCIA_FLOAT32):
+    """
+    Procesa la misma señal con NeuroKit en float64 y en float32 y compara los resultados.
+    Retorna un diccionario con 'ok' (bool) y las métricas de diferencia calculadas:
+      - ECG: número de picos R, desplazamiento máximo de los picos (muestras) y diferencia
+        relativa máxima de ECG_Rate.
+      - EDA: número de picos SCR y diferencia relativa máxima de EDA_Tonic / EDA_Phasic
+        respecto al rango de la señal limpia.
+    """
+    senal64 = np.asarray(senal, dtype=np.float64).flatten()
+    senal32 = senal64.astype(np.float32)
+    tipo = tipo.upper() if tipo else ""
+    metricas = {}
+
+    if "ECG" in tipo:
+        sig64, info64 = nk.ecg_process(senal64, sampling_rate=sampling_rate)
+        sig32, info32 = nk.ecg_process(senal32, sampling_rate=sampling_rate)
+        picos64 = np.asarray(info64["ECG_R_Peaks"])
+        picos32 = np.asarray(info32["ECG_R_Peaks"])
+        metricas["picos_float64"] = len(picos64)
+        metricas["picos_float32"] = len(picos32)
+        if len(picos64) == len(picos32) and len(picos64) > 0:
+            metricas["desplazamiento_max_picos"] = int(np.max(np.abs(picos64 - picos32)))
+        else:
+            metricas["desplazamiento_max_picos"] = None
+        rate64 = sig64["ECG_Rate"].to_numpy()
+        metricas["dif_rel_ECG_Rate"] = _diferencia_relativa(rate64, sig32["ECG_Rate"].to_numpy(),
+                                                             np.nanmean(np.abs(rate64)))
+        ok = (metricas["desplazamiento_max_picos"] is not None
+              and metricas["desplazamiento_max_picos"] <= 1
+              and metricas["dif_rel_ECG_Rate"] <= tolerancia)
+    elif "EDA" in tipo:
+        sig64, info64 = nk.eda_process(senal64, sampling_rate=sampling_rate)
+        sig32, info32 = nk.eda_process(senal32, sampling_rate=sampling_rate)
+        escala = float(np.ptp(sig64["EDA_Clean"].to_numpy()))
+        metricas["picos_float64"] = len(info64["SCR_Peaks"])
+        metricas["picos_float32"] = len(info32["SCR_Peaks"])
+        for columna in ("EDA_Tonic", "EDA_Phasic"):
+            metricas[f"dif_rel_{columna}"] = _diferencia_relativa(
+                sig64[columna].to_numpy(), sig32[columna].to_numpy(), escala)
+        ok = (metricas["picos_float64"] == metricas["picos_float32"]
+              and metricas["dif_rel_EDA_Tonic"] <= tolerancia
+              and metricas["dif_rel_EDA_Phasic"] <= tolerancia)
+    else:
+        raise ValueError(f"No hay comparación implementada para el tipo '{tipo}'")
+
+    return {"tipo": tipo, "ok": bool(ok), "tolerancia": tolerancia, "metricas": metricas}
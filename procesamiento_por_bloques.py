@@ -0,0 +1,96 @@
+import json
+import os
+
+import numpy as np
+from carga_diferida import ModuloDiferido
+
+nk = ModuloDiferido("neurokit2")
+
+# Duración de cada bloque y del margen a cada lado (segundos). El margen absorbe los
+# transitorios de los filtros y la detección de picos en los bordes: de cada bloque solo se
+# conserva la parte central.
+DURACION_BLOQUE = 600
+MARGEN_BLOQUE = 30
+
+# Sufijos de las claves de `info` que contienen índices de muestra (ECG_R_Peaks, ECG_P_Onsets,
+# SCR_Recovery...): se desplazan al unir los bloques
+SUFIJOS_INDICE = ("_Peaks", "_Peaks_Uncorrected", "_Onsets", "_Offsets", "_Recovery")
+# Clave de `info` que define qué eventos pertenecen a cada bloque
+CLAVE_EVENTOS = {"ECG": "ECG_R_Peaks", "EDA": "SCR_Peaks"}
+
+
+def _procesar(senal, sampling_rate, tipo):
+    if tipo == "ECG":
+        return nk.ecg_process(senal, sampling_rate=sampling_rate)
+    if tipo == "EDA":
+        return nk.eda_process(nk.eda_clean(senal, sampling_rate=sampling_rate), sampling_rate=sampling_rate)
+    raise ValueError(f"El procesamiento por bloques no está implementado para el tipo '{tipo}'")
+
+
+def procesar_por_bloques(senal, sampling_rate, tipo, directorio_salida,
+                         duracion_bloque=DURACION_BLOQUE, margen=MARGEN_BLOQUE, al_avanzar=None):
+    """
+    Procesa una señal larga con NeuroKit (ECG o EDA) en bloques solapados y escribe el
+    resultado en disco a medida que avanza, de modo que la memoria pico depende del tamaño
+    del bloque y no de la duración de la grabación.
+
+    Cada columna de `signals` se guarda como un .npy en `directorio_salida` (abiertos luego
+    con memmap), y los eventos de `info` (picos, inicios, amplitudes...) se unen en
+    `info.json` con los índices referidos a la señal completa.
+
+    Retorna (signals, info): signals es un diccionario columna -> array memmap de solo lectura.
+    """
+    tipo = tipo.upper()
+    tipo = "ECG" if "ECG" in tipo else "EDA" if "EDA" in tipo else tipo
+    senal = np.asarray(senal)
+    n = senal.shape[0]
+    paso = max(int(round(duracion_bloque * sampling_rate)), 1)
+    extra = int(round(margen * sampling_rate))
+    os.makedirs(directorio_salida, exist_ok=True)
+
+    columnas = {}
+    info_total = {}
+    for inicio in range(0, n, paso):
+        fin = min(inicio + paso, n)
+        a = max(inicio - extra, 0)
+        b = min(fin + extra, n)
+        signals, info = _procesar(np.asarray(senal[a:b], dtype=np.float64), sampling_rate, tipo)
+
+        # Parte central del bloque -> archivos .npy de la señal completa
+        central = signals.iloc[inicio - a:fin - a]
+        for nombre in central.columns:
+            if nombre not in columnas:
+                ruta = os.path.join(directorio_salida, f"{nombre}.npy")
+                columnas[nombre] = np.lib.format.open_memmap(ruta, mode="w+", dtype=np.float64, shape=(n,))
+            columnas[nombre][inicio:fin] = central[nombre].to_numpy(dtype=np.float64)
+
+        # Eventos: solo los que caen en la parte central, con índices absolutos
+        eventos = np.asarray(info.get(CLAVE_EVENTOS[tipo], []), dtype=np.float64)
+        en_bloque = (eventos + a >= inicio) & (eventos + a < fin)
+        for clave, valor in info.items():
+            if isinstance(valor, (list, np.ndarray)) and len(valor) == len(eventos):
+                valor = np.asarray(valor, dtype=np.float64)[en_bloque]
+                if clave.endswith(SUFIJOS_INDICE):
+                    valor = valor + a
+                info_total.setdefault(clave, []).extend(valor.tolist())
+            elif clave not in info_total and not isinstance(valor, (list, np.ndarray)):
+                info_total[clave] = valor
+
+        del signals, info, central
+        if al_avanzar is not None:
+            al_avanzar(fin, n)
+
+    for arr in columnas.values():
+        arr.flush()
+    info_total["sampling_rate"] = sampling_rate
+    with open(os.path.join(directorio_salida, "info.json"), "w", encoding="utf-8") as f:
+        json.dump(info_total, f, default=lambda v: v.item() if hasattr(v, "item") else str(v))
+
+    return cargar_resultado(directorio_salida, list(columnas)), info_total
+
+
+def cargar_resultado(directorio, columnas=None):
+    """Abre (memmap, solo lectura) las columnas guardadas por procesar_por_bloques."""
+    if columnas is None:
+        columnas = [f[:-4] for f in sorted(os.listdir(directorio)) if f.endswith(".npy")]
+    return {c: np.load(os.path.join(directorio, f"{c}.npy"), mmap_mode="r") for c in columnas}
@@ -0,0 +1,108 @@
+import numpy as np
+from modelo_temporal import FACTOR_GAP, indices_mas_cercanos
+
+BLOQUE_EPOCAS = 256  # Épocas que se extraen a la vez (la memoria no depende del total de eventos)
+
+
+class AcumuladorEpocas:
+    """
+    Suma y suma de cuadrados de épocas de igual largo, acumuladas en una sola pasada: la media
+    y el error estándar salen de tres arrays del tamaño de una época, sin guardar las épocas.
+    Sirve también para el gran promedio, agregando como "épocas" las medias de cada archivo.
+    """
+
+    def __init__(self, forma):
+        self.suma = np.zeros(forma, dtype=np.float64)
+        self.suma_cuadrados = np.zeros(forma, dtype=np.float64)
+        self.n = 0
+
+    def agregar(self, epocas):
+        """Agrega una época (forma `forma`) o un bloque de épocas (forma (k,) + `forma`)."""
+        epocas = np.asarray(epocas, dtype=np.float64)
+        if epocas.shape == self.suma.shape:
+            epocas = epocas[np.newaxis]
+        self.suma += epocas.sum(axis=0)
+        self.suma_cuadrados += np.square(epocas).sum(axis=0)
+        self.n += epocas.shape[0]
+
+    def combinar(self, otro):
+        """Suma las épocas de otro acumulador (promedio de todas las épocas juntas)."""
+        self.suma += otro.suma
+        self.suma_cuadrados += otro.suma_cuadrados
+        self.n += otro.n
+
+    @property
+    def media(self):
+        return self.suma / self.n if self.n else np.full(self.suma.shape, np.nan)
+
+    @property
+    def desviacion(self):
+        if self.n < 2:
+            return np.full(self.suma.shape, np.nan)
+        varianza = (self.suma_cuadrados - self.suma ** 2 / self.n) / (self.n - 1)
+        return np.sqrt(np.clip(varianza, 0.0, None))
+
+    @property
+    def sem(self):
+        return self.desviacion / np.sqrt(self.n) if self.n >= 2 else np.full(self.suma.shape, np.nan)
+
+
+def desplazamientos_epoca(srate, antes, despues):
+    """Desplazamientos (en muestras) de una época y sus tiempos relativos al evento."""
+    desplazamientos = np.arange(-int(round(antes * srate)), int(round(despues * srate)) + 1)
+    return desplazamientos, desplazamientos / float(srate)
+
+
+def promediar_eventos(time_stamps, y, tiempos_eventos, srate, antes, despues,
+                      linea_base=True, calidad=None, acumulador=None):
+    """
+    Acumula las épocas de `y` (1-D, o 2-D con un canal por columna) alrededor de cada evento,
+    desde `antes` s previos hasta `despues` s posteriores, tomando la muestra más cercana al
+    evento como origen. Se descartan las épocas que salen de la señal, que cruzan un corte
+    de los datos o que tocan un intervalo de mala calidad (si se entrega `calidad`).
+    Con linea_base=True se resta a cada época la media de su tramo previo al evento.
+    Retorna (acumulador, tiempos_relativos, n_descartadas).
+    """
+    time_stamps = np.asarray(time_stamps, dtype=np.float64)
+    y = np.asarray(y)
+    desplazamientos, tiempos_relativos = desplazamientos_epoca(srate, antes, despues)
+    if acumulador is None:
+        acumulador = AcumuladorEpocas((desplazamientos.size,) + y.shape[1:])
+    eventos = np.asarray(tiempos_eventos, dtype=np.float64)
+    if eventos.size == 0 or time_stamps.size == 0:
+        return acumulador, tiempos_relativos, int(eventos.size)
+
+    # Origen de cada época y validación de todas a la vez
+    origen = indices_mas_cercanos(time_stamps, eventos)
+    inicio = origen + desplazamientos[0]
+    fin = origen + desplazamientos[-1]
+    validas = (inicio >= 0) & (fin < time_stamps.size)
+    validas &= np.abs(time_stamps[origen] - eventos) <= FACTOR_GAP / srate
+    inicio_c = np.clip(inicio, 0, time_stamps.size - 1)
+    fin_c = np.clip(fin, 0, time_stamps.size - 1)
+    duracion_esperada = (desplazamientos.size - 1) / float(srate)
+    validas &= (time_stamps[fin_c] - time_stamps[inicio_c]) <= duracion_esperada + FACTOR_GAP / srate
+    if calidad is not None and len(calidad):
+        # Por índices de muestra: una sola muestra mala dentro de la época basta para descartarla
+        validas &= ~calidad.toca_muestras(inicio_c, fin_c)
+
+    origen = origen[validas]
+    previas = desplazamientos < 0
+    for a in range(0, origen.size, BLOQUE_EPOCAS):
+        epocas = y[origen[a:a + BLOQUE_EPOCAS, np.newaxis] + desplazamientos].astype(np.float64)
+        if linea_base and np.any(previas):
+            epocas -= epocas[:, previas].mean(axis=1, keepdims=True)
+        acumulador.agregar(epocas)
+    return acumulador, tiempos_relativos, int(np.count_nonzero(~validas))
+
+
+def gran_promedio(curvas, tiempos_relativos):
+    """
+    Gran promedio de las medias de varios archivos o sujetos: cada media (tiempos, valores)
+    se lleva a `tiempos_relativos` por interpolación lineal (por si las tasas difieren) y se
+    acumula como una época. El SEM resultante es entre archivos.
+    """
+    acumulador = AcumuladorEpocas(np.shape(tiempos_relativos))
+    for tiempos, valores in curvas:
+        acumulador.agregar(np.interp(tiempos_relativos, tiempos, valores))
+    return acumulador
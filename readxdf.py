@@ -1,15 +1,20 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import matplotlib.pyplot as plt
 import numpy as np
-import pyxdf
 import csv
-import neurokit2 as nk  # Requiere: pip install neurokit2
+from carga_diferida import ModuloDiferido, precargar_en_segundo_plano
+from busqueda_canales import IndiceCanales
+
+# Módulos pesados: se importan en el primer uso (o en segundo plano tras mostrar la ventana)
+pyxdf = ModuloDiferido("pyxdf")
+plt = ModuloDiferido("matplotlib.pyplot")
+nk = ModuloDiferido("neurokit2")  # Requiere: pip install neurokit2
 
 # Variables globales para almacenar información de canales, triggers y recortes guardados
 canales_dict = {}       # Llave: etiqueta descriptiva; Valor: dict con 'stream', 'time' y 'data'
 triggers = []           # Lista de tuplas: (tiempo, marker)
 recortes_guardados = {} # Diccionario: llave = etiqueta del canal, valor = (tiempos, datos) recortados
+indice_canales = IndiceCanales()  # Índice de búsqueda de canales, se reconstruye en cada carga
 
 # Tolerancia para asociar un trigger (en segundos)
 TRIGGER_TOLERANCE = 0.01
@@ -93,10 +98,11 @@ def get_expected_sampling_rate(info):
 
 def cargar_archivo():
     """Carga el archivo XDF y extrae la información de canales, triggers y limpia recortes previos."""
-    global canales_dict, triggers, recortes_guardados
+    global canales_dict, triggers, recortes_guardados, indice_canales
     canales_dict = {}
     triggers = []
     recortes_guardados = {}
+    indice_canales = IndiceCanales()
 
     ruta_archivo = filedialog.askopenfilename(
         title="Seleccionar archivo XDF",
@@ -163,6 +169,7 @@ def cargar_archivo():
                 'time': time_stamps,
                 'data': canal_data
             }
+    indice_canales = IndiceCanales.desde_canales(canales_dict)
     messagebox.showinfo("Carga completada", "Archivo cargado y canales extraídos correctamente.")
 
 def recortar_senal(time_stamps, data_arr, t_start, t_end):
@@ -179,6 +186,76 @@ def recortar_senal(time_stamps, data_arr, t_start, t_end):
     data_recortado = np.array(data_arr)[mask]
     return time_recortado.tolist(), data_recortado.tolist()
 
+def filas_con_triggers(t_recort, data_recort, markers_in_range):
+    """Filas (tiempo, valor, trigger) del CSV exportado, ordenadas por tiempo."""
+    filas = []
+    # Agregar cada muestra con su trigger (si existe) a una tolerancia
+    for t, val in zip(t_recort, data_recort):
+        trigger_marker = ""
+        for tt, marker in markers_in_range:
+            if abs(t - tt) <= TRIGGER_TOLERANCE:
+                trigger_marker = marker
+                break
+        filas.append((t, val, trigger_marker))
+    # Para cada trigger en markers_in_range que no se asoció a ninguna muestra,
+    # buscar la muestra más cercana y usar su valor en lugar de "NA"
+    for tt, marker in markers_in_range:
+        if not any(abs(f[0] - tt) <= TRIGGER_TOLERANCE and f[2] == marker for f in filas):
+            # Buscar el índice de la muestra más cercana a tt
+            diffs = np.abs(np.array(t_recort) - tt)
+            idx = int(np.argmin(diffs))
+            valor_cercano = data_recort[idx]
+            filas.append((tt, valor_cercano, marker))
+    filas.sort(key=lambda x: x[0])
+    return filas
+
+class SelectorCanales:
+    """
+    Lista de canales con búsqueda por texto y filtro por tipo sobre un IndiceCanales.
+    La lista se llena con una sola asignación (listvariable) en lugar de un insert por ítem,
+    y la selección se conserva al cambiar el filtro.
+    """
+    TODOS_LOS_TIPOS = "Todos los tipos"
+
+    def __init__(self, parent, indice):
+        self.indice = indice
+        self.filas = list(range(len(indice)))
+        self.marcadas = set()
+
+        frame_filtro = tk.Frame(parent)
+        frame_filtro.pack(padx=10, pady=(5, 0), fill=tk.X)
+        self.texto = tk.StringVar()
+        tk.Entry(frame_filtro, textvariable=self.texto).pack(side=tk.LEFT, expand=True, fill=tk.X)
+        self.combo_tipo = ttk.Combobox(frame_filtro, state="readonly", width=15,
+                                       values=[self.TODOS_LOS_TIPOS] + indice.tipos_disponibles)
+        self.combo_tipo.current(0)
+        self.combo_tipo.pack(side=tk.LEFT, padx=(5, 0))
+
+        self.items = tk.StringVar(value=tuple(indice.textos))
+        self.listbox = tk.Listbox(parent, selectmode=tk.MULTIPLE, width=60, listvariable=self.items)
+        self.listbox.pack(padx=10, pady=10, expand=True, fill=tk.BOTH)
+
+        self.texto.trace_add("write", lambda *_: self.aplicar_filtro())
+        self.combo_tipo.bind("<<ComboboxSelected>>", lambda _: self.aplicar_filtro())
+        self.listbox.bind("<<ListboxSelect>>", lambda _: self.actualizar_marcadas())
+
+    def actualizar_marcadas(self):
+        visibles = set(self.filas[i] for i in self.listbox.curselection())
+        self.marcadas = (self.marcadas - set(self.filas)) | visibles
+
+    def aplicar_filtro(self):
+        tipo = self.combo_tipo.get()
+        self.filas = self.indice.filtrar(self.texto.get(), None if tipo == self.TODOS_LOS_TIPOS else tipo)
+        self.items.set(tuple(self.indice.textos[f] for f in self.filas))
+        self.listbox.selection_clear(0, tk.END)
+        for posicion, fila in enumerate(self.filas):
+            if fila in self.marcadas:
+                self.listbox.selection_set(posicion)
+
+    def seleccionados(self):
+        """Textos de las filas seleccionadas (incluidas las ocultas por el filtro actual)."""
+        return [self.indice.textos[f] for f in sorted(self.marcadas)]
+
 def abrir_menu_graficar():
     """Abre la ventana para graficar canales con triggers superpuestos."""
     if not canales_dict:
@@ -192,16 +269,13 @@ def abrir_menu_graficar():
     lbl = tk.Label(win, text="Seleccione uno o varios canales para graficar:")
     lbl.pack(pady=5)
 
-    listbox = tk.Listbox(win, selectmode=tk.MULTIPLE, width=60)
-    listbox.pack(padx=10, pady=10, expand=True, fill=tk.BOTH)
-    for clave in sorted(canales_dict.keys()):
-        listbox.insert(tk.END, clave)
+    selector = SelectorCanales(win, indice_canales)
 
-    btn = tk.Button(win, text="Graficar", command=lambda: graficar_canales(listbox))
+    btn = tk.Button(win, text="Graficar", command=lambda: graficar_canales(selector))
     btn.pack(pady=10)
 
-def graficar_canales(listbox):
-    seleccionados = [listbox.get(i) for i in listbox.curselection()]
+def graficar_canales(selector):
+    seleccionados = selector.seleccionados()
     if not seleccionados:
         messagebox.showwarning("Advertencia", "Debes seleccionar al menos un canal.")
         return
@@ -249,10 +323,7 @@ def abrir_menu_cortar_triggers():
     combo_fin.pack(pady=5)
 
     tk.Label(win, text="Seleccione uno o varios canales a recortar:").pack(pady=5)
-    listbox = tk.Listbox(win, selectmode=tk.MULTIPLE, width=60)
-    listbox.pack(padx=10, pady=10, expand=True, fill=tk.BOTH)
-    for clave in sorted(canales_dict.keys()):
-        listbox.insert(tk.END, clave)
+    selector = SelectorCanales(win, indice_canales)
 
     btn_frame = tk.Frame(win)
     btn_frame.pack(pady=10)
@@ -273,7 +344,7 @@ def abrir_menu_cortar_triggers():
             messagebox.showwarning("Advertencia", "El marcador de fin debe ser mayor que el de inicio.")
             return
 
-        seleccionados = [listbox.get(i) for i in listbox.curselection()]
+        seleccionados = selector.seleccionados()
         if not seleccionados:
             messagebox.showwarning("Advertencia", "Debes seleccionar al menos un canal.")
             return
@@ -315,7 +386,7 @@ def abrir_menu_cortar_triggers():
         # Obtener todos los triggers que caen en el intervalo (sin tolerancia para contarlos)
         markers_in_range = [(tt, marker) for (tt, marker) in triggers if t_start <= tt <= t_end]
 
-        seleccionados = [listbox.get(i) for i in listbox.curselection()]
+        seleccionados = selector.seleccionados()
         if not seleccionados:
             messagebox.showwarning("Advertencia", "Debes seleccionar al menos un canal para exportar.")
             return
@@ -325,25 +396,7 @@ def abrir_menu_cortar_triggers():
             time_stamps = canal_info['time']
             data_arr = canal_info['data']
             t_recort, data_recort = recortar_senal(time_stamps, data_arr, t_start, t_end)
-            filas = []
-            # Agregar cada muestra con su trigger (si existe) a una tolerancia
-            for t, val in zip(t_recort, data_recort):
-                trigger_marker = ""
-                for tt, marker in markers_in_range:
-                    if abs(t - tt) <= TRIGGER_TOLERANCE:
-                        trigger_marker = marker
-                        break
-                filas.append((t, val, trigger_marker))
-            # Para cada trigger en markers_in_range que no se asoció a ninguna muestra,
-            # buscar la muestra más cercana y usar su valor en lugar de "NA"
-            for tt, marker in markers_in_range:
-                if not any(abs(f[0] - tt) <= TRIGGER_TOLERANCE and f[2] == marker for f in filas):
-                    # Buscar el índice de la muestra más cercana a tt
-                    diffs = np.abs(np.array(t_recort) - tt)
-                    idx = int(np.argmin(diffs))
-                    valor_cercano = data_recort[idx]
-                    filas.append((tt, valor_cercano, marker))
-            filas.sort(key=lambda x: x[0])
+            filas = filas_con_triggers(t_recort, data_recort, markers_in_range)
 
             archivo_export = filedialog.asksaveasfilename(
                 title=f"Exportar {clave} a CSV",
@@ -382,7 +435,7 @@ def abrir_menu_cortar_triggers():
             messagebox.showwarning("Advertencia", "El marcador de fin debe ser mayor que el de inicio.")
             return
 
-        seleccionados = [listbox.get(i) for i in listbox.curselection()]
+        seleccionados = selector.seleccionados()
         if not seleccionados:
             messagebox.showwarning("Advertencia", "Debes seleccionar al menos un canal para guardar.")
             return
@@ -417,13 +470,10 @@ def procesar_neurokit():
     lbl = tk.Label(win, text="Seleccione uno o varios canales para procesar:")
     lbl.pack(pady=5)
 
-    listbox = tk.Listbox(win, selectmode=tk.MULTIPLE, width=60)
-    listbox.pack(padx=10, pady=10, expand=True, fill=tk.BOTH)
-    for clave in sorted(canales_dict.keys()):
-        listbox.insert(tk.END, clave)
+    selector = SelectorCanales(win, indice_canales)
 
     def procesar_seleccion():
-        seleccionados = [listbox.get(i) for i in listbox.curselection()]
+        seleccionados = selector.seleccionados()
         if not seleccionados:
             messagebox.showwarning("Advertencia", "Debes seleccionar al menos un canal para procesar.")
             return
@@ -486,25 +536,28 @@ def pupil_process(data, sampling_rate):
     metrics = {"Media": np.mean(processed_signal), "Desviación": np.std(processed_signal)}
     return {"processed_signal": processed_signal, "metrics": metrics}
 
-# Menú principal
-root = tk.Tk()
-root.title("Visualizador y Procesador de Señales XDF")
-root.geometry("400x200")
-root.resizable(False, False)
-
-menubar = tk.Menu(root)
-root.config(menu=menubar)
-
-menu_archivo = tk.Menu(menubar, tearoff=0)
-menubar.add_cascade(label="Archivo", menu=menu_archivo)
-menu_archivo.add_command(label="Cargar archivo XDF", command=cargar_archivo)
-menu_archivo.add_separator()
-menu_archivo.add_command(label="Salir", command=root.quit)
-
-menu_proc = tk.Menu(menubar, tearoff=0)
-menubar.add_cascade(label="Procesamiento", menu=menu_proc)
-menu_proc.add_command(label="Graficar canales", command=abrir_menu_graficar)
-menu_proc.add_command(label="Cortar señal según triggers", command=abrir_menu_cortar_triggers)
-menu_proc.add_command(label="Procesar con NeuroKit", command=procesar_neurokit)
-
-root.mainloop()
+# Menú principal (al importar el módulo, p. ej. desde las pruebas, no se abre la ventana)
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Visualizador y Procesador de Señales XDF")
+    root.geometry("400x200")
+    root.resizable(False, False)
+
+    menubar = tk.Menu(root)
+    root.config(menu=menubar)
+
+    menu_archivo = tk.Menu(menubar, tearoff=0)
+    menubar.add_cascade(label="Archivo", menu=menu_archivo)
+    menu_archivo.add_command(label="Cargar archivo XDF", command=cargar_archivo)
+    menu_archivo.add_separator()
+    menu_archivo.add_command(label="Salir", command=root.quit)
+
+    menu_proc = tk.Menu(menubar, tearoff=0)
+    menubar.add_cascade(label="Procesamiento", menu=menu_proc)
+    menu_proc.add_command(label="Graficar canales", command=abrir_menu_graficar)
+    menu_proc.add_command(label="Cortar señal según triggers", command=abrir_menu_cortar_triggers)
+    menu_proc.add_command(label="Procesar con NeuroKit", command=procesar_neurokit)
+
+    # Una vez visible la ventana, se calientan los módulos pesados sin bloquear la interfaz
+    root.after_idle(lambda: precargar_en_segundo_plano([pyxdf, plt, nk]))
+    root.mainloop()
@@ -0,0 +1,281 @@
+import json
+import os
+
+import numpy as np
+from carga_diferida import ModuloDiferido
+from modelo_temporal import ModeloTemporal
+from calidad import IndiceCalidad
+from metadatos import MetadatosStream, metadatos_de
+from sincronizacion import CARGA_SIN_CORREGIR, SincronizacionStream, sincronizar_stream
+from espacio_trabajo import StreamDiferido, CanalDiferido
+from precision import convertir_precision
+from instrumentacion import registro_etapas
+from vista_general import VistaGeneral
+import filtros
+
+pd = ModuloDiferido("pandas")
+pyxdf = ModuloDiferido("pyxdf")
+
+VERSION_SESION = 2
+# Qué hacer con los intervalos de mala calidad al recortar (en el orden del diálogo de recorte)
+MODOS_CALIDAD_RECORTE = ("marcar", "excluir", "ignorar")
+EXTENSION_SESION = ".xdfsesion"
+
+
+def _a_json(valor):
+    """Convierte tipos de NumPy a tipos nativos para json.dump."""
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+
+def _referencia_archivo(ruta):
+    estado = os.stat(ruta)
+    return {"ruta": os.path.abspath(ruta), "tamano": estado.st_size, "modificado": estado.st_mtime}
+
+
+def _verificar_archivo(referencia):
+    """Error si el XDF de origen ya no existe o cambió desde que se guardó la sesión."""
+    ruta = referencia["ruta"]
+    if not os.path.exists(ruta):
+        raise ValueError(f"No se encuentra el archivo XDF de la sesión: {ruta}")
+    actual = _referencia_archivo(ruta)
+    if (actual["tamano"], actual["modificado"]) != (referencia["tamano"], referencia["modificado"]):
+        raise ValueError(f"El archivo XDF cambió desde que se guardó la sesión: {ruta}")
+
+
+class RecorteDiferido:
+    """
+    Recorte guardado en la aplicación. Se usa como la tupla (tiempos, datos), y además guarda
+    el intervalo pedido ({clave, t_inicio, t_fin, modo_calidad}), que es lo que se escribe en
+    la sesión. Al restaurarlo de una sesión se crea sin `valor` y se calcula con
+    calcular(intervalo) en el primer uso, de modo que abrir la sesión no lee el XDF.
+    """
+
+    def __init__(self, intervalo, calcular, valor=None):
+        self.intervalo = intervalo  # Entrada de manifiesto["recortes"]
+        self._calcular = calcular
+        self._valor = valor
+
+    def valor(self):
+        if self._valor is None:
+            self._valor = self._calcular(self.intervalo)
+        return self._valor
+
+    def __iter__(self):
+        return iter(self.valor())
+
+    def __getitem__(self, i):
+        return self.valor()[i]
+
+    def __len__(self):
+        return 2
+
+
+def reconstruir_stream(crudo, stream, srate):
+    """
+    Repite sobre un stream recién leído con CARGA_SIN_CORREGIR la preparación que tenía al
+    guardar la sesión: precisión, sincronización de relojes y filtros (en el mismo orden en
+    que se aplicaron). Retorna (time_stamps, time_series).
+    """
+    crudo["time_series"] = convertir_precision(crudo["time_series"], stream.get("precision") or np.float64)
+    sincronizacion = stream.get("sincronizacion")
+    sincronizar_stream(crudo, sincronizacion.nombre if sincronizacion is not None else "",
+                       metadatos_de(stream).srate_nominal)
+    y = crudo["time_series"]
+    for cadena in stream.get("cadenas_filtro", []):
+        y = filtros.filtrar_stream(y, srate, cadena)
+    return crudo["time_stamps"], y
+
+
+class _LectorArchivo:
+    """Lee de una sola pasada, en el primer acceso a cualquiera de ellos, los streams pendientes de un XDF."""
+
+    def __init__(self, referencia):
+        self.referencia = referencia
+        self.streams = []  # (StreamDiferido, srate para los filtros)
+
+    def __call__(self, _pedido):
+        pendientes = [(stream, srate) for stream, srate in self.streams if stream.pendiente]
+        ruta = self.referencia["ruta"]
+        _verificar_archivo(self.referencia)
+        with registro_etapas.etapa("carga_sesion", detalle=ruta) as registro:
+            data, _ = pyxdf.load_xdf(ruta, select_streams=[metadatos_de(s).stream_id for s, _ in pendientes],
+                                     **CARGA_SIN_CORREGIR)
+            por_id = {int(crudo["info"]["stream_id"]): crudo for crudo in data}
+            for stream, srate in pendientes:
+                stream_id = metadatos_de(stream).stream_id
+                if stream_id not in por_id:
+                    raise ValueError(f"El stream {stream_id} ya no está en {ruta}")
+                stream.completar(*reconstruir_stream(por_id.pop(stream_id), stream, srate))
+            registro["muestras"] = sum(len(stream["time_stamps"]) for stream, _ in pendientes)
+
+
+def guardar_sesion(ruta, ruta_xdf, canales_dict, triggers, recortes_guardados, resultados, sincronizacion=(),
+                   espacio=None, vistas=None):
+    """
+    Guarda la sesión en un único archivo .npz sin comprimir. No contiene las señales: guarda
+    la referencia (ruta, tamaño y fecha) a cada XDF de origen y lo necesario para rehacer sus
+    streams al leerlos de nuevo:
+      - un manifiesto JSON con los headers de los streams y su preparación (precisión,
+        sincronización, filtros, modelo temporal), la lista de canales (con sus intervalos
+        de mala calidad), los recortes como el intervalo pedido y el modo de calidad con que
+        se hicieron (MODOS_CALIDAD_RECORTE), el informe de sincronización,
+        el espacio de trabajo ({prefijo: ruta}) y los metadatos de los resultados;
+      - los tiempos de los triggers, la vista general de cada archivo y las columnas de los
+        resultados de NeuroKit, que son pequeños.
+    Los streams de un espacio de trabajo (StreamDiferido) se refieren a su propio archivo; el
+    resto, a ruta_xdf.
+    """
+    arrays = {}
+    archivos = {}
+    streams = {}
+    manifiesto = {"version": VERSION_SESION, "xdf": os.path.abspath(ruta_xdf) if ruta_xdf else None,
+                  "archivos": [], "espacio": {p: os.path.abspath(r) for p, r in (espacio or {}).items()},
+                  "streams": [], "canales": [], "recortes": [], "resultados": [], "vistas": [],
+                  "sincronizacion": [s.a_dict() for s in sincronizacion]}
+
+    for clave, canal in canales_dict.items():
+        stream = canal['stream']
+        if id(stream) not in streams:
+            origen = stream.llave[0] if isinstance(stream, StreamDiferido) else ruta_xdf
+            if not origen or not os.path.exists(origen):
+                raise ValueError(f"No se encuentra el archivo XDF de origen de {clave}")
+            origen = os.path.abspath(origen)
+            if origen not in archivos:
+                archivos[origen] = len(archivos)
+                manifiesto["archivos"].append(_referencia_archivo(origen))
+            streams[id(stream)] = len(streams)
+            modelo = canal.get('modelo')
+            manifiesto["streams"].append({
+                "archivo": archivos[origen],
+                "info": stream.get("info", {}),
+                "meta": metadatos_de(stream).a_dict(),
+                "precision": stream.get("precision"),
+                "filtros": stream.get("filtros", []),
+                "cadenas_filtro": stream.get("cadenas_filtro", []),
+                "sincronizacion": None if stream.get("sincronizacion") is None else stream["sincronizacion"].a_dict(),
+                "modelo": None if modelo is None else {
+                    "srate": modelo.srate, "residuo_max": modelo.residuo_max, "n": modelo.n,
+                    "inicios_idx": modelo.inicios_idx, "inicios_t": modelo.inicios_t},
+            })
+        calidad = canal.get('calidad')
+        manifiesto["canales"].append({"clave": clave, "stream": streams[id(stream)],
+                                      "canal_idx": canal['canal_idx'],
+                                      "calidad": None if calidad is None else calidad.a_dict()})
+
+    arrays["triggers_t"] = np.array([t for t, _ in triggers], dtype=np.float64)
+    manifiesto["triggers"] = [marker for _, marker in triggers]
+
+    for clave, recorte in recortes_guardados.items():
+        if clave not in canales_dict:
+            continue
+        if isinstance(recorte, RecorteDiferido):
+            manifiesto["recortes"].append(recorte.intervalo)  # Sin leer el stream
+            continue
+        # Tupla sin intervalo: se guarda lo que abarca, sin excluir muestras
+        t_recort = np.asarray(recorte[0])
+        if t_recort.size == 0:
+            continue
+        manifiesto["recortes"].append({"clave": clave, "t_inicio": float(t_recort[0]),
+                                       "t_fin": float(t_recort[-1]), "modo_calidad": "marcar"})
+
+    for j, (llave, resultado) in enumerate(resultados.items()):
+        signals = resultado.get("signals")
+        columnas = list(signals.columns) if signals is not None else []
+        for c, columna in enumerate(columnas):
+            arrays[f"r{j}_{c}"] = signals[columna].to_numpy()
+        manifiesto["resultados"].append({"llave": llave, "tipo": resultado.get("tipo", ""),
+                                         "columnas": columnas, "info": resultado.get("info", {}),
+                                         "directorio": resultado.get("directorio")})
+
+    for k, (nombre, vista) in enumerate((vistas or {}).items()):
+        claves = list(vista.envolventes)
+        columnas = len(vista.bordes) - 1
+        arrays[f"v{k}_bordes"] = vista.bordes
+        arrays[f"v{k}_min"] = np.stack([vista.envolventes[c][0] for c in claves], axis=1) if claves else np.empty((columnas, 0))
+        arrays[f"v{k}_max"] = np.stack([vista.envolventes[c][1] for c in claves], axis=1) if claves else np.empty((columnas, 0))
+        arrays[f"v{k}_densidad"] = vista.densidad
+        arrays[f"v{k}_marcadores"] = vista.tiempos_marcadores
+        manifiesto["vistas"].append({"nombre": nombre, "claves": claves, "clases": list(vista.clases)})
+
+    texto = json.dumps(manifiesto, default=_a_json, ensure_ascii=False)
+    arrays["manifiesto"] = np.frombuffer(texto.encode("utf-8"), dtype=np.uint8)
+    if not ruta.endswith(EXTENSION_SESION):
+        ruta += EXTENSION_SESION
+    # np.savez agrega ".npz" si el nombre no lo tiene: se escribe con un objeto archivo
+    with open(ruta, "wb") as f:
+        np.savez(f, **arrays)
+    return ruta
+
+
+def cargar_sesion(ruta, cache):
+    """
+    Lee una sesión guardada con guardar_sesion sin leer todavía los XDF de origen: los streams
+    se crean como StreamDiferido pendientes en `cache` y cada archivo se lee (una sola vez, con
+    todos sus streams) cuando se piden por primera vez sus tiempos o datos.
+    Retorna un diccionario con 'xdf' (archivo individual abierto, si lo había), 'espacio'
+    ({prefijo: ruta}), 'canales_dict', 'triggers', 'recortes' (lista de intervalos),
+    'resultados', 'sincronizacion' (lista de SincronizacionStream) y 'vistas' ({nombre: VistaGeneral}).
+    Error si algún XDF de origen no existe o cambió desde que se guardó la sesión.
+    """
+    with np.load(ruta, allow_pickle=False) as npz:
+        manifiesto = json.loads(npz["manifiesto"].tobytes().decode("utf-8"))
+        if manifiesto.get("version") != VERSION_SESION:
+            raise ValueError(f"Versión de sesión no soportada: {manifiesto.get('version')}")
+
+        lectores = []
+        for referencia in manifiesto["archivos"]:
+            _verificar_archivo(referencia)
+            lectores.append(_LectorArchivo(referencia))
+
+        streams = []
+        modelos = []
+        for datos in manifiesto["streams"]:
+            lector = lectores[datos["archivo"]]
+            meta = MetadatosStream.desde_dict(datos["meta"])
+            stream = StreamDiferido({"info": datos["info"], "meta": meta, "precision": datos.get("precision")},
+                                    cache, (lector.referencia["ruta"], meta.stream_id), lector)
+            if datos.get("filtros"):
+                stream["filtros"] = [tuple(f) for f in datos["filtros"]]
+            if datos.get("cadenas_filtro"):
+                stream["cadenas_filtro"] = [[tuple(f) for f in cadena] for cadena in datos["cadenas_filtro"]]
+            if datos.get("sincronizacion"):
+                stream["sincronizacion"] = SincronizacionStream.desde_dict(datos["sincronizacion"])
+            m = datos.get("modelo")
+            modelo = None if m is None else ModeloTemporal(
+                lambda stream=stream: stream["time_stamps"], m["srate"],
+                np.asarray(m["inicios_idx"], dtype=np.int64), np.asarray(m["inicios_t"], dtype=np.float64),
+                m["residuo_max"], n=m["n"])
+            lector.streams.append((stream, modelo.srate if modelo is not None else meta.srate_nominal))
+            streams.append(stream)
+            modelos.append(modelo)
+
+        canales_dict = {}
+        for canal in manifiesto["canales"]:
+            canales_dict[canal["clave"]] = CanalDiferido(
+                streams[canal["stream"]], canal["canal_idx"], modelos[canal["stream"]],
+                None if not canal.get("calidad") else IndiceCalidad.desde_dict(canal["calidad"]))
+
+        triggers = list(zip(npz["triggers_t"].tolist(), manifiesto["triggers"]))
+
+        resultados = {}
+        for j, datos in enumerate(manifiesto["resultados"]):
+            signals = None
+            if datos["columnas"]:
+                signals = pd.DataFrame({columna: npz[f"r{j}_{c}"] for c, columna in enumerate(datos["columnas"])})
+            resultados[datos["llave"]] = {"tipo": datos["tipo"], "signals": signals, "info": datos["info"],
+                                          "directorio": datos.get("directorio")}
+
+        vistas = {}
+        for k, datos in enumerate(manifiesto["vistas"]):
+            minimos, maximos = npz[f"v{k}_min"], npz[f"v{k}_max"]
+            envolventes = {clave: (minimos[:, i], maximos[:, i]) for i, clave in enumerate(datos["claves"])}
+            vistas[datos["nombre"]] = VistaGeneral(npz[f"v{k}_bordes"], envolventes, datos["clases"],
+                                                   npz[f"v{k}_densidad"], npz[f"v{k}_marcadores"])
+
+    return {"xdf": manifiesto["xdf"], "espacio": manifiesto["espacio"], "canales_dict": canales_dict,
+            "triggers": triggers, "recortes": manifiesto["recortes"], "resultados": resultados, "vistas": vistas,
+            "sincronizacion": [SincronizacionStream.desde_dict(s) for s in manifiesto.get("sincronizacion", [])]}
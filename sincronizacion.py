@@ -0,0 +1,110 @@
+import numpy as np
+from modelo_temporal import ModeloTemporal
+
+UMBRAL_ATIPICOS_RELOJ = 4.0  # Desviaciones (MAD escalada) para descartar una medición de offset
+ITERACIONES_AJUSTE = 3       # Rondas de ajuste y descarte de mediciones atípicas
+
+# Argumentos de pyxdf.load_xdf para leer los tiempos sin corregir: la corrección la hace este módulo
+CARGA_SIN_CORREGIR = {"synchronize_clocks": False, "dejitter_timestamps": False}
+
+
+def ajustar_reloj(clock_times, clock_values):
+    """
+    Ajusta offset(t) = a + b * t a las mediciones de diferencia de reloj del stream (chunks
+    ClockOffset del XDF): `a` es el offset y `b` la deriva del reloj del emisor. Se ajusta por
+    mínimos cuadrados y se repite descartando las mediciones atípicas (p. ej. las tomadas con
+    la red cargada). Retorna (a, b, residuo, n_usadas); con una sola medición el offset es
+    constante y sin mediciones no hay corrección.
+    """
+    t = np.asarray(clock_times, dtype=np.float64)
+    v = np.asarray(clock_values, dtype=np.float64)
+    if t.size == 0:
+        return 0.0, 0.0, 0.0, 0
+    if t.size == 1 or np.ptp(t) <= 0:
+        return float(np.median(v)), 0.0, 0.0, int(t.size)
+
+    # Tiempos centrados para que el ajuste no pierda precisión con relojes de valores grandes
+    referencia = float(np.mean(t))
+    x = t - referencia
+    usadas = np.ones(t.size, dtype=bool)
+    for ronda in range(ITERACIONES_AJUSTE):
+        b, c = np.polyfit(x[usadas], v[usadas], 1)
+        residuos = v - (c + b * x)
+        if ronda == ITERACIONES_AJUSTE - 1:
+            break
+        mad = 1.4826 * np.median(np.abs(residuos[usadas]))
+        nuevas = np.abs(residuos) <= UMBRAL_ATIPICOS_RELOJ * mad if mad > 0 else usadas
+        if np.count_nonzero(nuevas) < 2 or np.array_equal(nuevas, usadas):
+            break
+        usadas = nuevas
+    residuo = float(np.std(residuos[usadas]))
+    return float(c - b * referencia), float(b), residuo, int(np.count_nonzero(usadas))
+
+
+class SincronizacionStream:
+    """
+    Resultado de sincronizar un stream: el modelo de offset/deriva aplicado a sus tiempos y
+    el jitter de sus marcas antes de reemplazarlas por la recta del modelo temporal. Es el
+    informe que se muestra tras la carga y se guarda con la sesión.
+    """
+
+    __slots__ = ("nombre", "n_mediciones", "n_usadas", "offset", "deriva", "residuo_reloj",
+                 "jitter_std", "jitter_max", "dejitter")
+
+    def __init__(self, nombre, n_mediciones, n_usadas, offset, deriva, residuo_reloj,
+                 jitter_std, jitter_max, dejitter):
+        self.nombre = nombre
+        self.n_mediciones = n_mediciones  # Mediciones de offset en el archivo
+        self.n_usadas = n_usadas          # Mediciones que quedaron tras descartar las atípicas
+        self.offset = offset              # Segundos, evaluado en la primera muestra del stream
+        self.deriva = deriva              # Segundos por segundo (multiplicar por 1e6 para ppm)
+        self.residuo_reloj = residuo_reloj
+        self.jitter_std = jitter_std      # NaN si el stream es irregular o no se ajustó a una recta
+        self.jitter_max = jitter_max
+        self.dejitter = dejitter
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return cls(**{campo: datos[campo] for campo in cls.__slots__})
+
+
+def sincronizar_stream(stream, nombre, srate_nominal=0.0):
+    """
+    Corrige en el lugar los tiempos de un stream leído con CARGA_SIN_CORREGIR: suma el offset
+    ajustado (con su deriva) a todas las marcas en una sola operación sobre el array y, si el
+    stream es regular, las reemplaza por los tiempos del ModeloTemporal (el jitter de llegada
+    de las muestras queda en el informe). Si quedan escalones sin ubicar (p. ej. pérdidas de
+    muestras muy seguidas) o la tasa ajustada se aleja de la nominal, se dejan las marcas con
+    el offset corregido y dejitter=False. Retorna el SincronizacionStream, que también queda
+    en stream["sincronizacion"] para no volver a calcularlo.
+    """
+    if stream.get("sincronizacion") is not None:
+        return stream["sincronizacion"]
+    clock_times = stream.get("clock_times", [])
+    a, b, residuo, usadas = ajustar_reloj(clock_times, stream.get("clock_values", []))
+
+    t = np.asarray(stream.get("time_stamps", []), dtype=np.float64)
+    offset = a + b * float(t[0]) if t.size else a
+    if t.size and (a or b):
+        t = t * (1.0 + b)
+        t += a
+
+    jitter_std = jitter_max = float("nan")
+    dejitter = False
+    if srate_nominal and t.size > 1:
+        modelo = ModeloTemporal.desde_marcas(t, srate_nominal, tolerar_jitter=True)
+        if modelo is not None:
+            tiempos = modelo.tiempos_modelo()
+            jitter = t - tiempos
+            jitter_std, jitter_max = float(np.std(jitter)), float(np.max(np.abs(jitter)))
+            t = tiempos
+            dejitter = True
+    stream["time_stamps"] = t
+
+    sincronizacion = SincronizacionStream(nombre, len(clock_times), usadas, offset, b, residuo,
+                                          jitter_std, jitter_max, dejitter)
+    stream["sincronizacion"] = sincronizacion
+    return sincronizacion
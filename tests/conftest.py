@@ -0,0 +1,49 @@
+"""
+Configuración común de las pruebas: se ejecutan sin pantalla (Qt "offscreen", matplotlib
+"Agg") y con la raíz del repositorio en sys.path, así que basta con
+
+    python -m pytest -q
+
+desde la raíz. Requiere las mismas dependencias que la aplicación (PyQt5, pyxdf, neurokit2).
+"""
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("MPLBACKEND", "Agg")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pytest  # noqa: E402
+from PyQt5 import QtWidgets  # noqa: E402
+
+from referencia import streams_de_referencia  # noqa: E402
+from xdf_sintetico import escribir_xdf  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def registro_xdf(tmp_path_factory):
+    """Ruta del archivo XDF de referencia y los tiempos verdaderos de su stream ECG."""
+    streams, t_ecg = streams_de_referencia()
+    ruta = escribir_xdf(str(tmp_path_factory.mktemp("xdf") / "referencia.xdf"), streams)
+    return ruta, t_ecg
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def ventana(qapp):
+    """MainWindow con el estado global de analyxdf vacío."""
+    import analyxdf
+    ventana = analyxdf.MainWindow()
+    yield ventana
+    ventana.close()  # Espera las exportaciones y suelta el registro de etapas
+    analyxdf.canales_dict = {}
+    analyxdf.triggers = []
+    analyxdf.informe_sincronizacion = []
+    analyxdf.archivos_espacio.clear()
+    analyxdf.vistas_generales.clear()
+    analyxdf.cache_streams.limpiar()
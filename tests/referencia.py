@@ -0,0 +1,71 @@
+"""
+Registro sintético de referencia compartido por las pruebas, con sus valores verdaderos, y
+una ayuda para cargar archivos en la ventana principal sin abrir diálogos.
+"""
+from unittest import mock
+
+import numpy as np
+from PyQt5 import QtWidgets
+
+from xdf_sintetico import tiempos_regulares
+
+# Registro sintético de referencia. Los tiempos de VERDAD son los del reloj del registrador:
+# el stream ECG se graba con su reloj atrasado OFFSET_ECG s y trae las mediciones de offset.
+INICIO = 1000.0
+DURACION = 60.0
+SRATE_ECG = 500
+SRATE_EDA = 15
+SRATE_MISC = 100
+CORTE_ECG = (30.0, 32.0)        # Segundos (relativos a INICIO) sin muestras en el stream ECG
+PLANO_EDA = (40.0, 44.0)        # Tramo en que el canal EDA queda fijo (línea plana)
+OFFSET_ECG = 0.25
+FRECUENCIA_CARDIACA = 70
+MARCADORES = [(5.0, "inicio"), (10.0, "estimulo"), (20.0, "estimulo"), (40.0, "estimulo"),
+              (50.0011, "estimulo"), (55.0, "fin")]
+CANALES = ["Stream 1 - ECG I", "Stream 1 - Rampa", "Stream 2 - Empatica",
+           "Stream 3 - Aux 1", "Stream 3 - Aux 2", "Stream 3 - Aux 3"]
+
+
+def streams_de_referencia():
+    """Streams del registro de referencia y los tiempos verdaderos del stream ECG."""
+    import neurokit2 as nk
+
+    t_ecg = tiempos_regulares(INICIO, DURACION, SRATE_ECG, cortes=[CORTE_ECG])
+    ecg = nk.ecg_simulate(duration=DURACION, sampling_rate=SRATE_ECG, heart_rate=FRECUENCIA_CARDIACA,
+                          random_state=1)
+    completos = tiempos_regulares(INICIO, DURACION, SRATE_ECG)
+    ecg = ecg[np.isin(completos, t_ecg)]
+    # La rampa vale el tiempo relativo de cada muestra: la interpolación de los recortes es exacta
+    rampa = t_ecg - INICIO
+
+    t_eda = tiempos_regulares(INICIO, DURACION, SRATE_EDA)
+    eda = (2.0 + np.sin(2 * np.pi * 0.05 * (t_eda - INICIO))).astype(np.float32)
+    plano = (t_eda >= INICIO + PLANO_EDA[0]) & (t_eda < INICIO + PLANO_EDA[1])
+    eda[plano] = eda[np.argmax(plano)]
+
+    t_misc = tiempos_regulares(INICIO, DURACION, SRATE_MISC)
+    misc = (np.arange(t_misc.size)[:, np.newaxis] % 50 * np.array([1, 2, 3])).astype(np.int16)
+
+    offsets = [(t, OFFSET_ECG) for t in np.arange(INICIO, INICIO + DURACION, 5.0)]
+    streams = [
+        {"nombre": "Corazon", "tipo": "ECG", "srate": SRATE_ECG, "formato": "double64",
+         "etiquetas": ["ECG I", "Rampa"], "unidad": "mV", "tiempos": t_ecg - OFFSET_ECG,
+         "datos": np.column_stack((ecg, rampa)), "offsets": offsets},
+        {"nombre": "Empatica", "tipo": "EDA", "srate": SRATE_EDA, "formato": "float32",
+         "tiempos": t_eda, "datos": eda},
+        {"nombre": "Aux", "tipo": "MISC", "srate": SRATE_MISC, "formato": "int16",
+         "tiempos": t_misc, "datos": misc},
+        {"nombre": "Eventos", "tipo": "Markers", "srate": 0, "formato": "string",
+         "tiempos": [INICIO + t for t, _ in MARCADORES], "datos": [m for _, m in MARCADORES]},
+    ]
+    return streams, t_ecg
+
+
+def cargar_en_ventana(ventana, ruta):
+    """Ejecuta Archivo > Cargar archivo XDF sin diálogos. Retorna el texto del aviso final."""
+    with mock.patch.object(QtWidgets.QFileDialog, "getOpenFileName", return_value=(ruta, "")), \
+            mock.patch.object(QtWidgets.QMessageBox, "information") as aviso, \
+            mock.patch.object(QtWidgets.QMessageBox, "critical") as error:
+        ventana.cargar_archivo()
+    assert not error.called, error.call_args
+    return aviso.call_args[0][2]
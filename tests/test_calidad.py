@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from calidad import MOTIVO_NAN, IndiceCalidad, evaluar_canal
+
+SRATE = 100
+T = 5.0 + np.arange(1000) / SRATE
+
+
+def con_nan(*indices):
+    y = np.sin(T)
+    y[list(indices)] = np.nan
+    return evaluar_canal(y, T, SRATE)
+
+
+def test_una_muestra_mala_dura_un_periodo():
+    calidad = con_nan(500)
+    assert calidad.intervalos() == [(pytest.approx(T[500]), pytest.approx(T[501]), MOTIVO_NAN)]
+    assert calidad.duracion_mala(T[0], T[-1]) == pytest.approx(1.0 / SRATE)
+    np.testing.assert_array_equal(np.flatnonzero(~calidad.mascara_buena(T)), [500])
+
+
+def test_tramos_de_muestras_que_tocan_intervalos():
+    calidad = con_nan(500, 501, 800)
+    toca = calidad.toca_muestras([0, 490, 502, 800, 801], [499, 500, 700, 800, 999])
+    np.testing.assert_array_equal(toca, [False, True, False, True, False])
+
+
+def test_fin_sin_tasa_conocida():
+    t = np.array([0.0, 0.1, 0.2, 0.5, 0.6])
+    calidad = IndiceCalidad([2, 4], [3, 5], [MOTIVO_NAN, MOTIVO_NAN], t)
+    # Hasta la muestra siguiente, y al final del array, un intervalo entre muestras más
+    np.testing.assert_allclose(calidad.fines_t, [0.5, 0.7])
+
+
+def test_ida_y_vuelta_sin_tiempos():
+    calidad = con_nan(10, 11, 12)
+    copia = IndiceCalidad.desde_dict(calidad.a_dict())
+    assert copia.intervalos() == calidad.intervalos()
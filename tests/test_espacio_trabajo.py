@@ -0,0 +1,83 @@
+import os
+import shutil
+from unittest import mock
+
+import numpy as np
+import pyxdf
+from PyQt5 import QtCore, QtWidgets
+
+import analyxdf
+import filtros
+from espacio_trabajo import CacheStreams
+from referencia import CANALES, INICIO, MARCADORES
+
+
+def agregar_al_espacio(ventana, rutas):
+    with mock.patch.object(QtWidgets.QFileDialog, "getOpenFileNames", return_value=(rutas, "")), \
+            mock.patch.object(QtWidgets.QMessageBox, "information"):
+        ventana.agregar_archivos_espacio()
+
+
+def test_cada_archivo_se_lee_una_vez(ventana, registro_xdf, tmp_path):
+    copia = str(tmp_path / "copia.xdf")
+    shutil.copy(registro_xdf[0], copia)
+    with mock.patch.object(pyxdf, "load_xdf", wraps=pyxdf.load_xdf) as load_xdf:
+        agregar_al_espacio(ventana, [registro_xdf[0], copia])
+    assert load_xdf.call_count == 2
+    assert list(analyxdf.canales_dict) == [f"{p} | {c}" for p in ("referencia", "copia") for c in CANALES]
+    assert len(analyxdf.triggers) == 2 * len(MARCADORES)
+    canal = analyxdf.canales_dict["copia | Stream 1 - Rampa"]
+    np.testing.assert_allclose(canal['data'], canal['time'] - INICIO, atol=1e-9)
+
+
+def test_limpiar_borra_el_directorio_temporal():
+    cache = CacheStreams(presupuesto=1000)
+    cache.agregar("a", np.zeros(100))
+    cache.agregar("b", np.zeros(100))  # Supera el presupuesto: "a" se desaloja a disco
+    directorio = cache.directorio
+    assert os.listdir(directorio)
+    cache.limpiar()
+    assert not os.path.exists(directorio) and "a" not in cache
+    # La caché sigue sirviendo: el próximo desalojo crea otro directorio
+    cache.agregar("c", np.ones(100))
+    cache.agregar("d", np.ones(100))
+    np.testing.assert_array_equal(cache.obtener("c"), np.ones(100))
+    cache.limpiar()
+
+
+def test_filtrar_stream_desalojado(ventana, registro_xdf):
+    agregar_al_espacio(ventana, [registro_xdf[0]])
+    canal = analyxdf.canales_dict["referencia | Stream 1 - Rampa"]
+    stream = canal['stream']
+    esperado = filtros.filtrar_stream(np.array(stream["time_series"]), canal['modelo'].srate, [("tendencia",)])
+    presupuesto = analyxdf.cache_streams.presupuesto
+    analyxdf.cache_streams.cambiar_presupuesto(1)
+    try:
+        # Usar otro stream desaloja este (la caché siempre conserva el último): vuelve como memmap
+        next(c for c in analyxdf.canales_dict.values() if c['stream'] is not stream)['data']
+        assert isinstance(stream["time_series"], np.memmap)
+
+        def filtrar(dialog):
+            lista = dialog.findChild(QtWidgets.QListWidget)
+            for k in range(lista.count()):
+                lista.item(k).setSelected(lista.item(k).data(QtCore.Qt.UserRole) == id(stream))
+            next(c for c in dialog.findChildren(QtWidgets.QCheckBox) if c.text().startswith("Quitar")).setChecked(True)
+            next(b for b in dialog.findChildren(QtWidgets.QPushButton) if b.text() == "Aplicar filtros").click()
+
+        with mock.patch.object(QtWidgets.QDialog, "exec_", filtrar), \
+                mock.patch.object(QtWidgets.QMessageBox, "information"), \
+                mock.patch.object(QtWidgets.QMessageBox, "critical") as error:
+            ventana.abrir_menu_filtrar()
+        assert not error.called, error.call_args
+        filtrado = stream["time_series"]
+        # El resultado se escribió por bloques en el directorio de la caché, que se borra con ella
+        assert isinstance(filtrado, np.memmap)
+        directorio = analyxdf.cache_streams.directorio
+        assert os.path.dirname(filtrado.filename) == directorio
+        np.testing.assert_allclose(filtrado, esperado, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(canal['data'], esperado[:, canal['canal_idx']], rtol=0, atol=1e-9)
+        del filtrado
+        analyxdf.cache_streams.limpiar()
+        assert not os.path.exists(directorio)
+    finally:
+        analyxdf.cache_streams.cambiar_presupuesto(presupuesto)
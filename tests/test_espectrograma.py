@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+
+import analyxdf
+from espectrograma import Espectrograma, recortar_cache
+from referencia import cargar_en_ventana
+
+SRATE = 100
+T = np.arange(SRATE * 200) / SRATE
+
+
+def test_tipo_de_datos_separa_las_teselas(tmp_path):
+    y = np.sin(2 * np.pi * 5 * T)
+    doble = Espectrograma(T, y, SRATE, "canal", directorio=str(tmp_path))
+    simple = Espectrograma(T, y.astype(np.float32), SRATE, "canal", directorio=str(tmp_path))
+    assert doble.directorio != simple.directorio
+
+
+def test_recortar_cache_borra_lo_usado_hace_mas_tiempo(tmp_path):
+    y = np.sin(2 * np.pi * 5 * T)
+    antiguo = Espectrograma(T, y, SRATE, "antiguo", directorio=str(tmp_path))
+    reciente = Espectrograma(T, y, SRATE, "reciente", directorio=str(tmp_path))
+    antiguo.tesela(0)
+    reciente.tesela(0)
+    os.utime(antiguo.directorio, (0, 0))
+    tamano = sum(f.stat().st_size for f in os.scandir(reciente.directorio))
+    assert recortar_cache(str(tmp_path), presupuesto=tamano) > 0
+    assert not os.path.exists(antiguo.directorio) and os.path.exists(reciente.directorio)
+
+
+def test_llave_cambia_si_el_xdf_se_sobrescribe(ventana, registro_xdf, tmp_path):
+    ruta = str(tmp_path / "registro.xdf")
+    with open(registro_xdf[0], "rb") as f:
+        contenido = f.read()
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    cargar_en_ventana(ventana, ruta)
+    clave = "Stream 1 - Rampa"
+    antes = analyxdf.llave_espectrograma(clave, analyxdf.canales_dict[clave])
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    os.utime(ruta, ns=(0, 0))
+    assert analyxdf.llave_espectrograma(clave, analyxdf.canales_dict[clave]) != antes
@@ -0,0 +1,23 @@
+import numpy as np
+
+import exportacion
+
+
+class TrabajoVigilado(exportacion.TrabajoExportacion):
+    """Registra la duración visible en el instante en que el estado cambia (como la ve la interfaz)."""
+
+    def __setattr__(self, nombre, valor):
+        if nombre == "estado" and valor in (exportacion.TERMINADO, exportacion.ERROR):
+            self.duracion_al_terminar = self.duracion
+        super(TrabajoVigilado, self).__setattr__(nombre, valor)
+
+
+def test_duracion_lista_antes_del_estado_final(tmp_path):
+    t = np.arange(10) / 10.0
+    trabajo = TrabajoVigilado("canal", str(tmp_path / "a.csv"), t, t.copy(), [(0.5, "estimulo")])
+    trabajo.ejecutar()
+    assert trabajo.estado == exportacion.TERMINADO and trabajo.duracion_al_terminar is not None
+
+    fallido = TrabajoVigilado("canal", str(tmp_path / "no" / "existe.csv"), t, t.copy(), [])
+    fallido.ejecutar()
+    assert fallido.estado == exportacion.ERROR and fallido.duracion_al_terminar is not None
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+import filtros
+
+SRATE = 50
+
+
+@pytest.mark.parametrize("especificaciones", [
+    [("pasabanda", 0.01, 20.0, filtros.ORDEN_POR_DEFECTO)],
+    [("tendencia",), ("notch", 10.0, filtros.Q_NOTCH), ("pasaaltos", 0.5, filtros.ORDEN_POR_DEFECTO)],
+])
+def test_por_bloques_igual_a_una_pasada(especificaciones):
+    rng = np.random.default_rng(2)
+    n = SRATE * 3600
+    y = np.cumsum(rng.standard_normal((n, 2)), axis=0) * 0.01 + rng.standard_normal((n, 2))
+    una_pasada = filtros.filtrar_stream(y, SRATE, especificaciones)
+    por_bloques = filtros.filtrar_por_bloques(y, np.empty_like(y), SRATE, especificaciones)
+    assert np.max(np.abs(por_bloques - una_pasada)) <= 1e-6 * np.std(una_pasada)
+
+
+def test_margen_segun_la_etapa_mas_lenta():
+    assert filtros.margen_transitorio([("pasabanda", 0.01, 40.0, 4), ("notch", 50.0, 30.0)]) == pytest.approx(
+        filtros.FACTOR_MARGEN * 4 / 0.01)
+    assert filtros.margen_transitorio([("tendencia",)]) == 0.0
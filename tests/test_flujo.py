@@ -0,0 +1,153 @@
+"""Carga, recorte, exportación y procesamiento del registro de referencia de punta a punta."""
+import csv
+from unittest import mock
+
+import numpy as np
+import pytest
+from PyQt5 import QtWidgets
+
+import analyxdf
+import exportacion
+import hrv_lote
+from calidad import MOTIVO_PLANO
+from referencia import (CANALES, CORTE_ECG, DURACION, FRECUENCIA_CARDIACA, INICIO, MARCADORES,
+                        OFFSET_ECG, PLANO_EDA, SRATE_ECG, cargar_en_ventana)
+
+
+@pytest.fixture
+def cargado(ventana, registro_xdf):
+    ruta, t_ecg = registro_xdf
+    aviso = cargar_en_ventana(ventana, ruta)
+    return ventana, aviso, t_ecg
+
+
+def test_canales_y_tipos(cargado):
+    assert list(analyxdf.canales_dict) == CANALES
+    assert analyxdf.canales_dict["Stream 1 - Rampa"]['data'].dtype == np.float64
+    assert analyxdf.canales_dict["Stream 2 - Empatica"]['data'].dtype == np.float32
+    assert analyxdf.canales_dict["Stream 3 - Aux 2"]['data'].dtype == np.int16
+    assert analyxdf.canales_dict["Stream 1 - ECG I"]['stream']["meta"].unidades == ["mV", "mV"]
+
+
+def test_float32_no_convierte_enteros(ventana, registro_xdf):
+    ventana.cambiar_precision(True)
+    try:
+        cargar_en_ventana(ventana, registro_xdf[0])
+    finally:
+        ventana.cambiar_precision(False)
+    assert analyxdf.canales_dict["Stream 1 - Rampa"]['data'].dtype == np.float32
+    assert analyxdf.canales_dict["Stream 3 - Aux 1"]['data'].dtype == np.int16
+
+
+def test_corte_y_modelo_temporal(cargado):
+    _, aviso, _ = cargado
+    modelo = analyxdf.canales_dict["Stream 1 - Rampa"]['modelo']
+    assert modelo.srate == pytest.approx(SRATE_ECG)
+    assert len(modelo.cortes) == 1
+    fin_tramo, inicio_siguiente = modelo.cortes[0]
+    assert fin_tramo == pytest.approx(INICIO + CORTE_ECG[0] - 1.0 / SRATE_ECG)
+    assert inicio_siguiente == pytest.approx(INICIO + CORTE_ECG[1])
+    assert "Stream 1: 1 corte(s)" in aviso
+
+
+def test_sincronizacion_de_relojes(cargado):
+    _, aviso, t_ecg = cargado
+    # El stream ECG se grabó OFFSET_ECG s atrasado: tras sincronizar coincide con el registrador
+    np.testing.assert_allclose(analyxdf.canales_dict["Stream 1 - Rampa"]['time'], t_ecg, atol=1e-9)
+    informe = {s.nombre: s for s in analyxdf.informe_sincronizacion}
+    ecg = informe["Stream 1 (Corazon)"]
+    assert ecg.n_mediciones == int(DURACION / 5) and ecg.offset == pytest.approx(OFFSET_ECG)
+    assert ecg.deriva == pytest.approx(0.0, abs=1e-12) and ecg.dejitter
+    assert informe["Eventos"].n_mediciones == 0
+    assert "Relojes sincronizados en 1 de 4 streams" in aviso
+
+
+def test_triggers_caen_sobre_sus_muestras(cargado):
+    assert [m for _, m in analyxdf.triggers] == [m for _, m in MARCADORES]
+    canal = analyxdf.canales_dict["Stream 1 - Rampa"]
+    for t, _ in analyxdf.triggers:
+        idx = np.searchsorted(canal['time'], t)
+        distancia = np.min(np.abs(canal['time'][max(idx - 1, 0):idx + 1] - t))
+        assert distancia <= 0.5 / SRATE_ECG
+
+
+def test_calidad_detecta_la_linea_plana(cargado):
+    calidad = analyxdf.canales_dict["Stream 2 - Empatica"]['calidad']
+    intervalos = calidad.intervalos()
+    assert len(intervalos) == 1
+    t0, t1, motivo = intervalos[0]
+    assert motivo == MOTIVO_PLANO
+    assert t0 == pytest.approx(INICIO + PLANO_EDA[0], abs=0.1)
+    assert t1 == pytest.approx(INICIO + PLANO_EDA[1], abs=0.1)
+    assert len(analyxdf.canales_dict["Stream 1 - Rampa"]['calidad']) == 0
+
+
+def test_recorte_entre_marcadores(cargado):
+    canal = analyxdf.canales_dict["Stream 1 - Rampa"]
+    t_start, t_end = analyxdf.triggers[1][0], analyxdf.triggers[2][0]
+    t_recort, y_recort = analyxdf.recortar_senal(canal['time'], canal['data'], t_start, t_end, canal['modelo'])
+    assert (t_recort[0], t_recort[-1]) == (t_start, t_end)
+    assert t_recort.size == int(round((t_end - t_start) * SRATE_ECG)) + 1
+    np.testing.assert_allclose(y_recort, t_recort - INICIO, atol=1e-9)
+
+
+def test_recorte_que_cruza_el_corte(cargado):
+    canal = analyxdf.canales_dict["Stream 1 - Rampa"]
+    t_start, t_end = INICIO + 29.0, INICIO + 31.0
+    t_recort, y_recort = analyxdf.recortar_senal(canal['time'], canal['data'], t_start, t_end, canal['modelo'])
+    assert t_recort[-1] == t_end
+    # t_end cae dentro del corte: se interpola entre los bordes, que siguen la rampa
+    np.testing.assert_allclose(y_recort, t_recort - INICIO, atol=1e-9)
+    assert np.max(np.diff(t_recort)) == pytest.approx(31.0 - (CORTE_ECG[0] - 1.0 / SRATE_ECG))
+
+
+def test_exportacion_csv(cargado, tmp_path):
+    ventana = cargado[0]
+    canal = analyxdf.canales_dict["Stream 1 - Rampa"]
+    t_start, t_end = analyxdf.triggers[0][0], analyxdf.triggers[1][0] + 0.0031
+    t_recort, y_recort = analyxdf.recortar_senal(canal['time'], canal['data'], t_start, t_end, canal['modelo'])
+    marcadores = [(t, m) for t, m in analyxdf.triggers_de_canal("Stream 1 - Rampa") if t_start <= t <= t_end]
+    ruta = str(tmp_path / exportacion.nombre_archivo(exportacion.PLANTILLA_POR_DEFECTO, 1, "Rampa", t_start, t_end))
+    trabajo = ventana.colaExportacion.agregar("Stream 1 - Rampa", ruta, t_recort, y_recort, marcadores)
+    ventana.colaExportacion.cerrar(esperar=True)
+    assert trabajo.estado == exportacion.TERMINADO, trabajo.error
+    assert trabajo.escritas == t_recort.size
+
+    with open(ruta, newline="") as f:
+        filas = list(csv.reader(f))
+    assert filas[0] == exportacion.ENCABEZADO_CSV
+    filas = filas[1:]
+    assert len(filas) == t_recort.size
+    tiempos = np.array([float(fila[0]) for fila in filas])
+    valores = np.array([float(fila[1]) for fila in filas])
+    np.testing.assert_allclose(tiempos, t_recort)
+    np.testing.assert_allclose(valores, tiempos - INICIO, atol=1e-9)
+    # Un marcador por muestra: "inicio" en la primera y "estimulo" en la más cercana a 10 s
+    con_trigger = {i: fila[2] for i, fila in enumerate(filas) if fila[2]}
+    assert con_trigger == {0: "inicio", int(np.argmin(np.abs(tiempos - (INICIO + 10.0)))): "estimulo"}
+
+
+def test_neurokit_lista_los_recortes_guardados(cargado):
+    canal = analyxdf.canales_dict["Stream 1 - Rampa"]
+    analyxdf.recortes_guardados["Stream 1 - Rampa"] = analyxdf.recortar_senal(
+        canal['time'], canal['data'], analyxdf.triggers[1][0], analyxdf.triggers[2][0], canal['modelo'])
+    textos = []
+
+    def revisar(dialog):
+        textos.extend(dialog.findChild(analyxdf.SelectorCanales).modelo.indice.textos)
+
+    try:
+        with mock.patch.object(QtWidgets.QDialog, "exec_", revisar):
+            cargado[0].procesar_neurokit()
+    finally:
+        analyxdf.recortes_guardados = {}
+    assert textos == [f"Original: {clave}" for clave in sorted(CANALES)] + ["Recorte: Stream 1 - Rampa"]
+
+
+def test_hrv_por_lotes(registro_xdf):
+    filas = hrv_lote.procesar_archivo(registro_xdf[0], indices=("time",))
+    fila = next(f for f in filas if f["canal"] == "Stream 1 - ECG I")
+    assert fila["error"] == ""
+    assert fila["sampling_rate"] == pytest.approx(SRATE_ECG)
+    assert fila["HRV_MeanNN"] == pytest.approx(60000.0 / FRECUENCIA_CARDIACA, rel=0.05)
+    assert fila["n_picos"] == pytest.approx((DURACION - (CORTE_ECG[1] - CORTE_ECG[0])) * FRECUENCIA_CARDIACA / 60, abs=3)
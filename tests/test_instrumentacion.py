@@ -0,0 +1,24 @@
+from instrumentacion import RegistroEtapas
+
+
+def test_memoria_solo_si_se_pide():
+    registro = RegistroEtapas()
+    with registro.etapa("a"):
+        bytearray(10 ** 6)
+    with registro.etapa("b", medir_memoria=True):
+        bytearray(10 ** 6)
+    assert registro.registros[0]["memoria_pico"] is None
+    assert registro.registros[1]["memoria_pico"] >= 10 ** 6
+
+
+def test_perfil_anidado_queda_en_el_externo():
+    registro = RegistroEtapas(perfilar=True)
+    with registro.etapa("externa"):
+        with registro.etapa("interna"):
+            sum(range(1000))
+    perfiles = {r["etapa"]: r["perfil"] for r in registro.registros}
+    assert perfiles["interna"] is None and perfiles["externa"]
+    # Terminada la externa, la siguiente etapa vuelve a tener su propio perfil
+    with registro.etapa("siguiente"):
+        pass
+    assert registro.registros[-1]["perfil"]
@@ -0,0 +1,55 @@
+import pytest
+
+import readxdf
+from metadatos import MetadatosStream
+
+
+def header(nombre="", canales=1, etiquetas=None, tipo="EEG"):
+    """Header como lo entrega pyxdf (todos los valores dentro de listas)."""
+    info = {"name": [nombre], "type": [tipo], "channel_count": [str(canales)],
+            "nominal_srate": ["250"], "channel_format": ["float32"], "stream_id": 3}
+    if etiquetas is not None:
+        info["desc"] = [{"channels": [{"channel": [
+            {"label": [e] if e else [], "unit": ["uV"], "type": [tipo]} for e in etiquetas]}]}]
+    else:
+        info["desc"] = [None]
+    return info
+
+
+@pytest.mark.parametrize("info, n, s_idx, esperadas", [
+    (header("EEG", 2, ["C3", "C4"]), 2, 0, ["C3", "C4"]),
+    (header("Corazon", 1), 1, 0, ["Corazon"]),
+    (header("Corazon", 3), 3, 0, ["Corazon 1", "Corazon 2", "Corazon 3"]),
+    (header("", 2), 2, 0, ["Canal 1", "Canal 2"]),
+    # channel_count menor que las columnas reales y sin nombre: se usa el número del stream
+    (header("", 1), 2, 4, ["Stream 5 1", "Stream 5 2"]),
+    (header("", 1), 1, 4, ["Canal 1"]),
+    # Etiquetas parciales: solo las que faltan se completan
+    (header("EEG", 3, ["C3", "", "Cz"]), 3, 0, ["C3", "EEG 2", "Cz"]),
+    (header("EEG", 2, ["", ""]), 2, 0, ["EEG 1", "EEG 2"]),
+    # Menos etiquetas que columnas: no se mezclan etiquetas con nombres de respaldo
+    (header("EEG", 3, ["C3"]), 3, 0, ["EEG 1", "EEG 2", "EEG 3"]),
+])
+def test_respaldo_de_nombres(info, n, s_idx, esperadas):
+    meta = MetadatosStream.desde_info(info, n, s_idx)
+    assert meta.etiquetas == esperadas
+    assert len(meta.unidades) == len(meta.tipos_canal) == n
+
+
+def test_campos_planos():
+    meta = MetadatosStream.desde_info(header("Pulso", 2, ["PPG 1", "PPG 2"], tipo="ppg"), 2)
+    assert (meta.nombre, meta.tipo, meta.srate_nominal, meta.stream_id) == ("Pulso", "PPG", 250.0, 3)
+    assert meta.unidades == ["uV", "uV"]
+    assert meta.srate_esperada == 25
+    assert MetadatosStream.desde_dict(meta.a_dict()).a_dict() == meta.a_dict()
+
+
+def test_header_vacio():
+    meta = MetadatosStream.desde_info(None, 1)
+    assert meta.etiquetas == ["Canal 1"] and meta.tipo == "" and meta.srate_nominal == 0.0
+
+
+@pytest.mark.parametrize("info", [header("EEG", 2, ["C3", "C4"]), header("Corazon", 3), header("", 2)])
+def test_visor_tk_nombra_igual_en_los_casos_comunes(info):
+    n = int(info["channel_count"][0])
+    assert readxdf.obtener_nombres_de_canales(info) == MetadatosStream.desde_info(info, n).etiquetas
@@ -0,0 +1,24 @@
+import numpy as np
+
+from calidad import evaluar_canal
+from promedios import promediar_eventos
+
+SRATE = 100
+T = np.arange(1000) / SRATE
+
+
+def test_una_muestra_nan_descarta_su_epoca():
+    y = np.sin(T)
+    y[500] = np.nan
+    acumulador, _, descartadas = promediar_eventos(T, y, [3.0, 5.0], SRATE, 0.2, 0.8,
+                                                   calidad=evaluar_canal(y, T, SRATE))
+    assert (acumulador.n, descartadas) == (1, 1)
+    assert not np.isnan(acumulador.media).any()
+
+
+def test_epocas_limpias_no_se_descartan():
+    y = np.sin(T)
+    y[100] = np.nan
+    acumulador, _, descartadas = promediar_eventos(T, y, [3.0, 5.0], SRATE, 0.2, 0.8,
+                                                   calidad=evaluar_canal(y, T, SRATE))
+    assert (acumulador.n, descartadas) == (2, 0)
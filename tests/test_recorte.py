@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import analyxdf
+import readxdf
+from modelo_temporal import ModeloTemporal
+
+SRATE = 10.0
+
+
+@pytest.fixture
+def rampa():
+    """Señal y = 2 t muestreada a 10 Hz desde t = 100 s, con un corte entre 101.0 y 101.5 s."""
+    t = 100.0 + np.arange(30) / SRATE
+    t = t[(t < 101.05) | (t > 101.45)]
+    return t, 2.0 * t
+
+
+def test_limites_sobre_muestras_no_se_duplican(rampa):
+    t, y = rampa
+    t_recort, y_recort = analyxdf.recortar_senal(t, y, 100.2, 100.5)
+    np.testing.assert_allclose(t_recort, [100.2, 100.3, 100.4, 100.5])
+    np.testing.assert_allclose(y_recort, 2.0 * t_recort)
+
+
+def test_limites_entre_muestras_se_interpolan(rampa):
+    t, y = rampa
+    t_recort, y_recort = analyxdf.recortar_senal(t, y, 100.25, 100.47)
+    assert t_recort[0] == 100.25 and t_recort[-1] == 100.47
+    np.testing.assert_allclose(t_recort[1:-1], [100.3, 100.4])
+    np.testing.assert_allclose(y_recort, 2.0 * t_recort)
+
+
+def test_limites_fuera_de_la_senal_usan_el_extremo(rampa):
+    t, y = rampa
+    t_recort, y_recort = analyxdf.recortar_senal(t, y, 99.0, 110.0)
+    assert t_recort[0] == 99.0 and t_recort[-1] == 110.0
+    assert y_recort[0] == y[0] and y_recort[-1] == y[-1]
+    np.testing.assert_array_equal(t_recort[1:-1], t)
+
+
+def test_limite_dentro_de_un_corte_interpola_entre_sus_bordes(rampa):
+    t, y = rampa
+    t_recort, y_recort = analyxdf.recortar_senal(t, y, 101.2, 101.8)
+    assert t_recort[0] == 101.2
+    # Entre 101.0 y 101.5 no hay muestras: el valor sale de la recta entre ambos bordes
+    assert y_recort[0] == pytest.approx(202.4)
+    assert t_recort[1] == pytest.approx(101.5)
+
+
+def test_recorte_vacio_entre_dos_muestras(rampa):
+    t, y = rampa
+    t_recort, y_recort = analyxdf.recortar_senal(t, y, 100.21, 100.23)
+    np.testing.assert_allclose(t_recort, [100.21, 100.23])
+    np.testing.assert_allclose(y_recort, [200.42, 200.46])
+
+
+@pytest.mark.parametrize("inicio, fin", [(100.0, 102.9), (100.25, 100.47), (101.2, 101.8),
+                                         (99.0, 110.0), (100.21, 100.23), (102.9, 102.9)])
+def test_modelo_temporal_da_el_mismo_recorte(rampa, inicio, fin):
+    t, y = rampa
+    modelo = ModeloTemporal.desde_marcas(t, SRATE)
+    assert modelo is not None and len(modelo.cortes) == 1
+    sin_modelo = analyxdf.recortar_senal(t, y, inicio, fin)
+    con_modelo = analyxdf.recortar_senal(t, y, inicio, fin, modelo)
+    np.testing.assert_array_equal(sin_modelo[0], con_modelo[0])
+    np.testing.assert_array_equal(sin_modelo[1], con_modelo[1])
+
+
+def test_conserva_float32(rampa):
+    t, y = rampa
+    t_recort, y_recort = analyxdf.recortar_senal(t, y.astype(np.float32), 100.25, 100.47)
+    assert y_recort.dtype == np.float32
+    assert t_recort.dtype == np.float64
+
+
+def test_limites_no_numericos_retornan_la_senal(rampa):
+    t, y = rampa
+    t_recort, y_recort = analyxdf.recortar_senal(t, y, "inicio", 101.0)
+    assert t_recort is t and y_recort is y
+
+
+def test_recorte_del_visor_tk_solo_toma_muestras_internas(rampa):
+    t, y = rampa
+    t_recort, y_recort = readxdf.recortar_senal(t, y, 100.25, 100.47)
+    assert isinstance(t_recort, list)
+    np.testing.assert_allclose(t_recort, [100.3, 100.4])
+    np.testing.assert_allclose(y_recort, [200.6, 200.8])
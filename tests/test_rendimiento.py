@@ -0,0 +1,119 @@
+"""
+Presupuestos de tiempo y memoria por etapa, medidos con el registro de etapas de la
+aplicación sobre registros sintéticos largos. Los tiempos se miden sin tracemalloc (que
+hace mucho más lenta la lectura de pyxdf) sobre DURACION_TIEMPOS s; la memoria pico, en
+múltiplos del tamaño de las señales, sobre un registro más corto con tracemalloc activo.
+Los presupuestos dejan margen para máquinas lentas: sirven para detectar regresiones de
+órdenes de magnitud (p. ej. volver a buscar en todo el array o copiar la señal por canal),
+no diferencias pequeñas.
+
+Los presupuestos de tiempo dependen de la carga de la máquina, así que son un benchmark
+opcional: se ejecutan con XDF_PRESUPUESTOS_TIEMPO=1 (los de memoria corren siempre).
+"""
+import os
+
+import numpy as np
+import pytest
+
+import analyxdf
+import exportacion
+import promedios
+from instrumentacion import registro_etapas
+from referencia import cargar_en_ventana
+from xdf_sintetico import escribir_xdf, tiempos_regulares
+
+DURACION_TIEMPOS = 1800.0
+DURACION_MEMORIA = 300.0
+SRATE_LARGA = 500
+CANALES_LARGOS = 8
+INTERVALO_EVENTOS = 2.0
+
+# Etapa -> (segundos, memoria pico en múltiplos del tamaño de las señales float32 del archivo;
+# None si la etapa no mide memoria, como la exportación que corre en otros hilos)
+PRESUPUESTOS = {
+    "carga": (10.0, 4.0),
+    "metadatos": (0.5, 0.1),
+    "sincronizacion": (1.0, 2.5),
+    "modelo_temporal": (1.0, 2.0),
+    "calidad": (3.0, 1.5),
+    "vista_general": (1.0, 0.5),
+    "recorte": (0.5, 0.5),
+    "promedio_eventos": (1.0, 3.0),  # Su memoria depende del largo de época, no de la señal
+    "exportacion": (15.0, None),
+}
+
+
+def ejecutar_etapas(carpeta, duracion, medir_memoria):
+    """
+    Escribe un registro de `duracion` s, lo carga en la ventana principal, recorta un canal,
+    promedia todos los canales alrededor de los eventos y exporta el recorte.
+    Retorna (resumen del registro de etapas, bytes de las señales).
+    """
+    rng = np.random.default_rng(0)
+    inicio = 100.0
+    tiempos = tiempos_regulares(inicio, duracion, SRATE_LARGA)
+    datos = rng.standard_normal((tiempos.size, CANALES_LARGOS)).astype(np.float32)
+    eventos = np.arange(inicio + 10.0, inicio + duracion - 10.0, INTERVALO_EVENTOS)
+    ruta = escribir_xdf(str(carpeta / f"largo_{int(duracion)}.xdf"), [
+        {"nombre": "EEG", "tipo": "EEG", "srate": SRATE_LARGA, "formato": "float32",
+         "etiquetas": [f"E{i+1}" for i in range(CANALES_LARGOS)], "tiempos": tiempos, "datos": datos,
+         "offsets": [(t, 0.01) for t in np.arange(inicio, inicio + duracion, 5.0)]},
+        {"nombre": "Eventos", "tipo": "Markers", "srate": 0, "formato": "string",
+         "tiempos": eventos, "datos": ["estimulo"] * eventos.size},
+    ])
+    bytes_senal = datos.nbytes
+    del datos
+
+    ventana = analyxdf.MainWindow()
+    medir_memoria_antes = registro_etapas.medir_memoria
+    registro_etapas.medir_memoria = medir_memoria
+    registro_etapas.limpiar()
+    analyxdf.DTYPE_DATOS = np.float32
+    try:
+        cargar_en_ventana(ventana, ruta)
+        canal = analyxdf.canales_dict["Stream 1 - E1"]
+        t_recort, y_recort = analyxdf.recortar_senal(canal['time'], canal['data'], inicio + 5.0,
+                                                     inicio + duracion - 5.0, canal['modelo'])
+        with registro_etapas.etapa("promedio_eventos", muestras=len(analyxdf.triggers)):
+            promedios.promediar_eventos(canal['time'], canal['stream']["time_series"],
+                                        [t for t, _ in analyxdf.triggers], canal['modelo'].srate, 0.2, 0.8)
+        trabajo = ventana.colaExportacion.agregar("Stream 1 - E1", str(carpeta / f"e1_{int(duracion)}.csv"),
+                                                  t_recort, y_recort, analyxdf.triggers)
+        ventana.colaExportacion.cerrar(esperar=True)
+        assert trabajo.estado == exportacion.TERMINADO, trabajo.error
+        return registro_etapas.resumen(), bytes_senal
+    finally:
+        analyxdf.DTYPE_DATOS = np.float64
+        registro_etapas.medir_memoria = medir_memoria_antes
+        ventana.close()
+        analyxdf.canales_dict = {}
+        analyxdf.triggers = []
+
+
+@pytest.fixture(scope="module")
+def tiempos_etapas(qapp, tmp_path_factory):
+    return ejecutar_etapas(tmp_path_factory.mktemp("tiempos"), DURACION_TIEMPOS, medir_memoria=False)[0]
+
+
+@pytest.fixture(scope="module")
+def memoria_etapas(qapp, tmp_path_factory):
+    return ejecutar_etapas(tmp_path_factory.mktemp("memoria"), DURACION_MEMORIA, medir_memoria=True)
+
+
+@pytest.mark.skipif(os.environ.get("XDF_PRESUPUESTOS_TIEMPO") != "1",
+                    reason="benchmark opcional: XDF_PRESUPUESTOS_TIEMPO=1")
+@pytest.mark.parametrize("etapa", list(PRESUPUESTOS))
+def test_tiempo_de_etapa(tiempos_etapas, etapa):
+    assert etapa in tiempos_etapas, f"La etapa {etapa} no se registró"
+    segundos = PRESUPUESTOS[etapa][0]
+    medido = tiempos_etapas[etapa]["tiempo_pared"]
+    assert medido <= segundos, f"{etapa}: {medido:.2f} s > {segundos} s"
+
+
+@pytest.mark.parametrize("etapa", [etapa for etapa, (_, memoria) in PRESUPUESTOS.items() if memoria is not None])
+def test_memoria_de_etapa(memoria_etapas, etapa):
+    resumen, bytes_senal = memoria_etapas
+    assert etapa in resumen, f"La etapa {etapa} no se registró"
+    limite = PRESUPUESTOS[etapa][1] * bytes_senal
+    medido = resumen[etapa]["memoria_pico"]
+    assert medido <= limite, f"{etapa}: {medido / 1e6:.1f} MB > {limite / 1e6:.1f} MB"
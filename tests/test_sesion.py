@@ -0,0 +1,129 @@
+"""Guardar y abrir sesiones: el archivo solo guarda referencias y los streams se releen del XDF al usarlos."""
+import os
+import shutil
+from unittest import mock
+
+import neurokit2
+import numpy as np
+import pytest
+import pyxdf
+from PyQt5 import QtWidgets
+
+import analyxdf
+import filtros
+from referencia import CANALES, INICIO, PLANO_EDA, cargar_en_ventana
+
+
+def guardar(ventana, ruta):
+    with mock.patch.object(QtWidgets.QFileDialog, "getSaveFileName", return_value=(ruta, "")), \
+            mock.patch.object(QtWidgets.QMessageBox, "critical") as error:
+        ventana.guardar_sesion()
+    assert not error.called, error.call_args
+
+
+def abrir(ventana, ruta):
+    """Abre la sesión sin diálogos. Retorna el mock de QMessageBox.critical."""
+    with mock.patch.object(QtWidgets.QFileDialog, "getOpenFileName", return_value=(ruta, "")), \
+            mock.patch.object(QtWidgets.QMessageBox, "information"), \
+            mock.patch.object(QtWidgets.QMessageBox, "critical") as error:
+        ventana.abrir_sesion()
+    return error
+
+
+@pytest.fixture
+def con_sesion(ventana, registro_xdf, tmp_path):
+    """Registro (copiado, para poder modificarlo) cargado, con un filtro y un recorte, y su sesión guardada."""
+    ruta_xdf = str(tmp_path / "registro.xdf")
+    shutil.copy(registro_xdf[0], ruta_xdf)
+    cargar_en_ventana(ventana, ruta_xdf)
+    # Filtro aplicado como lo hace el diálogo de filtros
+    canal = analyxdf.canales_dict["Stream 1 - Rampa"]
+    stream = canal['stream']
+    cadena = [("pasaaltos", 0.5, filtros.ORDEN_POR_DEFECTO)]
+    stream["time_series"] = filtros.filtrar_stream(stream["time_series"], canal['modelo'].srate, cadena)
+    stream.setdefault("filtros", []).extend(cadena)
+    stream.setdefault("cadenas_filtro", []).append(cadena)
+    for c in analyxdf.canales_dict.values():
+        if c['stream'] is stream:
+            c['data'] = stream["time_series"][:, c['canal_idx']]
+    analyxdf.recortes_guardados = {"Stream 1 - Rampa": analyxdf.recortar_senal(
+        canal['time'], canal['data'], analyxdf.triggers[1][0], analyxdf.triggers[2][0], canal['modelo'])}
+    originales = {clave: (np.array(c['time']), np.array(c['data'])) for clave, c in analyxdf.canales_dict.items()}
+    recorte = tuple(np.array(a) for a in analyxdf.recortes_guardados["Stream 1 - Rampa"])
+    ruta = str(tmp_path / "sesion.xdfsesion")
+    guardar(ventana, ruta)
+    yield ventana, ruta, ruta_xdf, originales, recorte
+    analyxdf.recortes_guardados = {}
+    analyxdf.resultados_procesados = {}
+
+
+def test_sesion_sin_senales_y_lectura_diferida(con_sesion):
+    ventana, ruta, ruta_xdf, originales, recorte = con_sesion
+    assert os.path.getsize(ruta) < os.path.getsize(ruta_xdf) / 4
+    with mock.patch.object(pyxdf, "load_xdf", wraps=pyxdf.load_xdf) as load_xdf:
+        assert not abrir(ventana, ruta).called
+        assert load_xdf.call_count == 0  # Abrir no lee el XDF
+        assert list(analyxdf.canales_dict) == CANALES and analyxdf.vistas_generales
+        for clave, (tiempos, datos) in originales.items():
+            np.testing.assert_array_equal(analyxdf.canales_dict[clave]['time'], tiempos)
+            np.testing.assert_allclose(analyxdf.canales_dict[clave]['data'], datos, rtol=0, atol=1e-12)
+        t_recort, data_recort = analyxdf.recortes_guardados["Stream 1 - Rampa"]
+        assert load_xdf.call_count == 1  # Todos los streams del archivo en una sola lectura
+    np.testing.assert_array_equal(t_recort, recorte[0])
+    np.testing.assert_allclose(data_recort, recorte[1], rtol=0, atol=1e-12)
+
+
+def test_xdf_modificado_no_se_abre(con_sesion):
+    ventana, ruta, ruta_xdf, _, _ = con_sesion
+    with open(ruta_xdf, "ab") as f:
+        f.write(b"\0")
+    error = abrir(ventana, ruta)
+    assert error.called and "cambió" in error.call_args[0][2]
+
+
+def test_resultado_por_bloques_se_recalcula(con_sesion):
+    ventana = con_sesion[0]
+    llave = "Original: Stream 1 - ECG I"
+    analyxdf.resultados_procesados[llave] = {"tipo": "ECG", "signals": None, "info": {}, "directorio": "x"}
+
+    def procesar(dialog):
+        boton = next(b for b in dialog.findChildren(QtWidgets.QPushButton) if b.text().startswith("Procesar"))
+        boton.click()
+
+    with mock.patch.object(QtWidgets.QDialog, "exec_", procesar), \
+            mock.patch.object(analyxdf.SelectorCanales, "seleccionados", return_value=[llave]), \
+            mock.patch.object(QtWidgets.QMessageBox, "information"), \
+            mock.patch.object(neurokit2, "ecg_plot") as ecg_plot:
+        ventana.procesar_neurokit()
+    assert ecg_plot.call_args[0][0] is not None
+    assert analyxdf.resultados_procesados[llave]["signals"] is not None
+
+
+def test_recorte_que_excluye_mala_calidad(ventana, registro_xdf, tmp_path):
+    cargar_en_ventana(ventana, registro_xdf[0])
+    clave = "Stream 2 - Empatica"
+    t_inicio, t_fin = INICIO + 20.0, INICIO + 50.0
+
+    def guardar_excluyendo(dialog):
+        calidad = next(c for c in dialog.findChildren(QtWidgets.QComboBox) if c.itemText(1).startswith("Excluir"))
+        calidad.setCurrentIndex(1)
+        next(b for b in dialog.findChildren(QtWidgets.QPushButton) if b.text() == "Guardar recorte en aplicación").click()
+
+    try:
+        with mock.patch.object(QtWidgets.QDialog, "exec_", guardar_excluyendo), \
+                mock.patch.object(analyxdf.SelectorCanales, "seleccionados", return_value=[clave]), \
+                mock.patch.object(QtWidgets.QMessageBox, "information"):
+            ventana.abrir_menu_cortar_triggers(intervalo=(t_inicio, t_fin))
+        t_recort, data_recort = (np.array(a) for a in analyxdf.recortes_guardados[clave])
+        assert not np.any((t_recort > INICIO + PLANO_EDA[0] + 1.0) & (t_recort < INICIO + PLANO_EDA[1] - 1.0))
+        ruta = str(tmp_path / "sesion.xdfsesion")
+        guardar(ventana, ruta)
+        assert not abrir(ventana, ruta).called
+        restaurado = analyxdf.recortes_guardados[clave]
+        # Se guarda el intervalo pedido y el modo, no los extremos de las muestras que quedaron
+        assert restaurado.intervalo == {"clave": clave, "t_inicio": round(t_inicio, 3), "t_fin": round(t_fin, 3),
+                                        "modo_calidad": "excluir"}
+        np.testing.assert_array_equal(restaurado[0], t_recort)
+        np.testing.assert_array_equal(restaurado[1], data_recort)
+    finally:
+        analyxdf.recortes_guardados = {}
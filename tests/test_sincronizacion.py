@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from modelo_temporal import ModeloTemporal
+from sincronizacion import sincronizar_stream
+
+SRATE = 100
+JITTER = 0.004
+
+
+def con_perdidas(cada, perdidas=3, n=60000, semilla=0):
+    """Tiempos verdaderos y marcas con jitter de un stream que pierde `perdidas` muestras cada `cada`."""
+    quedan = np.ones(n, dtype=bool)
+    for k in range(cada, n - perdidas, cada):
+        quedan[k:k + perdidas] = False
+    verdad = 1000.0 + np.flatnonzero(quedan) / SRATE
+    marcas = verdad + np.random.default_rng(semilla).normal(0.0, JITTER, verdad.size)
+    return verdad, marcas
+
+
+def sincronizar(marcas, srate=SRATE):
+    stream = {"time_stamps": marcas.copy()}
+    return stream["time_stamps"], sincronizar_stream(stream, "prueba", srate), stream
+
+
+@pytest.mark.parametrize("semilla", [0, 1, 2])
+def test_perdidas_cortas_no_corren_las_marcas(semilla):
+    verdad, marcas = con_perdidas(cada=1000, semilla=semilla)
+    modelo = ModeloTemporal.desde_marcas(marcas, SRATE, tolerar_jitter=True)
+    assert len(modelo.cortes) == 59
+    _, sincronizacion, stream = sincronizar(marcas)
+    assert sincronizacion.dejitter
+    error = np.abs(stream["time_stamps"] - verdad)
+    # Solo una muestra junto a una pérdida puede quedar del lado equivocado si su jitter supera medio salto
+    assert np.count_nonzero(error > JITTER) <= 1
+    assert np.median(error) < np.median(np.abs(marcas - verdad)) / 4
+
+
+def test_perdidas_sin_ubicar_dejan_las_marcas():
+    _, marcas = con_perdidas(cada=37)
+    _, sincronizacion, stream = sincronizar(marcas)
+    assert not sincronizacion.dejitter
+    np.testing.assert_array_equal(stream["time_stamps"], marcas)
+
+
+def test_marcas_por_bloques():
+    # Varias muestras llegan juntas con la marca de la última del bloque: la desviación de dt es 0
+    srate, bloque = 256, 12
+    verdad = 1000.0 + np.arange(srate * 600) / srate
+    ultima = np.minimum((np.arange(verdad.size) // bloque + 1) * bloque - 1, verdad.size - 1)
+    retraso = 0.003 + np.random.default_rng(0).normal(0.0, 0.0005, verdad.size // bloque + 1)
+    marcas = verdad[ultima] + retraso[np.arange(verdad.size) // bloque]
+    _, sincronizacion, stream = sincronizar(marcas, srate)
+    assert sincronizacion.dejitter
+    error = stream["time_stamps"] - verdad
+    assert np.max(np.abs(error - np.mean(error))) < 1e-4
+
+
+@pytest.mark.parametrize("srate, jitter, minutos, semilla", [
+    (500, 0.001, 30, 0), (500, 0.001, 30, 1), (250, 0.001, 60, 0), (1000, 0.0005, 30, 0)])
+def test_streams_largos_sin_perdidas(srate, jitter, minutos, semilla):
+    verdad = 1000.0 + np.arange(srate * 60 * minutos) / srate
+    marcas = verdad + np.random.default_rng(semilla).normal(0.0, jitter, verdad.size)
+    modelo = ModeloTemporal.desde_marcas(marcas, srate, tolerar_jitter=True)
+    assert modelo is not None and len(modelo.cortes) == 0
+    error = modelo.tiempos_modelo() - verdad
+    assert np.max(np.abs(error)) < jitter / 10
@@ -0,0 +1,45 @@
+import numpy as np
+
+import readxdf
+from exportacion import columna_triggers
+
+T = 10.0 + np.arange(11) * 0.002  # 500 Hz
+
+
+def test_cada_marcador_va_a_la_muestra_mas_cercana():
+    columna = columna_triggers(T, [(10.0031, "a"), (10.0149, "b")])
+    assert columna == {2: "a", 7: "b"}
+
+
+def test_empate_va_a_la_muestra_anterior():
+    assert columna_triggers(T, [(10.003, "a")]) == {1: "a"}
+
+
+def test_marcadores_en_la_misma_muestra_se_concatenan():
+    assert columna_triggers(T, [(10.0041, "a"), (10.0039, "b")]) == {2: "a; b"}
+
+
+def test_marcadores_fuera_del_recorte_van_a_los_extremos():
+    assert columna_triggers(T, [(9.0, "antes"), (11.0, "despues")]) == {0: "antes", 10: "despues"}
+
+
+def test_recorte_vacio_no_asigna_marcadores():
+    assert columna_triggers(np.array([]), [(10.0, "a")]) == {}
+
+
+def test_visor_tk_repite_el_marcador_dentro_de_la_tolerancia():
+    filas = readxdf.filas_con_triggers(T, 2.0 * T, [(10.0031, "a")])
+    marcadas = [t for t, _, marker in filas if marker == "a"]
+    # Con TRIGGER_TOLERANCE = 10 ms un marcador se repite en 7 muestras de 500 Hz; la columna
+    # de la aplicación PyQt lo pone solo en la más cercana
+    assert len(filas) == T.size
+    np.testing.assert_allclose(marcadas, T[np.abs(T - 10.0031) <= readxdf.TRIGGER_TOLERANCE])
+    assert len(marcadas) == 7
+
+
+def test_visor_tk_agrega_una_fila_si_ninguna_muestra_esta_cerca():
+    filas = readxdf.filas_con_triggers(T, 2.0 * T, [(10.5, "lejos")])
+    assert len(filas) == T.size + 1
+    t, valor, marker = filas[-1]
+    assert (t, marker) == (10.5, "lejos")
+    assert valor == 2.0 * T[-1]
@@ -0,0 +1,89 @@
+from unittest import mock
+
+import numpy as np
+import pytest
+from PyQt5 import QtWidgets
+
+import analyxdf
+from referencia import CANALES, CORTE_ECG, INICIO, MARCADORES, cargar_en_ventana
+from vista_general import VistaGeneral, densidad_marcadores, envolvente
+
+
+def envolvente_directa(t, y, bordes):
+    minimos, maximos = [], []
+    for t0, t1 in zip(bordes[:-1], bordes[1:]):
+        tramo = y[(t >= t0) & (t < t1)]
+        minimos.append(tramo.min(axis=0) if len(tramo) else np.full(y.shape[1:], np.nan))
+        maximos.append(tramo.max(axis=0) if len(tramo) else np.full(y.shape[1:], np.nan))
+    return np.array(minimos), np.array(maximos)
+
+
+@pytest.mark.parametrize("bordes", [np.linspace(0.0, 10.0, 38), np.linspace(-2.0, 6.0, 17)])
+def test_envolvente_igual_a_la_directa(bordes):
+    rng = np.random.default_rng(3)
+    t = np.sort(rng.uniform(0.0, 10.0, 5000))
+    t = t[(t < 4.0) | (t > 5.5)]  # Un hueco: intervalos vacíos en el medio
+    y = rng.standard_normal((t.size, 3))
+    minimos, maximos = envolvente(t, y, bordes)
+    esperado_min, esperado_max = envolvente_directa(t, y, bordes)
+    np.testing.assert_allclose(minimos, esperado_min, rtol=1e-6)
+    np.testing.assert_allclose(maximos, esperado_max, rtol=1e-6)
+    assert np.isnan(minimos).any() and minimos.dtype == np.float32
+
+
+def test_densidad_por_clase():
+    bordes = np.array([0.0, 1.0, 2.0, 3.0])
+    clases, densidad = densidad_marcadores([0.1, 0.5, 1.5, 2.9, 7.0], ["b", "a", "b", "b", "a"], bordes)
+    assert clases == ["a", "b"]
+    np.testing.assert_array_equal(densidad, [[1, 0, 0], [1, 1, 1]])
+
+
+def test_ajuste_y_conteo_de_marcadores():
+    t = np.arange(0.0, 10.0, 0.01)
+    vista = VistaGeneral.desde_canales({"x": {'stream': {"time_series": t}, 'canal_idx': 0, 'time': t}},
+                                       [(2.0, "a"), (5.0, "b"), (8.0, "a")], columnas=50)
+    assert (vista.t_inicio, len(vista.bordes)) == (0.0, 51)
+    assert vista.marcador_mas_cercano(3.4) == 2.0 and vista.marcador_mas_cercano(3.6) == 5.0
+    assert vista.marcadores_entre(2.0, 5.0) == 2
+    assert vista.densidad.sum() == 3
+
+
+@pytest.fixture
+def cargado(ventana, registro_xdf):
+    cargar_en_ventana(ventana, registro_xdf[0])
+    return ventana
+
+
+def test_la_carga_calcula_la_vista(cargado):
+    assert list(analyxdf.vistas_generales) == ["referencia"]
+    vista = analyxdf.vistas_generales["referencia"]
+    assert list(vista.envolventes) == CANALES
+    assert vista.clases == sorted({m for _, m in MARCADORES})
+    assert vista.densidad.sum() == len(MARCADORES)
+    # La rampa vale el tiempo relativo: su envolvente la sigue, y el corte del ECG queda vacío
+    minimos, maximos = vista.envolventes["Stream 1 - Rampa"]
+    centros = 0.5 * (vista.bordes[:-1] + vista.bordes[1:]) - INICIO
+    en_corte = (centros > CORTE_ECG[0] + 0.1) & (centros < CORTE_ECG[1] - 0.1)
+    assert np.isnan(minimos[en_corte]).all()
+    validos = ~np.isnan(minimos)
+    np.testing.assert_allclose(0.5 * (minimos + maximos)[validos], centros[validos], atol=0.05)
+    assert cargado.panelVistaGeneral.comboArchivo.currentText() == "referencia"
+
+
+def test_seleccion_ajustada_abre_el_recorte(cargado):
+    panel = cargado.panelVistaGeneral
+    panel.checkAjustar.setChecked(True)
+    panel.seleccionar(INICIO + 9.6, INICIO + 20.3)
+    assert panel.seleccion == (pytest.approx(INICIO + 10.0), pytest.approx(INICIO + 20.0))
+    assert "2 marcadores" in panel.labelSeleccion.text()
+
+    elegidos = []
+
+    def revisar(dialog):
+        inicio, fin = dialog.findChildren(QtWidgets.QComboBox)[:2]
+        elegidos.extend([inicio.currentText(), fin.currentText()])
+
+    with mock.patch.object(QtWidgets.QDialog, "exec_", revisar):
+        panel.cortar_seleccion()
+    assert [float(texto.split(" s -")[0]) for texto in elegidos] == [
+        pytest.approx(INICIO + 10.0, abs=1e-3), pytest.approx(INICIO + 20.0, abs=1e-3)]
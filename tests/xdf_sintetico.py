@@ -0,0 +1,87 @@
+"""
+Escritor mínimo de archivos XDF para las pruebas: genera archivos con canales, tasas, cortes,
+marcadores y mediciones de offset de reloj conocidos, sin depender de LabRecorder.
+Las muestras numéricas se empaquetan con un dtype estructurado, así que escribir millones de
+muestras toma lo mismo que copiarlas.
+"""
+import struct
+
+import numpy as np
+
+FORMATOS = {"double64": "<f8", "float32": "<f4", "int32": "<i4", "int16": "<i2"}
+
+
+def _largo(n):
+    """Entero de largo variable del formato XDF (1, 4 u 8 bytes, precedido por su tamaño)."""
+    if n < 256:
+        return struct.pack("<BB", 1, n)
+    if n < 2 ** 32:
+        return struct.pack("<BI", 4, n)
+    return struct.pack("<BQ", 8, n)
+
+
+def _chunk(etiqueta, contenido):
+    return _largo(len(contenido) + 2) + struct.pack("<H", etiqueta) + contenido
+
+
+def _header(stream, stream_id, n_canales):
+    canales = "".join(
+        f"<channel><label>{etiqueta}</label><unit>{stream.get('unidad', 'uV')}</unit>"
+        f"<type>{stream['tipo']}</type></channel>" for etiqueta in stream.get("etiquetas", []))
+    desc = f"<desc><channels>{canales}</channels></desc>" if canales else "<desc/>"
+    return (f'<?xml version="1.0"?><info><name>{stream.get("nombre", "")}</name>'
+            f'<type>{stream["tipo"]}</type><channel_count>{n_canales}</channel_count>'
+            f'<nominal_srate>{stream["srate"]}</nominal_srate>'
+            f'<channel_format>{stream["formato"]}</channel_format>'
+            f'<source_id>sintetico{stream_id}</source_id><created_at>0</created_at>{desc}</info>')
+
+
+def _muestras(stream, n_canales):
+    tiempos = np.asarray(stream["tiempos"], dtype=np.float64)
+    if stream["formato"] == "string":
+        partes = [_largo(tiempos.size)]
+        for t, texto in zip(tiempos.tolist(), stream["datos"]):
+            codificado = texto.encode("utf-8")
+            partes.append(struct.pack("<Bd", 8, t) + _largo(len(codificado)) + codificado)
+        return b"".join(partes)
+    tipo = np.dtype([("tam", "u1"), ("t", "<f8"), ("v", FORMATOS[stream["formato"]], (n_canales,))])
+    registros = np.empty(tiempos.size, dtype=tipo)
+    registros["tam"] = 8
+    registros["t"] = tiempos
+    registros["v"] = np.asarray(stream["datos"]).reshape(tiempos.size, n_canales)
+    return _largo(tiempos.size) + registros.tobytes()
+
+
+def escribir_xdf(ruta, streams):
+    """
+    Escribe un archivo XDF. Cada stream es un diccionario con:
+      nombre, tipo, srate (0 para irregulares), formato ("double64", "float32", "int32",
+      "int16" o "string"), tiempos, datos (array (n,) o (n, canales), o lista de textos),
+      etiquetas (opcional; sin ellas el header no trae desc/channels), unidad (opcional) y
+      offsets (opcional: lista de (tiempo, offset) como los chunks ClockOffset de LSL).
+    """
+    partes = [b"XDF:", _chunk(1, b'<?xml version="1.0"?><info><version>1.0</version></info>')]
+    for stream_id, stream in enumerate(streams, 1):
+        datos = stream["datos"]
+        n_canales = 1 if stream["formato"] == "string" or np.ndim(datos) == 1 else np.shape(datos)[1]
+        partes.append(_chunk(2, struct.pack("<I", stream_id) + _header(stream, stream_id, n_canales).encode()))
+        partes.append(_chunk(3, struct.pack("<I", stream_id) + _muestras(stream, n_canales)))
+        for tiempo, offset in stream.get("offsets", []):
+            partes.append(_chunk(4, struct.pack("<Idd", stream_id, tiempo, offset)))
+        tiempos = np.asarray(stream["tiempos"], dtype=np.float64)
+        footer = (f'<?xml version="1.0"?><info>'
+                  f'<first_timestamp>{tiempos[0] if tiempos.size else 0}</first_timestamp>'
+                  f'<last_timestamp>{tiempos[-1] if tiempos.size else 0}</last_timestamp>'
+                  f'<sample_count>{tiempos.size}</sample_count></info>')
+        partes.append(_chunk(6, struct.pack("<I", stream_id) + footer.encode()))
+    with open(ruta, "wb") as f:
+        f.write(b"".join(partes))
+    return ruta
+
+
+def tiempos_regulares(inicio, duracion, srate, cortes=()):
+    """Tiempos de un stream regular que empieza en `inicio`, sin las muestras de los cortes (t0, t1)."""
+    tiempos = inicio + np.arange(int(round(duracion * srate))) / float(srate)
+    for t0, t1 in cortes:
+        tiempos = tiempos[(tiempos < inicio + t0) | (tiempos >= inicio + t1)]
+    return tiempos
@@ -0,0 +1,119 @@
+import numpy as np
+
+COLUMNAS_VISTA = 2000  # Columnas (intervalos de tiempo) de la vista general de un archivo
+
+
+def envolvente(time_stamps, y, bordes):
+    """
+    Mínimo y máximo de `y` (1-D, o 2-D con un canal por columna) en cada intervalo
+    [bordes[i], bordes[i+1]) en una sola pasada (reduceat sobre los índices de los bordes).
+    Los intervalos sin muestras (cortes, o fuera del stream) quedan en NaN. Retorna
+    (minimos, maximos) en float32, de forma (len(bordes) - 1,) + y.shape[1:].
+    """
+    time_stamps = np.asarray(time_stamps)
+    y = np.asarray(y)
+    forma = (len(bordes) - 1,) + y.shape[1:]
+    minimos = np.full(forma, np.nan, dtype=np.float32)
+    maximos = np.full(forma, np.nan, dtype=np.float32)
+    if time_stamps.size == 0:
+        return minimos, maximos
+    idx = np.searchsorted(time_stamps, bordes, side="left")
+    inicios, fines = idx[:-1], idx[1:]
+    con_datos = fines > inicios
+    if np.any(con_datos):
+        # reduceat necesita índices válidos: solo se usan los inicios de intervalos con muestras,
+        # y cada uno reduce hasta el siguiente inicio, que es justo su fin
+        inicios = inicios[con_datos]
+        minimos[con_datos] = np.fmin.reduceat(y, inicios, axis=0)
+        maximos[con_datos] = np.fmax.reduceat(y, inicios, axis=0)
+        # El último intervalo con datos reduciría hasta el final del array aunque haya más muestras
+        ultimo = np.flatnonzero(con_datos)[-1]
+        if fines[ultimo] < time_stamps.size:
+            tramo = y[inicios[-1]:fines[ultimo]]
+            minimos[ultimo] = np.fmin.reduce(tramo, axis=0)
+            maximos[ultimo] = np.fmax.reduce(tramo, axis=0)
+    return minimos, maximos
+
+
+def densidad_marcadores(tiempos, clases_marcadores, bordes):
+    """Cantidad de marcadores de cada clase por intervalo. Retorna (clases, matriz clases x intervalos)."""
+    tiempos = np.asarray(tiempos, dtype=np.float64)
+    clases = sorted(set(clases_marcadores))
+    densidad = np.zeros((len(clases), len(bordes) - 1), dtype=np.int32)
+    if not clases:
+        return clases, densidad
+    codigo = {clase: k for k, clase in enumerate(clases)}
+    fila = np.fromiter((codigo[c] for c in clases_marcadores), dtype=np.int64, count=len(clases_marcadores))
+    columna = np.searchsorted(bordes, tiempos, side="right") - 1
+    dentro = (columna >= 0) & (columna < len(bordes) - 1)
+    np.add.at(densidad, (fila[dentro], columna[dentro]), 1)
+    return clases, densidad
+
+
+class VistaGeneral:
+    """
+    Resumen de baja resolución de un archivo, calculado una vez al cargarlo: la envolvente
+    (mínimo y máximo por columna) de cada canal y un histograma de marcadores por clase sobre
+    las mismas columnas de tiempo. Ocupa unas pocas columnas por canal, así que dibujarlo,
+    acercarlo o elegir un intervalo sobre él no vuelve a tocar las señales completas.
+    """
+
+    def __init__(self, bordes, envolventes, clases, densidad, tiempos_marcadores):
+        self.bordes = bordes                          # columnas + 1 tiempos (s)
+        self.envolventes = envolventes                # clave del canal -> (minimos, maximos)
+        self.clases = clases                          # Clases de marcador, en orden alfabético
+        self.densidad = densidad                      # Marcadores por clase y columna
+        self.tiempos_marcadores = tiempos_marcadores  # Ordenados, para ajustar las selecciones
+
+    @property
+    def t_inicio(self):
+        return float(self.bordes[0])
+
+    @property
+    def t_fin(self):
+        return float(self.bordes[-1])
+
+    @classmethod
+    def desde_canales(cls, canales, marcadores, columnas=COLUMNAS_VISTA):
+        """
+        Calcula la vista de los canales de un archivo ({clave: canal_info}) y sus marcadores
+        [(tiempo, clase)]. La envolvente se calcula una vez por stream, con todos sus canales
+        a la vez.
+        """
+        extremos = [t for canal in canales.values() if len(canal['time'])
+                    for t in (canal['time'][0], canal['time'][-1])]
+        extremos += [t for t, _ in marcadores]
+        if not extremos:
+            return None
+        t_inicio, t_fin = float(min(extremos)), float(max(extremos))
+        if t_fin <= t_inicio:
+            t_fin = t_inicio + 1.0
+        bordes = np.linspace(t_inicio, t_fin, columnas + 1)
+        bordes[-1] = np.nextafter(t_fin, np.inf)  # La última muestra entra en la última columna
+
+        por_stream = {}
+        envolventes = {}
+        for clave, canal in canales.items():
+            stream = canal['stream']
+            if id(stream) not in por_stream:
+                por_stream[id(stream)] = envolvente(canal['time'], stream["time_series"], bordes)
+            minimos, maximos = por_stream[id(stream)]
+            if minimos.ndim > 1:
+                minimos, maximos = minimos[:, canal['canal_idx']], maximos[:, canal['canal_idx']]
+            envolventes[clave] = (minimos, maximos)
+
+        clases, densidad = densidad_marcadores([t for t, _ in marcadores], [c for _, c in marcadores], bordes)
+        tiempos_marcadores = np.sort(np.array([t for t, _ in marcadores], dtype=np.float64))
+        return cls(bordes, envolventes, clases, densidad, tiempos_marcadores)
+
+    def marcador_mas_cercano(self, t):
+        """Tiempo del marcador más cercano a t (o t si el archivo no tiene marcadores)."""
+        if self.tiempos_marcadores.size == 0:
+            return t
+        k = int(np.searchsorted(self.tiempos_marcadores, t))
+        vecinos = self.tiempos_marcadores[max(k - 1, 0):k + 1]
+        return float(vecinos[np.argmin(np.abs(vecinos - t))])
+
+    def marcadores_entre(self, t_inicio, t_fin):
+        return int(np.searchsorted(self.tiempos_marcadores, t_fin, side="right")
+                   - np.searchsorted(self.tiempos_marcadores, t_inicio, side="left"))